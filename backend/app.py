@@ -1,45 +1,79 @@
 from flask import Flask, render_template
 from .config import Config  # Use relative import
 from .services.gemini_service import GeminiService  # Use relative import
+from .utils.logging_setup import configure_logging
 from dotenv import load_dotenv
+import logging
 import os
 
 # Load .env file directly in app.py to ensure it's loaded
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 def create_app():
     app = Flask(__name__, 
                 static_folder='../frontend/static',
                 template_folder='../frontend/templates')
     app.config.from_object(Config)
     
-    # Print environment variables for debugging
-    env_api_key = os.environ.get('GEMINI_API_KEY')
-    config_api_key = app.config.get('GEMINI_API_KEY')
-    
-    print(f"Env API key: {env_api_key[:4]}...{env_api_key[-4:] if env_api_key and len(env_api_key) > 8 else 'None'}")
-    print(f"Config API key: {config_api_key[:4]}...{config_api_key[-4:] if config_api_key and len(config_api_key) > 8 else 'None'}")
+    # Structured logging through a background queue, with request ids
+    configure_logging(app)
     
     # Use the API key directly from environment instead of config
     api_key = os.environ.get('GEMINI_API_KEY')
+    if not api_key and Config.GEMINI_BACKEND != 'replay':
+        logger.warning("GEMINI_API_KEY is not set; food analysis will fail")
     
     # Test Gemini API key
-    print(f"Testing Gemini API key...")
+    logger.info("Testing Gemini API key...")
     try:
         gemini_service = GeminiService(api_key)
         if gemini_service.test_api_key():
-            print("✅ Gemini API key test passed!")
+            logger.info("Gemini API key test passed")
         else:
-            print("⚠️  Gemini API key test failed, but service may still work with REST transport")
+            logger.warning("Gemini API key test failed, but service may still work with REST transport")
     except Exception as e:
-        print(f"⚠️  Gemini API key test failed: {str(e)}")
-        print("   This is likely a gRPC connection issue. The service should still work with REST transport.")
+        # Likely a gRPC connection issue; the service should still work with REST transport
+        logger.warning("Gemini API key test failed: %s", e)
     
     # Import and register blueprints
     from .routes.food_routes import food_routes
     from .routes.user_routes import user_routes
+    from .routes.tracking_routes import tracking_bp
+    from .routes.sync_routes import sync_routes
+    from .routes.analytics_routes import analytics_routes
+    from .routes.recipe_routes import recipe_routes
+    from .routes.usage_routes import usage_routes
+    from .routes.photo_routes import photo_routes
     
     app.register_blueprint(food_routes)
     app.register_blueprint(user_routes)
+    app.register_blueprint(sync_routes)
+    app.register_blueprint(analytics_routes)
+    app.register_blueprint(recipe_routes)
+    app.register_blueprint(usage_routes)
+    app.register_blueprint(photo_routes)
+    app.register_blueprint(tracking_bp, url_prefix='/api')
+    
+    # Fingerprinted, precompressed static files from build_assets.py
+    from .utils.assets import init_assets
+    init_assets(app)
+
+    # Request latency histograms and the /metrics endpoint
+    from .utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Flag requests that run more statements than the query budget
+    from .database.instrumentation import check_query_budget
+    app.after_request(check_query_budget)
+    
+    # Pin clients to the primary database briefly after they write
+    from .database.replicas import mark_recent_write
+    app.after_request(mark_recent_write)
+    
+    # Profile requests on demand (installed only when enabled)
+    from .utils.profiling import init_profiling
+    init_profiling(app)
     
     return app
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,10 +15,115 @@ class Config:
     DB_USER = os.environ.get('DB_USER', 'nutrify_user')
     DB_PASSWORD = os.environ.get('DB_PASSWORD')
     
+    # Per-process connection pool bounds (each pool is per DSN)
+    DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+    
+    # Optional read replicas (comma-separated DSNs) used by read-only endpoints
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    # Replicas lagging further behind than this are skipped in favour of the primary
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 2))
+    # How long an unreachable replica is left out of the rotation
+    REPLICA_RETRY_AFTER = float(os.environ.get('REPLICA_RETRY_AFTER', 30))
+    # Window after a write during which a client's reads go to the primary
+    READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 10))
+    
     # Flask configuration
     FLASK_ENV = os.environ.get('FLASK_ENV', 'development')
     DEBUG = FLASK_ENV == 'development'
     
+    # Rows fetched per round trip by the server-side cursor behind /api/food-logs/export
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 2000))
+    
+    # Changes returned per /api/sync page, and offline entries accepted per push
+    SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+    SYNC_MAX_BATCH = int(os.environ.get('SYNC_MAX_BATCH', 500))
+    
+    # Analytics summaries cached per worker (one per user and data version)
+    ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE', 256))
+    
+    # Nutrition goals cached per worker, keyed on the user's data version so
+    # saved goals show up on the next request. The TTL only bounds how long an
+    # entry lives, and how stale it can get if goals change without a version
+    # bump (e.g. edited directly in the database); the size caps memory.
+    GOALS_CACHE_TTL = float(os.environ.get('GOALS_CACHE_TTL', 300))
+    GOALS_CACHE_SIZE = int(os.environ.get('GOALS_CACHE_SIZE', 10000))
+    
+    # Token buckets for the Gemini analysis endpoints, per user token (or
+    # client IP without one): bucket size, and tokens refilled per minute
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+    RATE_LIMIT_ANALYZE_TEXT_BURST = int(os.environ.get('RATE_LIMIT_ANALYZE_TEXT_BURST', 20))
+    RATE_LIMIT_ANALYZE_TEXT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_ANALYZE_TEXT_PER_MINUTE', 10))
+    RATE_LIMIT_ANALYZE_IMAGE_BURST = int(os.environ.get('RATE_LIMIT_ANALYZE_IMAGE_BURST', 10))
+    RATE_LIMIT_ANALYZE_IMAGE_PER_MINUTE = float(os.environ.get('RATE_LIMIT_ANALYZE_IMAGE_PER_MINUTE', 5))
+    
+    # Gemini usage is aggregated per worker and written to gemini_usage this often
+    GEMINI_USAGE_FLUSH_INTERVAL = float(os.environ.get('GEMINI_USAGE_FLUSH_INTERVAL', 10))
+    # Per-user daily Gemini quotas (0 disables a quota)
+    GEMINI_DAILY_CALL_QUOTA = int(os.environ.get('GEMINI_DAILY_CALL_QUOTA', 200))
+    GEMINI_DAILY_TOKEN_QUOTA = int(os.environ.get('GEMINI_DAILY_TOKEN_QUOTA', 0))
+    
+    # Bearer token for /api/admin endpoints; they are disabled while unset
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    
+    # Statements slower than this are logged with the route that ran them;
+    # a share of slow read-only ones (dev/staging) is logged with its plan
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+    EXPLAIN_SAMPLE_RATE = float(os.environ.get('EXPLAIN_SAMPLE_RATE', 0))
+    # Requests running more statements than this are flagged (0 disables)
+    QUERY_BUDGET = int(os.environ.get('QUERY_BUDGET', 20))
+    
+    # cProfile runs of requests sent with an X-Profile header (admin token or
+    # a signed value, see backend/utils/profiling.py), plus a sampled share of
+    # all requests; profiles are written to PROFILE_DIR
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'nutrify-profiles'))
+    
+    # Logging: default level, per-module overrides ("backend.database=WARNING,..."),
+    # and 'json' or 'text' lines on stdout
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text' if FLASK_ENV == 'development' else 'json')
+    # Debug payloads (e.g. raw Gemini responses) logged per kind and minute, and their maximum length
+    LOG_PAYLOAD_SAMPLES_PER_MINUTE = float(os.environ.get('LOG_PAYLOAD_SAMPLES_PER_MINUTE', 6))
+    LOG_PAYLOAD_MAX_CHARS = int(os.environ.get('LOG_PAYLOAD_MAX_CHARS', 2000))
+    
+    # Where Gemini requests go: 'live', 'record' (live, saving fixtures) or
+    # 'replay' (fixtures only, via the replay server when its URL is set)
+    GEMINI_BACKEND = os.environ.get('GEMINI_BACKEND', 'live')
+    GEMINI_FIXTURE_DIR = os.environ.get(
+        'GEMINI_FIXTURE_DIR',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'fixtures', 'gemini')
+    )
+    GEMINI_REPLAY_URL = os.environ.get('GEMINI_REPLAY_URL')
+    
+    # Model tiers: short single-food descriptions go to the fast tier; images,
+    # several foods and long prompts to the strong one (see model_routing.py)
+    GEMINI_MODEL_FAST = os.environ.get('GEMINI_MODEL_FAST', 'models/gemini-1.5-flash-8b')
+    GEMINI_MODEL_STRONG = os.environ.get('GEMINI_MODEL_STRONG', 'models/gemini-1.5-flash')
+    GEMINI_ROUTING_ENABLED = os.environ.get('GEMINI_ROUTING_ENABLED', 'true').lower() != 'false'
+    GEMINI_FAST_MAX_WORDS = int(os.environ.get('GEMINI_FAST_MAX_WORDS', 8))
+    GEMINI_FAST_MAX_PROMPT_TOKENS = int(os.environ.get('GEMINI_FAST_MAX_PROMPT_TOKENS', 400))
+    
+    # /api/food-logs/search results per page (default and maximum) and query length
+    SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', 20))
+    SEARCH_MAX_PAGE_SIZE = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', 100))
+    SEARCH_MAX_QUERY_LENGTH = int(os.environ.get('SEARCH_MAX_QUERY_LENGTH', 200))
+    
+    # Meal photos: stored on disk once per content hash, with JPEG thumbnails
+    # (longest side in pixels) made by a background worker after upload
+    PHOTO_DIR = os.environ.get(
+        'PHOTO_DIR',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'photos')
+    )
+    PHOTO_MAX_BYTES = int(os.environ.get('PHOTO_MAX_BYTES', 10 * 1024 * 1024))
+    PHOTO_THUMBNAIL_SIZES = [int(size) for size in os.environ.get('PHOTO_THUMBNAIL_SIZES', '128,512').split(',')]
+    PHOTO_THUMBNAIL_WORKERS = int(os.environ.get('PHOTO_THUMBNAIL_WORKERS', 2))
+    # Let the front proxy send photo files (X-Sendfile) instead of the worker
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    
     @staticmethod
     def get_db_connection_params():
         """Get database connection parameters"""
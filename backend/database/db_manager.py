@@ -1,36 +1,156 @@
-# Placeholder database functions to avoid import errors
-
-def create_user(email, password, name=None):
-    """Placeholder for create_user function"""
-    print("Warning: using placeholder create_user function")
-    return {"email": email, "name": name, "id": 1}
-
-def get_user_by_email(email):
-    """Placeholder for get_user_by_email function"""
-    print("Warning: using placeholder get_user_by_email function")
-    return None
-
-def get_user_nutrient_goals(user_id):
-    """Placeholder for get_user_nutrient_goals function"""
-    print("Warning: using placeholder get_user_nutrient_goals function")
-    return {
-        "calories": 2000,
-        "protein": 150,
-        "carbs": 200,
-        "fat": 70
-    }
-
-def update_user_nutrient_progress(user_id, nutrients):
-    """Placeholder for update_user_nutrient_progress function"""
-    print("Warning: using placeholder update_user_nutrient_progress function")
-    return True
-
-def get_user_food_log(user_id, date=None):
-    """Placeholder for get_user_food_log function"""
-    print("Warning: using placeholder get_user_food_log function")
-    return []
-
-def add_food_to_log(user_id, food_data):
-    """Placeholder for add_food_to_log function"""
-    print("Warning: using placeholder add_food_to_log function")
-    return {"id": 1, "name": food_data.get("name"), "user_id": user_id}
\ No newline at end of file
+"""
+Database connections shared by the routes, services and scripts.
+
+Connections are pooled per process so statements prepared by
+backend/database/repository.py stay prepared across requests.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from backend.config import Config
+from backend.database.instrumentation import InstrumentedCursor
+from backend.utils.metrics import DB_CHECKOUT_LATENCY
+
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """Connection that remembers which statements have been prepared on it and times its statements"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        self.pool = None
+        self.cursor_factory = InstrumentedCursor
+
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def connect(params=None, connection_factory=PreparedConnection):
+    """Open a new, unpooled connection (scripts and long-running cursors)"""
+    params = params or Config.get_db_connection_params()
+    return psycopg2.connect(connection_factory=connection_factory, **params)
+
+
+def _get_pool(params, connection_factory):
+    global _pools, _pools_pid
+
+    key = (tuple(sorted(params.items())), connection_factory)
+    with _pools_lock:
+        # Pools must not be shared with a forked parent (e.g. gunicorn --preload)
+        if _pools_pid != os.getpid():
+            _pools = {}
+            _pools_pid = os.getpid()
+
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ThreadedConnectionPool(
+                Config.DB_POOL_MIN, Config.DB_POOL_MAX,
+                connection_factory=connection_factory, **params
+            )
+            _pools[key] = pool
+        return pool
+
+
+def checkout(params=None, connection_factory=PreparedConnection):
+    """Take a connection from the pool for `params`, opening a spare one if the pool is exhausted"""
+    started = time.perf_counter()
+    params = params or Config.get_db_connection_params()
+    pool = _get_pool(params, connection_factory)
+
+    try:
+        conn = pool.getconn()
+        conn.pool = pool
+        source = 'pool'
+    except PoolError:
+        conn = connect(params, connection_factory)
+        source = 'overflow'
+
+    role = 'replica' if getattr(connection_factory, 'is_replica', False) else 'primary'
+    DB_CHECKOUT_LATENCY.labels(role, source).observe(time.perf_counter() - started)
+    return conn
+
+
+def release(conn, discard=False):
+    """Return a connection to its pool, closing it if it is broken or unpooled"""
+    if conn is None:
+        return
+
+    pool = getattr(conn, 'pool', None)
+    if pool is None:
+        conn.close()
+        return
+
+    if conn.closed:
+        discard = True
+    elif not discard and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            discard = True
+
+    try:
+        pool.putconn(conn, close=discard)
+    except PoolError:
+        # The pool was reset after a fork; this connection is not tracked anymore
+        conn.close()
+
+
+def get_db_connection():
+    """Pooled connection to the primary; hand it back with release()"""
+    return checkout()
+
+
+@contextmanager
+def db_connection(read_only=False, token=None):
+    """
+    Check out a connection for the duration of a block. Commits on success,
+    rolls back on error. Read-only blocks may be served by a replica.
+    """
+    if read_only:
+        from backend.database.replicas import get_read_connection
+        conn = get_read_connection(token)
+    else:
+        conn = get_db_connection()
+
+    discard = False
+    try:
+        yield conn
+        if not conn.autocommit:
+            conn.commit()
+    except Exception as e:
+        discard = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        if not conn.closed and not discard:
+            conn.rollback()
+        raise
+    finally:
+        release(conn, discard)
+
+
+@contextmanager
+def read_snapshot(conn):
+    """
+    Run a block's reads in one REPEATABLE READ transaction on `conn`, so
+    they all see the same snapshot. Works on replica (autocommit) and
+    primary connections; the transaction is rolled back afterwards.
+    """
+    autocommit = conn.autocommit
+    if autocommit:
+        conn.autocommit = False
+    try:
+        cur = conn.cursor()
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        cur.close()
+        yield conn
+    finally:
+        if not conn.closed:
+            conn.rollback()
+            if autocommit:
+                conn.autocommit = True
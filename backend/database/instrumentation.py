@@ -0,0 +1,141 @@
+"""
+Per-statement timing for pooled connections.
+
+Every cursor handed out by db_manager times its statements and tags them
+with the Flask route that ran them. Statements slower than
+Config.SLOW_QUERY_MS are logged with normalised SQL; with
+Config.EXPLAIN_SAMPLE_RATE above zero (dev/staging), a sample of slow
+read-only statements is re-run under EXPLAIN (ANALYZE, BUFFERS) and the plan
+is logged as well. Requests that run more than Config.QUERY_BUDGET statements
+are reported with their most repeated statements, which is how N+1 loops
+show up.
+"""
+import logging
+import random
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+
+import psycopg2.extensions
+from flask import g, has_request_context, request
+
+from backend.config import Config
+
+logger = logging.getLogger(__name__)
+
+_EXECUTE_RE = re.compile(r'^\s*EXECUTE\s+(\w+)', re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%\(\w+\)s|%s|\$\d+')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+_WRITE_RE = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|ALTER|DROP|COPY|LOCK|PREPARE|DECLARE)\b',
+                       re.IGNORECASE)
+
+# name -> SQL of statements prepared by the repository, for readable logs
+prepared_sql = {}
+
+
+def normalize_sql(sql):
+    """Collapse a statement to its shape: literals and placeholders become ?, whitespace is folded"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _STRING_RE.sub('?', str(sql))
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+# Statement templates repeat, so their descriptions are cached
+@lru_cache(maxsize=1024)
+def describe(sql):
+    """Normalised SQL, resolving EXECUTE of a prepared statement to its definition"""
+    text = sql.decode('utf-8', 'replace') if isinstance(sql, bytes) else str(sql)
+    match = _EXECUTE_RE.match(text)
+    if match and match.group(1) in prepared_sql:
+        return f"[{match.group(1)}] {normalize_sql(prepared_sql[match.group(1)])}"
+    return normalize_sql(text)
+
+
+def is_read_only(sql):
+    """Whether re-running the statement under EXPLAIN ANALYZE is free of side effects"""
+    text = sql.decode('utf-8', 'replace') if isinstance(sql, bytes) else str(sql)
+    match = _EXECUTE_RE.match(text)
+    if match:
+        text = prepared_sql.get(match.group(1), 'INSERT')
+    return text.lstrip().upper().startswith(('SELECT', 'WITH')) and not _WRITE_RE.search(text)
+
+
+def current_route():
+    if not has_request_context():
+        return 'background'
+    rule = request.url_rule.rule if request.url_rule else request.path
+    return f"{request.method} {rule}"
+
+
+def _record(sql, elapsed):
+    if not has_request_context():
+        return
+    stats = g.get('query_stats')
+    if stats is None:
+        stats = g.query_stats = {'count': 0, 'seconds': 0.0, 'statements': Counter()}
+    stats['count'] += 1
+    stats['seconds'] += elapsed
+    stats['statements'][describe(sql)] += 1
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor that times each statement and reports slow ones"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            elapsed = time.perf_counter() - started
+            _record(query, elapsed)
+            if elapsed * 1000 >= Config.SLOW_QUERY_MS:
+                self._report_slow(query, vars, elapsed)
+
+    def _report_slow(self, query, vars, elapsed):
+        logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000, current_route(), describe(query))
+
+        # Named (server-side) cursors only DECLARE here; the work happens on fetch
+        if self.name is not None or Config.EXPLAIN_SAMPLE_RATE <= 0 or random.random() >= Config.EXPLAIN_SAMPLE_RATE:
+            return
+        if not is_read_only(query) or self.connection.info.transaction_status == \
+                psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+            return
+
+        try:
+            # A plain cursor, so the EXPLAIN itself is neither timed nor explained
+            with self.connection.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                cur.execute(b"EXPLAIN (ANALYZE, BUFFERS) " + self.mogrify(query, vars))
+                plan = "\n".join(row[0] for row in cur.fetchall())
+            logger.info("Plan for slow query on %s:\n%s", current_route(), plan)
+        except psycopg2.Error as e:
+            logger.warning("Could not explain slow query: %s", e)
+
+
+def check_query_budget(response):
+    """after_request hook: flag requests that ran more statements than the budget"""
+    stats = g.get('query_stats')
+    if stats is None:
+        return response
+
+    if Config.QUERY_BUDGET and stats['count'] > Config.QUERY_BUDGET:
+        repeated = ", ".join(
+            f"{count}x {statement[:120]}" for statement, count in stats['statements'].most_common(3) if count > 1
+        )
+        logger.warning(
+            "Query budget exceeded on %s: %d statements in %.1f ms (budget %d)%s",
+            current_route(), stats['count'], stats['seconds'] * 1000, Config.QUERY_BUDGET,
+            f"; repeated: {repeated}" if repeated else ""
+        )
+
+    if Config.DEBUG:
+        # Visible in browser dev tools next to the request timing
+        response.headers['Server-Timing'] = f'db;dur={stats["seconds"] * 1000:.1f};desc="{stats["count"]} queries"'
+    return response
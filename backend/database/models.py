@@ -1,25 +1,93 @@
-from flask_sqlalchemy import SQLAlchemy
-
-db = SQLAlchemy()
-
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
-    nutrient_goals = db.relationship('NutrientGoal', backref='user', lazy=True)
-
-class FoodItem(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    calories = db.Column(db.Float, nullable=False)
-    protein = db.Column(db.Float, nullable=False)
-    carbohydrates = db.Column(db.Float, nullable=False)
-    fats = db.Column(db.Float, nullable=False)
-
-class NutrientGoal(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    goal_type = db.Column(db.String(50), nullable=False)
-    target_value = db.Column(db.Float, nullable=False)
-    current_value = db.Column(db.Float, default=0.0)
\ No newline at end of file
+"""
+Lightweight row objects returned by backend/database/repository.py.
+Each is a namedtuple, so rows are built straight from cursor tuples.
+"""
+from collections import namedtuple
+
+
+class User(namedtuple('User', 'id username email created_at data_version', defaults=(0,))):
+    """data_version is bumped by every change to the user's logs or goals"""
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class UserCredentials(namedtuple('UserCredentials', 'id username password_hash')):
+    __slots__ = ()
+
+
+class FoodLog(namedtuple('FoodLog', 'id name calories protein carbs fats date_added photo_id', defaults=(None,))):
+    """photo_id is the content hash of an attached meal photo, if any"""
+    __slots__ = ()
+
+    @classmethod
+    def _make(cls, iterable):
+        # Unlike namedtuple's own _make this applies the default, so queries
+        # that do not select photo_id (e.g. the export) still build rows
+        return cls(*iterable)
+
+    def to_dict(self):
+        """Serialise using the field names the frontend expects"""
+        data = {
+            'id': self.id,
+            'food_name': self.name,
+            'calories': self.calories,
+            'protein_g': self.protein,
+            'carbs_g': self.carbs,
+            'fat_g': self.fats,
+            'log_date': self.date_added.isoformat() if self.date_added else None
+        }
+        if self.photo_id:
+            data['photo_id'] = self.photo_id
+        return data
+
+
+class DailyTotals(namedtuple('DailyTotals', 'log_date calories protein carbs fats')):
+    __slots__ = ()
+
+
+class NutritionGoals(namedtuple('NutritionGoals', 'calories protein carbs fats updated_at')):
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            'calories': self.calories,
+            'protein': self.protein,
+            'carbs': self.carbs,
+            'fat': self.fats
+        }
+
+
+class Ingredient(namedtuple('Ingredient', 'id name basis calories protein carbs fats micronutrients')):
+    """Cached nutrition for one ingredient, per 100 g / 100 ml or per item (basis)"""
+    __slots__ = ()
+
+
+class Recipe(namedtuple('Recipe', 'id name servings calories protein carbs fats micronutrients '
+                                  'created_at updated_at')):
+    """A user's recipe with whole-recipe nutrition totals"""
+    __slots__ = ()
+
+    def to_dict(self):
+        totals = {'calories': self.calories, 'protein_g': self.protein, 'carbs_g': self.carbs, 'fat_g': self.fats}
+        return {
+            'id': self.id,
+            'name': self.name,
+            'servings': self.servings,
+            'totals': totals,
+            'per_serving': {key: round(value / self.servings, 1) for key, value in totals.items()},
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class RecipeIngredient(namedtuple('RecipeIngredient', 'position name quantity unit amount basis '
+                                                      'calories protein carbs fats micronutrients')):
+    """An ingredient line of a recipe joined with its cached nutrition (per basis)"""
+    __slots__ = ()
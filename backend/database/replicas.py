@@ -0,0 +1,216 @@
+"""
+Routing of read-only queries to optional Postgres read replicas.
+
+Replicas are used round-robin. A replica is skipped when it cannot be
+reached or its replay lag exceeds REPLICA_MAX_LAG_SECONDS, in which case the
+primary serves the read. After a successful request to a view marked with
+@records_write, the client is pinned to the primary for
+READ_YOUR_WRITES_SECONDS so it never reads its own stale data. Other POSTs
+(login, analysis) do not change data the client reads back, so they do not pin.
+"""
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from functools import wraps
+
+import psycopg2
+from flask import g, request
+
+from backend.config import Config
+from backend.database.db_manager import PreparedConnection, checkout, release
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_COOKIE = 'nutrify_primary_until'
+
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class ReplicaConnection(PreparedConnection):
+    """Read-only, autocommit connection to a read replica"""
+    is_replica = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_session(readonly=True, autocommit=True)
+
+
+class _Replica:
+    __slots__ = ('dsn', 'down_until', 'lag', 'lag_checked_at')
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.down_until = 0.0
+        self.lag = None
+        self.lag_checked_at = 0.0
+
+
+class ReplicaRouter:
+    def __init__(self, primary_params, replica_dsns, max_lag=5.0, lag_check_interval=2.0,
+                 retry_after=30.0, sticky_seconds=10.0, connect_timeout=2):
+        self.primary_params = primary_params
+        self.replicas = [_Replica(dsn) for dsn in replica_dsns]
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.retry_after = retry_after
+        self.sticky_seconds = sticky_seconds
+        self.connect_timeout = connect_timeout
+
+        self._round_robin = itertools.count()
+        self._recent_writes = {}
+        self._lock = threading.Lock()
+
+    def get_primary_connection(self):
+        """Check out a connection to the primary"""
+        return checkout(self.primary_params)
+
+    def record_write(self, client_key):
+        """Pin a client to the primary for the read-your-writes window"""
+        if not client_key or not self.sticky_seconds:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[client_key] = now + self.sticky_seconds
+            # Drop expired entries so the map stays proportional to active writers
+            if len(self._recent_writes) > 10000:
+                self._recent_writes = {key: until for key, until in self._recent_writes.items() if until > now}
+
+    def is_pinned(self, client_key):
+        if not client_key:
+            return False
+        until = self._recent_writes.get(client_key)
+        return until is not None and until > time.monotonic()
+
+    def get_read_connection(self, client_key=None, pinned=False):
+        """
+        Check out a connection for read-only queries: a healthy replica when
+        one is available, otherwise the primary
+        """
+        if not self.replicas or pinned or self.is_pinned(client_key):
+            return self.get_primary_connection()
+
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._round_robin) % len(self.replicas)]
+            now = time.monotonic()
+            if replica.down_until > now:
+                continue
+
+            try:
+                conn = checkout({'dsn': replica.dsn, 'connect_timeout': self.connect_timeout},
+                                ReplicaConnection)
+            except psycopg2.Error as e:
+                logger.warning("Replica unavailable, skipping for %ss: %s", self.retry_after, e)
+                replica.down_until = now + self.retry_after
+                continue
+
+            try:
+                if now - replica.lag_checked_at >= self.lag_check_interval:
+                    cur = conn.cursor()
+                    cur.execute(LAG_QUERY)
+                    replica.lag = float(cur.fetchone()[0])
+                    replica.lag_checked_at = now
+                    cur.close()
+            except psycopg2.Error as e:
+                logger.warning("Replica lag check failed: %s", e)
+                replica.down_until = now + self.retry_after
+                release(conn, discard=True)
+                continue
+
+            if replica.lag is not None and replica.lag > self.max_lag:
+                release(conn)
+                continue
+
+            return conn
+
+        return self.get_primary_connection()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Return the process-wide router, built from Config on first use"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ReplicaRouter(
+                    Config.get_db_connection_params(),
+                    Config.DATABASE_REPLICA_URLS,
+                    max_lag=Config.REPLICA_MAX_LAG_SECONDS,
+                    lag_check_interval=Config.REPLICA_LAG_CHECK_INTERVAL,
+                    retry_after=Config.REPLICA_RETRY_AFTER,
+                    sticky_seconds=Config.READ_YOUR_WRITES_SECONDS,
+                )
+    return _router
+
+
+def client_key_for_token(token):
+    """Key used to track a client's recent writes without keeping raw tokens in memory"""
+    if not token:
+        return None
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+def _request_token():
+    # Imported here: backend.utils.auth imports this module
+    from backend.utils.auth import get_bearer_token
+    return get_bearer_token()
+
+
+def _pinned_by_cookie():
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def get_read_connection(token=None):
+    """Connection for the current request's read-only queries"""
+    token = token or _request_token()
+    return get_router().get_read_connection(client_key_for_token(token), pinned=_pinned_by_cookie())
+
+
+def is_replica_connection(conn):
+    return getattr(conn, 'is_replica', False)
+
+
+def records_write(f):
+    """Mark a view that changes the user's data, so the client reads it back from the primary"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.method in WRITE_METHODS:
+            g.recorded_write = True
+        return f(*args, **kwargs)
+
+    return decorated
+
+
+def mark_recent_write(response):
+    """
+    after_request hook: pin the client to the primary after a successful write
+    (a @records_write view).
+    The cookie carries the pin across gunicorn workers; the in-process map
+    covers API clients that do not keep cookies.
+    """
+    router = get_router()
+    if not router.replicas or not router.sticky_seconds:
+        return response
+    if not g.get('recorded_write') or response.status_code >= 400:
+        return response
+
+    router.record_write(client_key_for_token(_request_token()))
+    response.set_cookie(PRIMARY_COOKIE, str(int(time.time() + router.sticky_seconds) + 1),
+                        max_age=int(router.sticky_seconds) + 1, httponly=True, samesite='Lax')
+    return response
@@ -0,0 +1,717 @@
+"""
+Data access for users, tokens, food logs and goals.
+
+Hot statements are prepared once per connection (server-side PREPARE) and
+then run with EXECUTE, so Postgres does not re-parse and re-plan them on
+every request. Pooled connections keep their prepared statements between
+checkouts.
+"""
+import re
+import time
+
+from psycopg2.extras import execute_values
+
+from backend.database.models import (
+    DailyTotals, FoodLog, Ingredient, NutritionGoals, Recipe, RecipeIngredient, User, UserCredentials
+)
+from backend.database.instrumentation import prepared_sql
+from backend.utils.metrics import DB_QUERY_LATENCY
+
+
+class Statement:
+    """A SQL statement that is prepared on first use on each connection"""
+    __slots__ = ('name', 'sql', 'execute_sql')
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+        prepared_sql[name] = sql
+        param_count = max((int(n) for n in re.findall(r'\$(\d+)', sql)), default=0)
+        if param_count:
+            self.execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * param_count)})"
+        else:
+            self.execute_sql = f"EXECUTE {name}"
+
+
+def execute(conn, statement, params=()):
+    """Run a prepared statement, preparing it on this connection first if needed"""
+    cur = conn.cursor()
+    prepared = getattr(conn, 'prepared_statements', None)
+
+    if prepared is None:
+        # Connections not created through db_manager can't track prepared statements
+        cur.execute(re.sub(r'\$\d+', '%s', statement.sql), params)
+        return cur
+
+    started = time.perf_counter()
+    if statement.name not in prepared:
+        cur.execute(f"PREPARE {statement.name} AS {statement.sql}")
+        prepared.add(statement.name)
+    cur.execute(statement.execute_sql, params)
+    DB_QUERY_LATENCY.labels(statement.name).observe(time.perf_counter() - started)
+    return cur
+
+
+def _fetchone(conn, statement, params=()):
+    cur = execute(conn, statement, params)
+    try:
+        return cur.fetchone()
+    finally:
+        cur.close()
+
+
+def _fetchall(conn, statement, params=()):
+    cur = execute(conn, statement, params)
+    try:
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+
+# Users and tokens
+
+USER_BY_TOKEN = Statement('user_by_token', """
+    SELECT u.id, u.username, u.email, u.created_at, u.data_version
+    FROM users u
+    JOIN user_tokens t ON u.id = t.user_id
+    WHERE t.token = $1
+""")
+
+CREDENTIALS_BY_EMAIL = Statement('credentials_by_email', """
+    SELECT id, username, password_hash FROM users WHERE email = $1
+""")
+
+USER_EXISTS = Statement('user_exists', """
+    SELECT EXISTS (SELECT 1 FROM users WHERE username = $1 OR email = $2)
+""")
+
+INSERT_USER = Statement('insert_user', """
+    INSERT INTO users (username, email, password_hash) VALUES ($1, $2, $3) RETURNING id
+""")
+
+INSERT_TOKEN = Statement('insert_token', """
+    INSERT INTO user_tokens (user_id, token) VALUES ($1, $2) RETURNING token
+""")
+
+
+DATA_VERSION = Statement('data_version', """
+    SELECT data_version FROM users WHERE id = $1
+""")
+
+# Row lock on the user serialises concurrent writers, so versions never repeat
+BUMP_DATA_VERSION = Statement('bump_data_version', """
+    UPDATE users SET data_version = data_version + $2 WHERE id = $1 RETURNING data_version
+""")
+
+
+def get_user_by_token(conn, token):
+    row = _fetchone(conn, USER_BY_TOKEN, (token,))
+    return User._make(row) if row else None
+
+
+def get_credentials_by_email(conn, email):
+    row = _fetchone(conn, CREDENTIALS_BY_EMAIL, (email,))
+    return UserCredentials._make(row) if row else None
+
+
+def user_exists(conn, username, email):
+    return _fetchone(conn, USER_EXISTS, (username, email))[0]
+
+
+def create_user(conn, username, email, password_hash):
+    return _fetchone(conn, INSERT_USER, (username, email, password_hash))[0]
+
+
+def create_token(conn, user_id, token):
+    return _fetchone(conn, INSERT_TOKEN, (user_id, token))[0]
+
+
+def get_data_version(conn, user_id):
+    return _fetchone(conn, DATA_VERSION, (user_id,))[0]
+
+
+def bump_data_version(conn, user_id, count=1):
+    """
+    Advance the user's data version by `count` and return the new version;
+    call in the same transaction as the change. The versions in between
+    are free for the caller to assign to individual changes.
+    """
+    return _fetchone(conn, BUMP_DATA_VERSION, (user_id, count))[0]
+
+
+# Food logs
+
+FOOD_LOGS_FOR_USER = Statement('food_logs_for_user', """
+    SELECT id, name, calories, protein, carbs, fats, date_added, photo_id
+    FROM food_logs
+    WHERE user_id = $1
+    ORDER BY date_added DESC
+""")
+
+# A range on the raw column (rather than DATE(...)) lets Postgres prune partitions
+FOOD_LOGS_FOR_DAY = Statement('food_logs_for_day', """
+    SELECT id, name, calories, protein, carbs, fats, date_added, photo_id
+    FROM food_logs
+    WHERE user_id = $1
+    AND date_added >= $2::date AND date_added < $2::date + 1
+    ORDER BY date_added DESC
+""")
+
+INSERT_FOOD_LOG = Statement('insert_food_log', """
+    INSERT INTO food_logs
+        (user_id, name, calories, protein, carbs, fats, date_added, micronutrients, allergens, photo_id)
+    VALUES ($1, $2, $3, $4, $5, $6, COALESCE($7::timestamptz, NOW()), $8, $9, $10)
+    RETURNING id, date_added
+""")
+
+DELETE_FOOD_LOG = Statement('delete_food_log', """
+    DELETE FROM food_logs WHERE id = $1 AND user_id = $2 RETURNING date_added
+""")
+
+DAILY_TOTALS = Statement('daily_totals', """
+    SELECT DATE(date_added) AS log_date,
+           SUM(calories), SUM(protein), SUM(carbs), SUM(fats)
+    FROM food_logs
+    WHERE user_id = $1
+    AND date_added BETWEEN $2 AND $3
+    GROUP BY DATE(date_added)
+    ORDER BY log_date ASC
+""")
+
+# Totals for a single day in one aggregate; the range keeps partition pruning
+DAY_TOTALS = Statement('day_totals', """
+    SELECT COALESCE(SUM(calories), 0), COALESCE(SUM(protein), 0),
+           COALESCE(SUM(carbs), 0), COALESCE(SUM(fats), 0), COUNT(*)
+    FROM food_logs
+    WHERE user_id = $1
+    AND date_added >= $2::date AND date_added < $2::date + 1
+""")
+
+# Whole-history daily totals: days compacted out of food_logs by partition
+# retention come from food_log_daily_summaries, the rest from the live table
+DAILY_SERIES = Statement('daily_series', """
+    SELECT day, SUM(calories), SUM(protein), SUM(carbs), SUM(fats)
+    FROM (
+        SELECT day, calories, protein, carbs, fats
+        FROM food_log_daily_summaries
+        WHERE user_id = $1
+        UNION ALL
+        SELECT DATE(date_added), calories, protein, carbs, fats
+        FROM food_logs
+        WHERE user_id = $1
+    ) days
+    GROUP BY day
+    ORDER BY day
+""")
+
+# Each array element is unnested with its position, so any subset of
+# nutrients is summed in one pass
+MICRONUTRIENT_TOTALS = Statement('micronutrient_totals', """
+    SELECT n.idx, SUM(n.amount)
+    FROM food_logs f
+    CROSS JOIN LATERAL unnest(f.micronutrients) WITH ORDINALITY AS n(amount, idx)
+    WHERE f.user_id = $1
+    AND f.date_added >= $2 AND f.date_added < $3
+    AND n.idx = ANY($4)
+    GROUP BY n.idx
+""")
+
+MICRONUTRIENT_DAILY_TOTALS = Statement('micronutrient_daily_totals', """
+    SELECT DATE(f.date_added) AS log_date, n.idx, SUM(n.amount)
+    FROM food_logs f
+    CROSS JOIN LATERAL unnest(f.micronutrients) WITH ORDINALITY AS n(amount, idx)
+    WHERE f.user_id = $1
+    AND f.date_added >= $2 AND f.date_added < $3
+    AND n.idx = ANY($4)
+    GROUP BY log_date, n.idx
+""")
+
+# Server-side cursors can't DECLARE over EXECUTE, so the export runs plain
+# SQL. The NULL checks fold away at plan time, keeping partition pruning.
+EXPORT_FOOD_LOGS_SQL = """
+    SELECT id, name, calories, protein, carbs, fats, date_added
+    FROM food_logs
+    WHERE user_id = %(user_id)s
+    AND (%(start)s::timestamp IS NULL OR date_added >= %(start)s::timestamp)
+    AND (%(end)s::timestamp IS NULL OR date_added < %(end)s::timestamp)
+    ORDER BY date_added, id
+"""
+
+# Several logs and their change records in one round trip. Ids are drawn up
+# front so each change row can reference its log; rows are expanded by
+# execute_values, which has no prepared-statement form.
+INSERT_FOOD_LOGS_SQL = """
+    WITH entries (version, user_id, name, calories, protein, carbs, fats, logged_at, micronutrients, allergens,
+                  photo_id) AS (
+        VALUES %s
+    ),
+    numbered AS (
+        SELECT nextval('food_logs_id_seq') AS id, COALESCE(logged_at, LOCALTIMESTAMP) AS date_added, entries.*
+        FROM entries
+    ),
+    logs AS (
+        INSERT INTO food_logs
+            (id, user_id, name, calories, protein, carbs, fats, date_added, micronutrients, allergens, photo_id)
+        SELECT id, user_id, name, calories, protein, carbs, fats, date_added, micronutrients, allergens, photo_id
+        FROM numbered
+    ),
+    changes AS (
+        INSERT INTO food_log_changes (user_id, version, op, log_id, logged_at)
+        SELECT user_id, version, 'insert', id, date_added
+        FROM numbered
+    )
+    SELECT id FROM numbered ORDER BY version
+"""
+
+INSERT_FOOD_LOGS_ROW = (
+    "(%s::integer, %s::integer, %s, %s::integer, %s::float, %s::float, %s::float, "
+    "%s::timestamptz::timestamp, %s::real[], %s::text[], %s::varchar)"
+)
+
+
+def get_food_logs(conn, user_id, day=None):
+    """Return a user's food logs, newest first, optionally for one day (YYYY-MM-DD)"""
+    if day:
+        rows = _fetchall(conn, FOOD_LOGS_FOR_DAY, (user_id, day))
+    else:
+        rows = _fetchall(conn, FOOD_LOGS_FOR_USER, (user_id,))
+    return [FoodLog._make(row) for row in rows]
+
+
+def add_food_log(conn, user_id, name, calories, protein, carbs, fats,
+                 logged_at=None, micronutrients=None, allergens=None, version=None, client_id=None, photo_id=None):
+    """
+    Insert a food log and return its id. Pass the data version reserved for
+    the insert to record it in the change log for /api/sync.
+    """
+    log_id, date_added = _fetchone(conn, INSERT_FOOD_LOG, (
+        user_id, name, calories, protein, carbs, fats, logged_at, micronutrients, allergens, photo_id
+    ))
+    if version is not None:
+        _execute_change(conn, user_id, version, 'insert', log_id, date_added, client_id)
+    return log_id
+
+
+def add_food_logs(conn, user_id, entries, first_version):
+    """
+    Insert several food logs with a single statement and return their ids in
+    order. `entries` are (name, calories, protein, carbs, fats, logged_at,
+    micronutrients, allergens, photo_id); the caller reserves one data version per
+    entry, starting at `first_version`.
+    """
+    if not entries:
+        return []
+    with conn.cursor() as cur:
+        rows = execute_values(
+            cur, INSERT_FOOD_LOGS_SQL,
+            [(version, user_id, *entry) for version, entry in enumerate(entries, start=first_version)],
+            template=INSERT_FOOD_LOGS_ROW, page_size=len(entries), fetch=True
+        )
+    return [row[0] for row in rows]
+
+
+def delete_food_log(conn, log_id, user_id):
+    """
+    Delete a user's food log, bumping their data version and recording a
+    tombstone. Returns False if the log did not exist or is not theirs.
+    """
+    row = _fetchone(conn, DELETE_FOOD_LOG, (log_id, user_id))
+    if row is None:
+        return False
+    version = bump_data_version(conn, user_id)
+    _execute_change(conn, user_id, version, 'delete', log_id, row[0])
+    return True
+
+
+def get_daily_totals(conn, user_id, start, end):
+    return [DailyTotals._make(row) for row in _fetchall(conn, DAILY_TOTALS, (user_id, start, end))]
+
+
+def get_day_totals(conn, user_id, day):
+    """Return (calories, protein, carbs, fats, entries) logged on `day`"""
+    return _fetchone(conn, DAY_TOTALS, (user_id, day))
+
+
+def get_daily_series(conn, user_id):
+    """Rows of (day, calories, protein, carbs, fats) for every day the user logged food"""
+    return _fetchall(conn, DAILY_SERIES, (user_id,))
+
+
+def get_micronutrient_totals(conn, user_id, start, end, indexes, by_day=False):
+    """Rows of (idx, total) or, with by_day, (log_date, idx, total) for array positions `indexes`"""
+    statement = MICRONUTRIENT_DAILY_TOTALS if by_day else MICRONUTRIENT_TOTALS
+    return _fetchall(conn, statement, (user_id, start, end, indexes))
+
+
+def iter_food_logs(conn, user_id, start=None, end=None, batch_size=2000):
+    """
+    Yield all of a user's food logs, oldest first, through a named cursor so
+    only `batch_size` rows are held in memory. Requires a transaction.
+    """
+    cur = conn.cursor(name='food_log_export')
+    cur.itersize = batch_size
+    try:
+        cur.execute(EXPORT_FOOD_LOGS_SQL, {'user_id': user_id, 'start': start, 'end': end})
+        for row in cur:
+            yield FoodLog._make(row)
+    finally:
+        cur.close()
+
+
+# Food log search
+
+# Plain SQL rather than a prepared statement: how many rows a query matches
+# depends entirely on its words and dates, and a cached generic plan picked
+# for one query was several times slower for others. Planned per call, the
+# query text and the NULL checks fold to constants, keeping partition pruning.
+# Matches are ranked by ts_rank_cd (plus trigram word similarity when pg_trgm
+# is installed), rounded to a numeric so the keyset cursor compares exactly;
+# pages continue after the (rank, date_added, id) of the previous page's last row.
+SEARCH_FOOD_LOGS_SQL = """
+    SELECT id, name, calories, protein, carbs, fats, date_added, photo_id, rank
+    FROM (
+        SELECT f.id, f.name, f.calories, f.protein, f.carbs, f.fats, f.date_added, f.photo_id,
+               round(({rank})::numeric, 6) AS rank
+        FROM food_logs f
+        WHERE f.user_id = %(user_id)s
+        AND ({match})
+        AND (%(start)s::timestamp IS NULL OR f.date_added >= %(start)s::timestamp)
+        AND (%(end)s::timestamp IS NULL OR f.date_added < %(end)s::timestamp)
+    ) hits
+    WHERE %(after_rank)s::numeric IS NULL
+    OR (rank, date_added, id) < (%(after_rank)s::numeric, %(after_date)s::timestamp, %(after_id)s::integer)
+    ORDER BY rank DESC, date_added DESC, id DESC
+    LIMIT %(limit)s
+"""
+
+SEARCH_FOOD_LOGS = SEARCH_FOOD_LOGS_SQL.format(
+    rank="ts_rank_cd(f.name_search, to_tsquery('english', %(tsquery)s))",
+    match="f.name_search @@ to_tsquery('english', %(tsquery)s)"
+)
+
+SEARCH_FOOD_LOGS_FUZZY = SEARCH_FOOD_LOGS_SQL.format(
+    rank="ts_rank_cd(f.name_search, to_tsquery('english', %(tsquery)s)) + word_similarity(%(text)s, f.name)",
+    match="f.name_search @@ to_tsquery('english', %(tsquery)s) OR %(text)s <%% f.name"
+)
+
+HAS_TRIGRAM_SEARCH = Statement('has_trigram_search', """
+    SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')
+""")
+
+
+def has_trigram_search(conn):
+    """Whether pg_trgm is installed, enabling typo-tolerant search"""
+    return _fetchone(conn, HAS_TRIGRAM_SEARCH)[0]
+
+
+def search_food_logs(conn, user_id, tsquery, text, start, end, after, limit, fuzzy=False):
+    """
+    A page of a user's food logs matching `tsquery` (or, with fuzzy, similar
+    to `text`) and logged in [start, end), best first, as (FoodLog, rank).
+    `after` is the (rank, date_added, id) of the previous page's last row.
+    """
+    after_rank, after_date, after_id = after or (None, None, None)
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(SEARCH_FOOD_LOGS_FUZZY if fuzzy else SEARCH_FOOD_LOGS, {
+            'user_id': user_id, 'tsquery': tsquery, 'text': text, 'start': start, 'end': end,
+            'after_rank': after_rank, 'after_date': after_date, 'after_id': after_id, 'limit': limit
+        })
+        rows = cur.fetchall()
+    DB_QUERY_LATENCY.labels('search_food_logs').observe(time.perf_counter() - started)
+    return [(FoodLog._make(row[:-1]), row[-1]) for row in rows]
+
+
+# Change log for offline sync
+
+INSERT_FOOD_LOG_CHANGE = Statement('insert_food_log_change', """
+    INSERT INTO food_log_changes (user_id, version, op, log_id, logged_at, client_id)
+    VALUES ($1, $2, $3, $4, $5, $6)
+""")
+
+# Inserts are joined back to the log on its full primary key; logs deleted
+# since then come back without a name and are skipped by the caller
+FOOD_LOG_CHANGES_SINCE = Statement('food_log_changes_since', """
+    SELECT c.version, c.op, c.log_id, c.client_id,
+           f.id, f.name, f.calories, f.protein, f.carbs, f.fats, f.date_added, f.photo_id
+    FROM food_log_changes c
+    LEFT JOIN food_logs f
+        ON c.op = 'insert' AND f.id = c.log_id AND f.date_added = c.logged_at
+    WHERE c.user_id = $1 AND c.version > $2
+    ORDER BY c.version
+    LIMIT $3
+""")
+
+SEEN_CLIENT_IDS = Statement('seen_client_ids', """
+    SELECT client_id, log_id FROM food_log_changes
+    WHERE user_id = $1 AND client_id = ANY($2)
+""")
+
+
+def _execute_change(conn, user_id, version, op, log_id, logged_at, client_id=None):
+    execute(conn, INSERT_FOOD_LOG_CHANGE, (user_id, version, op, log_id, logged_at, client_id)).close()
+
+
+def get_food_log_changes(conn, user_id, since, limit):
+    """Changes after version `since`, oldest first, as (version, op, log_id, client_id, FoodLog or None)"""
+    return [
+        (version, op, log_id, client_id, FoodLog._make(log) if log[0] is not None else None)
+        for version, op, log_id, client_id, *log in _fetchall(conn, FOOD_LOG_CHANGES_SINCE, (user_id, since, limit))
+    ]
+
+
+def get_seen_client_ids(conn, user_id, client_ids):
+    """Map of client id to log id for offline entries that were already stored"""
+    return dict(_fetchall(conn, SEEN_CLIENT_IDS, (user_id, client_ids)))
+
+
+# Goals
+
+GOALS_FOR_USER = Statement('goals_for_user', """
+    SELECT calories, protein, carbs, fats, updated_at
+    FROM nutrition_goals
+    WHERE user_id = $1
+""")
+
+UPSERT_GOALS = Statement('upsert_goals', """
+    INSERT INTO nutrition_goals (user_id, calories, protein, carbs, fats, updated_at)
+    VALUES ($1, $2, $3, $4, $5, NOW())
+    ON CONFLICT (user_id) DO UPDATE SET
+        calories = EXCLUDED.calories,
+        protein = EXCLUDED.protein,
+        carbs = EXCLUDED.carbs,
+        fats = EXCLUDED.fats,
+        updated_at = EXCLUDED.updated_at
+    RETURNING calories, protein, carbs, fats, updated_at
+""")
+
+
+def get_goals(conn, user_id):
+    row = _fetchone(conn, GOALS_FOR_USER, (user_id,))
+    return NutritionGoals._make(row) if row else None
+
+
+def save_goals(conn, user_id, calories, protein, carbs, fats):
+    return NutritionGoals._make(_fetchone(conn, UPSERT_GOALS, (user_id, calories, protein, carbs, fats)))
+
+
+# Rate limiting
+
+# Refill and take in one statement. The bucket belongs to the token's user
+# when the token is valid, so made-up tokens fall back to the client IP.
+# A denied request leaves the refilled tokens in place.
+TAKE_RATE_LIMIT_TOKEN = Statement('take_rate_limit_token', """
+    INSERT INTO rate_limit_buckets AS b (scope, key, tokens, allowed, updated_at)
+    SELECT $1, COALESCE((SELECT 'user:' || user_id FROM user_tokens WHERE token = $2), 'ip:' || $3),
+           $4::float - 1, TRUE, LOCALTIMESTAMP
+    ON CONFLICT (scope, key) DO UPDATE SET
+        tokens = LEAST($4::float, b.tokens + EXTRACT(EPOCH FROM LOCALTIMESTAMP - b.updated_at) * $5::float)
+                 - CASE WHEN LEAST($4::float, b.tokens + EXTRACT(EPOCH FROM LOCALTIMESTAMP - b.updated_at) * $5::float) >= 1
+                        THEN 1 ELSE 0 END,
+        allowed = LEAST($4::float, b.tokens + EXTRACT(EPOCH FROM LOCALTIMESTAMP - b.updated_at) * $5::float) >= 1,
+        updated_at = LOCALTIMESTAMP
+    RETURNING allowed, tokens, key
+""")
+
+# Buckets idle this long have refilled completely, so dropping them is free
+PRUNE_RATE_LIMIT_BUCKETS = Statement('prune_rate_limit_buckets', """
+    DELETE FROM rate_limit_buckets WHERE updated_at < LOCALTIMESTAMP - $1 * INTERVAL '1 second'
+""")
+
+
+def take_rate_limit_token(conn, scope, token, ip, capacity, rate):
+    """
+    Take one token from the caller's bucket, refilling `rate` tokens per
+    second up to `capacity`. Returns (allowed, tokens left, bucket key), where
+    the key is 'user:<id>' for a valid token and 'ip:<address>' otherwise.
+    """
+    return _fetchone(conn, TAKE_RATE_LIMIT_TOKEN, (scope, token, ip, capacity, rate))
+
+
+def prune_rate_limit_buckets(conn, idle_seconds):
+    execute(conn, PRUNE_RATE_LIMIT_BUCKETS, (idle_seconds,)).close()
+
+
+# Gemini usage accounting
+
+# Rows come from execute_values; sorted keys keep concurrent flushes from
+# deadlocking on each other's rows
+UPSERT_GEMINI_USAGE_SQL = """
+    INSERT INTO gemini_usage AS u
+        (day, user_id, endpoint, operation, model, calls, errors,
+         prompt_tokens, response_tokens, request_bytes, response_bytes, latency_ms)
+    VALUES %s
+    ON CONFLICT (day, user_id, endpoint, operation, model) DO UPDATE SET
+        calls = u.calls + EXCLUDED.calls,
+        errors = u.errors + EXCLUDED.errors,
+        prompt_tokens = u.prompt_tokens + EXCLUDED.prompt_tokens,
+        response_tokens = u.response_tokens + EXCLUDED.response_tokens,
+        request_bytes = u.request_bytes + EXCLUDED.request_bytes,
+        response_bytes = u.response_bytes + EXCLUDED.response_bytes,
+        latency_ms = u.latency_ms + EXCLUDED.latency_ms
+"""
+
+USAGE_FOR_USER_DAY = Statement('usage_for_user_day', """
+    SELECT COALESCE(SUM(calls), 0), COALESCE(SUM(prompt_tokens + response_tokens), 0)
+    FROM gemini_usage
+    WHERE day = $1 AND user_id = $2
+""")
+
+USAGE_TOTALS_COLUMNS = """
+    SUM(calls), SUM(errors), SUM(prompt_tokens), SUM(response_tokens),
+    SUM(request_bytes), SUM(response_bytes), ROUND(SUM(latency_ms)::numeric / NULLIF(SUM(calls), 0))
+"""
+
+USAGE_BY_DAY = Statement('usage_by_day', f"""
+    SELECT day, {USAGE_TOTALS_COLUMNS}
+    FROM gemini_usage WHERE day >= $1
+    GROUP BY day ORDER BY day
+""")
+
+USAGE_BY_ENDPOINT = Statement('usage_by_endpoint', f"""
+    SELECT endpoint, operation, model, {USAGE_TOTALS_COLUMNS}
+    FROM gemini_usage WHERE day >= $1
+    GROUP BY endpoint, operation, model ORDER BY SUM(calls) DESC
+""")
+
+USAGE_TOP_USERS = Statement('usage_top_users', f"""
+    SELECT g.user_id, u.username, {USAGE_TOTALS_COLUMNS}
+    FROM gemini_usage g
+    LEFT JOIN users u ON u.id = g.user_id
+    WHERE g.day >= $1
+    GROUP BY g.user_id, u.username
+    ORDER BY SUM(g.prompt_tokens + g.response_tokens) DESC, SUM(g.calls) DESC
+    LIMIT $2
+""")
+
+
+def add_gemini_usage(conn, rows):
+    """Add aggregated usage rows of (day, user_id, endpoint, operation, model, *counters)"""
+    with conn.cursor() as cur:
+        execute_values(cur, UPSERT_GEMINI_USAGE_SQL, sorted(rows), page_size=1000)
+
+
+def get_user_usage(conn, day, user_id):
+    """Return (calls, tokens) used by a user on `day`"""
+    return _fetchone(conn, USAGE_FOR_USER_DAY, (day, user_id))
+
+
+def get_usage_report(conn, since, top_users=20):
+    """Usage since `since` by day, by endpoint and for the heaviest users"""
+    return (
+        _fetchall(conn, USAGE_BY_DAY, (since,)),
+        _fetchall(conn, USAGE_BY_ENDPOINT, (since,)),
+        _fetchall(conn, USAGE_TOP_USERS, (since, top_users))
+    )
+
+
+# Recipes and the shared ingredient cache
+
+INGREDIENTS_BY_KEY = Statement('ingredients_by_key', """
+    SELECT id, name, basis, calories, protein, carbs, fats, micronutrients
+    FROM ingredient_nutrition
+    WHERE (name, basis) IN (SELECT * FROM unnest($1::text[], $2::text[]))
+""")
+
+# Two recipes analysing the same new ingredient at once keep the first result
+INSERT_INGREDIENT = Statement('insert_ingredient', """
+    INSERT INTO ingredient_nutrition (name, basis, calories, protein, carbs, fats, micronutrients)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+    ON CONFLICT (name, basis) DO NOTHING
+""")
+
+RECIPE_COLUMNS = "id, name, servings, calories, protein, carbs, fats, micronutrients, created_at, updated_at"
+
+INSERT_RECIPE = Statement('insert_recipe', f"""
+    INSERT INTO recipes (user_id, name, servings, calories, protein, carbs, fats, micronutrients)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    RETURNING {RECIPE_COLUMNS}
+""")
+
+UPDATE_RECIPE = Statement('update_recipe', f"""
+    UPDATE recipes
+    SET name = $3, servings = $4, calories = $5, protein = $6, carbs = $7, fats = $8,
+        micronutrients = $9, updated_at = NOW()
+    WHERE id = $1 AND user_id = $2
+    RETURNING {RECIPE_COLUMNS}
+""")
+
+RECIPES_FOR_USER = Statement('recipes_for_user', f"""
+    SELECT {RECIPE_COLUMNS} FROM recipes WHERE user_id = $1 ORDER BY updated_at DESC
+""")
+
+RECIPE_BY_ID = Statement('recipe_by_id', f"""
+    SELECT {RECIPE_COLUMNS} FROM recipes WHERE id = $1 AND user_id = $2
+""")
+
+DELETE_RECIPE = Statement('delete_recipe', """
+    DELETE FROM recipes WHERE id = $1 AND user_id = $2 RETURNING id
+""")
+
+DELETE_RECIPE_INGREDIENTS = Statement('delete_recipe_ingredients', """
+    DELETE FROM recipe_ingredients WHERE recipe_id = $1
+""")
+
+INSERT_RECIPE_INGREDIENT = Statement('insert_recipe_ingredient', """
+    INSERT INTO recipe_ingredients (recipe_id, position, name, quantity, unit, amount, ingredient_id)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+""")
+
+RECIPE_INGREDIENTS = Statement('recipe_ingredients', """
+    SELECT ri.position, ri.name, ri.quantity, ri.unit, ri.amount, i.basis,
+           i.calories, i.protein, i.carbs, i.fats, i.micronutrients
+    FROM recipe_ingredients ri
+    LEFT JOIN ingredient_nutrition i ON i.id = ri.ingredient_id
+    WHERE ri.recipe_id = $1
+    ORDER BY ri.position
+""")
+
+
+def get_ingredients(conn, keys):
+    """Cached ingredients for a list of (name, basis) keys, as a dict keyed the same way"""
+    if not keys:
+        return {}
+    names, bases = zip(*keys)
+    rows = _fetchall(conn, INGREDIENTS_BY_KEY, (list(names), list(bases)))
+    return {(row[1], row[2]): Ingredient._make(row) for row in rows}
+
+
+def save_ingredient(conn, name, basis, calories, protein, carbs, fats, micronutrients):
+    execute(conn, INSERT_INGREDIENT, (name, basis, calories, protein, carbs, fats, micronutrients)).close()
+
+
+def save_recipe(conn, user_id, recipe_id, name, servings, totals, micronutrients, lines):
+    """
+    Create a recipe (recipe_id None) or replace an existing one, with its
+    ingredient lines of (name, quantity, unit, amount, ingredient_id).
+    Returns the Recipe, or None if recipe_id is not one of the user's.
+    """
+    if recipe_id is None:
+        row = _fetchone(conn, INSERT_RECIPE, (user_id, name, servings, *totals, micronutrients))
+    else:
+        row = _fetchone(conn, UPDATE_RECIPE, (recipe_id, user_id, name, servings, *totals, micronutrients))
+        if row is None:
+            return None
+        execute(conn, DELETE_RECIPE_INGREDIENTS, (recipe_id,)).close()
+
+    recipe = Recipe._make(row)
+    for position, line in enumerate(lines, start=1):
+        execute(conn, INSERT_RECIPE_INGREDIENT, (recipe.id, position, *line)).close()
+    return recipe
+
+
+def get_recipes(conn, user_id):
+    return [Recipe._make(row) for row in _fetchall(conn, RECIPES_FOR_USER, (user_id,))]
+
+
+def get_recipe(conn, user_id, recipe_id):
+    row = _fetchone(conn, RECIPE_BY_ID, (recipe_id, user_id))
+    return Recipe._make(row) if row else None
+
+
+def get_recipe_ingredients(conn, recipe_id):
+    return [RecipeIngredient._make(row) for row in _fetchall(conn, RECIPE_INGREDIENTS, (recipe_id,))]
+
+
+def delete_recipe(conn, user_id, recipe_id):
+    return _fetchone(conn, DELETE_RECIPE, (recipe_id, user_id)) is not None
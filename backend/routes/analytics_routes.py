@@ -0,0 +1,29 @@
+import logging
+from flask import Blueprint, request, jsonify
+from backend.services.analytics_service import AnalyticsService
+from backend.utils.auth import token_required
+from backend.utils.caching import data_etag, not_modified, with_etag
+
+analytics_routes = Blueprint('analytics_routes', __name__)
+logger = logging.getLogger(__name__)
+
+@analytics_routes.route('/api/analytics/summary', methods=['GET'])
+@token_required
+def get_summary(current_user):
+    """Rolling averages, week-over-week changes, streaks, macro ratios and variability"""
+    days = request.args.get('days', 90, type=int)
+    if not 7 <= days <= 3650:
+        return jsonify({'error': 'days must be between 7 and 3650'}), 400
+
+    etag = data_etag(current_user)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    try:
+        summary = AnalyticsService().get_summary(current_user, days)
+    except Exception as e:
+        logger.exception("Error in analytics summary")
+        return jsonify({'error': str(e)}), 500
+
+    return with_etag(jsonify(summary), etag), 200
@@ -1,60 +1,33 @@
-from flask import Blueprint, request, jsonify, current_app, render_template
+import logging
+from flask import Blueprint, request, jsonify, render_template, Response, stream_with_context
 from backend.services.gemini_service import GeminiService
 import os
 from datetime import datetime, timedelta
-from functools import wraps
-import psycopg2
+import csv
+import io
+import json
 from backend.config import Config
+from backend.database import repository
+from backend.database.db_manager import db_connection, read_snapshot, release
+from backend.database.replicas import get_read_connection, records_write
+from backend.routes.photo_routes import save_uploaded_photo
+from backend.services.photo_store import PhotoError, is_photo_id, photo_store
+from backend.services.search_service import SearchError, search_food_logs as run_food_search
+from backend.utils.auth import authenticate, get_bearer_token, token_required
+from backend.utils.caching import data_etag, not_modified, with_etag
+from backend.utils.rate_limit import rate_limited, within_gemini_quota
+from backend.utils.nutrient_units import (
+    MICRONUTRIENT_INDEX, MICRONUTRIENT_NAMES, MICRONUTRIENT_UNITS, NutrientDataError,
+    build_micronutrient_vector, normalize_allergens
+)
 
 food_routes = Blueprint('food_routes', __name__)
-
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Missing or invalid token'}), 401
-        
-        token = auth_header.split(' ')[1]
-        
-        try:
-            # Get database connection
-            conn = get_db_connection()
-            cur = conn.cursor()
-            
-            # Get user from token
-            cur.execute("""
-                SELECT users.id, users.username, users.email
-                FROM users
-                JOIN user_tokens ON users.id = user_tokens.user_id
-                WHERE user_tokens.token = %s
-            """, (token,))
-            
-            user = cur.fetchone()
-            if not user:
-                return jsonify({'error': 'Invalid token'}), 401
-                
-            current_user = {
-                'id': user[0],
-                'username': user[1],
-                'email': user[2]
-            }
-            
-            return f(current_user, *args, **kwargs)
-            
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
-            
-        finally:
-            if cur:
-                cur.close()
-            if conn:
-                conn.close()
-    
-    return decorated
+logger = logging.getLogger(__name__)
 
 # Simplified routes without database dependencies
 @food_routes.route('/api/food/analyze-text', methods=['POST'])
+@rate_limited('analyze_text', 'RATE_LIMIT_ANALYZE_TEXT_BURST', 'RATE_LIMIT_ANALYZE_TEXT_PER_MINUTE')
+@within_gemini_quota
 def analyze_text():
     """Endpoint to analyze food based on text description"""
     data = request.json
@@ -78,11 +51,13 @@ def analyze_text():
             return jsonify({"error": result["error"]}), 500
     
     except Exception as e:
-        print(f"Error analyzing text: {str(e)}")
+        logger.exception("Error analyzing text")
         return jsonify({"error": str(e)}), 500
     
 
 @food_routes.route('/api/food/analyze-image', methods=['POST'])
+@rate_limited('analyze_image', 'RATE_LIMIT_ANALYZE_IMAGE_BURST', 'RATE_LIMIT_ANALYZE_IMAGE_PER_MINUTE')
+@within_gemini_quota
 def analyze_image():
     """Endpoint to analyze food from an uploaded image"""
     if 'image' not in request.files:
@@ -106,23 +81,66 @@ def analyze_image():
         result = gemini_service.analyze_food_image(file)
         
         if result["success"]:
+            # Signed-in users keep the photo, to attach to the logs they save
+            photo_id = _keep_photo(file)
+            if photo_id:
+                result["photo_id"] = photo_id
             return jsonify(result), 200
         else:
             return jsonify({"error": result["error"]}), 500
     
     except Exception as e:
-        print(f"Error analyzing image: {str(e)}")
+        logger.exception("Error analyzing image")
         return jsonify({"error": str(e)}), 500
     
 
 
+def _keep_photo(file):
+    """Store an analysed upload for a signed-in user; returns its photo id or None"""
+    token = get_bearer_token()
+    if not token:
+        return None
+    try:
+        if authenticate(token, read_only=True) is None:
+            return None
+        return save_uploaded_photo(file)
+    except PhotoError:
+        return None
+    except Exception:
+        # The analysis is still worth returning without the photo
+        logger.exception("Error storing analysed photo")
+        return None
+
+
+def _attached_photo(data):
+    """The photo_id of a food log payload, or raise PhotoError if it is not a stored photo"""
+    photo_id = data.get('photo_id')
+    if photo_id is None:
+        return None
+    if not is_photo_id(photo_id) or not photo_store.exists(photo_id):
+        raise PhotoError(f"Unknown photo_id {photo_id}")
+    return photo_id
+
+
+def _date_range_args():
+    """
+    The optional inclusive ?start= and ?end= dates (YYYY-MM-DD) as a
+    half-open (start, end) datetime range; raises ValueError if malformed
+    """
+    start_date = None
+    end_date = None
+    if request.args.get('start'):
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d')
+    if request.args.get('end'):
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d') + timedelta(days=1)
+    return start_date, end_date
+
+
 @food_routes.route('/capture', methods=['GET'])
 def capture():
     """Render the food capture page with camera functionality"""
     return render_template('food_capture.html')
 
-from datetime import datetime
-
 @food_routes.route('/')
 def index():
     """Render the main food analyzer page"""
@@ -156,26 +174,15 @@ def get_nutrition_history(current_user):
     else:  # month
         start_date = end_date - timedelta(days=30)
     
-    # Query food logs within date range
-    query = """
-        SELECT DATE(date_added) as log_date,
-               SUM(calories) as total_calories,
-               SUM(protein) as total_protein,
-               SUM(carbs) as total_carbs,
-               SUM(fats) as total_fat
-        FROM food_logs
-        WHERE user_id = %s 
-        AND date_added BETWEEN %s AND %s
-        GROUP BY DATE(date_added)
-        ORDER BY log_date ASC
-    """
+    # Unchanged since the client's copy: skip the aggregate entirely
+    etag = data_etag(current_user)
+    cached = not_modified(etag)
+    if cached:
+        return cached
     
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute(query, (current_user['id'], start_date, end_date))
-        results = cur.fetchall()
+        with db_connection(read_only=True) as conn:
+            results = repository.get_daily_totals(conn, current_user.id, start_date, end_date)
         
         # Prepare data for charts
         dates = []
@@ -186,7 +193,7 @@ def get_nutrition_history(current_user):
         
         # Fill in missing dates with zeros
         current_date = start_date
-        results_dict = {row[0].strftime('%Y-%m-%d'): row for row in results}
+        results_dict = {row.log_date.strftime('%Y-%m-%d'): row for row in results}
         
         while current_date <= end_date:
             date_str = current_date.strftime('%Y-%m-%d')
@@ -194,10 +201,10 @@ def get_nutrition_history(current_user):
             
             if date_str in results_dict:
                 row = results_dict[date_str]
-                calories.append(float(row[1]) if row[1] else 0)
-                protein.append(float(row[2]) if row[2] else 0)
-                carbs.append(float(row[3]) if row[3] else 0)
-                fat.append(float(row[4]) if row[4] else 0)
+                calories.append(float(row.calories) if row.calories else 0)
+                protein.append(float(row.protein) if row.protein else 0)
+                carbs.append(float(row.carbs) if row.carbs else 0)
+                fat.append(float(row.fats) if row.fats else 0)
             else:
                 calories.append(0)
                 protein.append(0)
@@ -206,157 +213,55 @@ def get_nutrition_history(current_user):
             
             current_date += timedelta(days=1)
         
-        return jsonify({
+        return with_etag(jsonify({
             'dates': dates,
             'calories': calories,
             'protein': protein,
             'carbs': carbs,
             'fat': fat
-        })
+        }), etag)
         
     except Exception as e:
-        print(f"Error in nutrition history: {str(e)}")
+        logger.exception("Error in nutrition history")
         return jsonify({'error': str(e)}), 500
-        
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
-
-    # Add this route to handle food logging
-
-from flask import request, jsonify
-import os
-import traceback
-
-def get_db_connection():
-    """Get database connection using configuration"""
-    try:
-        params = Config.get_db_connection_params()
-        if 'dsn' in params:
-            return psycopg2.connect(params['dsn'])
-        else:
-            return psycopg2.connect(**params)
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        raise
-
-# Update your food_logs function:
-
-# Update the food_logs function to use the correct column names
 
 @food_routes.route('/api/food-logs', methods=['POST', 'GET'])
-def food_logs():
-    # Get token from Authorization header
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'Missing or invalid token'}), 401
-    
-    token = auth_header.split(' ')[1]
-    conn = None
-    cur = None
-    
+@token_required
+@records_write
+def food_logs(current_user):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Get user ID from token
-        cur.execute("""
-            SELECT user_id FROM user_tokens WHERE token = %s
-        """, (token,))
-        
-        result = cur.fetchone()
-        if not result:
-            return jsonify({'error': 'Invalid token'}), 401
-            
-        user_id = result[0]
-        
-        # First, check if food_logs table exists
-        cur.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'food_logs'
-            )
-        """)
-        table_exists = cur.fetchone()[0]
-        
-        # Create the table if it doesn't exist
-        if not table_exists:
-            print("Creating food_logs table...")
-            cur.execute("""
-                CREATE TABLE food_logs (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                    name VARCHAR(100) NOT NULL,
-                    calories INTEGER,
-                    protein FLOAT,
-                    carbs FLOAT,
-                    fats FLOAT, 
-                    date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
-        
-        # Get the column names from the table
-        cur.execute("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name = 'food_logs'
-        """)
-        
-        columns = [row[0] for row in cur.fetchall()]
-        print(f"Available columns in food_logs: {columns}")
-        
         # For POST requests (adding new food log)
         if request.method == 'POST':
-            print("Processing POST request to /api/food-logs")
-            # Get food data from request
-            data = request.get_json()
-            print(f"Received data: {data}")
-            
-            # Map request data to database column names
-            # Use the column names that exist in the table
-            name_column = 'name' if 'name' in columns else 'food_name'
-            protein_column = 'protein' if 'protein' in columns else 'protein_g'
-            carbs_column = 'carbs' if 'carbs' in columns else 'carbs_g'
-            fats_column = 'fats' if 'fats' in columns else 'fat_g'
-            date_column = 'date_added' if 'date_added' in columns else 'log_date'
-            
-            # Build the insert query dynamically based on available columns
-            insert_columns = ['user_id', name_column, 'calories', protein_column, carbs_column, fats_column]
-            values_placeholders = ['%s', '%s', '%s', '%s', '%s', '%s']
-            
-            if date_column in columns:
-                insert_columns.append(date_column)
-                values_placeholders.append('COALESCE(%s, NOW())')
-            
-            insert_query = f"""
-                INSERT INTO food_logs 
-                ({', '.join(insert_columns)}) 
-                VALUES ({', '.join(values_placeholders)})
-                RETURNING id
-            """
-            
-            query_params = [
-                user_id, 
-                data.get('food_name', 'Unknown Food'),
-                data.get('calories', 0),
-                data.get('protein_g', 0),
-                data.get('carbs_g', 0),
-                data.get('fat_g', 0)
-            ]
+            data = request.get_json() or {}
             
-            if date_column in columns:
-                query_params.append(data.get('log_date'))
-                
-            print(f"Executing insert: {insert_query} with params: {query_params}")
-            cur.execute(insert_query, query_params)
+            # A whole plate from one image analysis is stored in one statement
+            if 'entries' in data:
+                return _add_food_logs(current_user, data['entries'])
             
-            log_id = cur.fetchone()[0]
-            conn.commit()
+            try:
+                photo_id = _attached_photo(data)
+                # Unit strings are parsed once here so reads can aggregate numerically
+                micronutrients = build_micronutrient_vector(data)
+                allergens = normalize_allergens(data.get('potential_allergens'))
+            except (PhotoError, NutrientDataError) as e:
+                return jsonify({'error': str(e)}), 400
             
-            print(f"Food log created with ID: {log_id}")
+            with db_connection() as conn:
+                version = repository.bump_data_version(conn, current_user.id)
+                log_id = repository.add_food_log(
+                    conn,
+                    current_user.id,
+                    data.get('food_name', 'Unknown Food'),
+                    data.get('calories', 0),
+                    data.get('protein_g', 0),
+                    data.get('carbs_g', 0),
+                    data.get('fat_g', 0),
+                    logged_at=data.get('log_date'),
+                    micronutrients=micronutrients,
+                    allergens=allergens,
+                    version=version,
+                    photo_id=photo_id
+                )
             
             # Return success response
             return jsonify({
@@ -366,104 +271,67 @@ def food_logs():
             
         # For GET requests (fetching food logs)
         else:
-            # Get date parameter from request
+            # Optional YYYY-MM-DD date filter
             selected_date = request.args.get('date')
             
-            # Construct the query based on available columns
-            name_column = 'name' if 'name' in columns else 'food_name'
-            protein_column = 'protein' if 'protein' in columns else 'protein_g'
-            carbs_column = 'carbs' if 'carbs' in columns else 'carbs_g'
-            fats_column = 'fats' if 'fats' in columns else 'fat_g'
-            date_column = 'date_added' if 'date_added' in columns else 'log_date'
-            
-            # Build the select query with the correct column names and date filtering
-            query = f"""
-                SELECT id, 
-                       {name_column} AS food_name, 
-                       calories, 
-                       {protein_column} AS protein_g, 
-                       {carbs_column} AS carbs_g, 
-                       {fats_column} AS fat_g, 
-                       {date_column} AS log_date
-                FROM food_logs 
-                WHERE user_id = %s
-            """
-            
-            query_params = [user_id]
-            
-            # Add date filtering if a date was provided
-            if selected_date:
-                query += f" AND DATE({date_column}) = %s"
-                query_params.append(selected_date)
-            
-            query += " ORDER BY log_date DESC"
-            
-            cur.execute(query, query_params)
-            logs = cur.fetchall()
+            etag = data_etag(current_user)
+            cached = not_modified(etag)
+            if cached:
+                return cached
             
-            # Convert to list of dictionaries
-            log_list = []
-            for log in logs:
-                log_dict = {
-                    'id': log[0],
-                    'food_name': log[1],
-                    'calories': log[2],
-                    'protein_g': log[3],
-                    'carbs_g': log[4],
-                    'fat_g': log[5],
-                    'log_date': log[6].isoformat() if log[6] else None
-                }
-                log_list.append(log_dict)
+            with db_connection(read_only=True) as conn:
+                logs = repository.get_food_logs(conn, current_user.id, selected_date)
             
-            return jsonify({'logs': log_list}), 200
+            return with_etag(jsonify({'logs': [log.to_dict() for log in logs]}), etag), 200
             
     except Exception as e:
-        import traceback
-        print(f"Error in food_logs endpoint: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in food_logs endpoint")
         return jsonify({'error': str(e)}), 500
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
 
-@food_routes.route('/api/food-logs/<int:log_id>', methods=['DELETE'])
-def delete_food_log(log_id):
-    """Delete a specific food log entry"""
-    # Get token from Authorization header
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({'error': 'Missing or invalid token'}), 401
+def _add_food_logs(current_user, entries):
+    """Log several foods at once, e.g. every item detected on a plate"""
+    if not entries or not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        return jsonify({'error': 'entries must be a non-empty list of food logs'}), 400
+    if len(entries) > Config.SYNC_MAX_BATCH:
+        return jsonify({'error': f'At most {Config.SYNC_MAX_BATCH} entries per batch'}), 400
+    
+    try:
+        photo_ids = [_attached_photo(entry) for entry in entries]
+        rows = [
+            (
+                entry.get('food_name', 'Unknown Food'),
+                entry.get('calories', 0),
+                entry.get('protein_g', 0),
+                entry.get('carbs_g', 0),
+                entry.get('fat_g', 0),
+                entry.get('log_date'),
+                build_micronutrient_vector(entry),
+                normalize_allergens(entry.get('potential_allergens')),
+                photo_id
+            )
+            for entry, photo_id in zip(entries, photo_ids)
+        ]
+    except (PhotoError, NutrientDataError) as e:
+        return jsonify({'error': str(e)}), 400
     
-    token = auth_header.split(' ')[1]
-    conn = None
-    cur = None
+    with db_connection() as conn:
+        version = repository.bump_data_version(conn, current_user.id, len(rows))
+        log_ids = repository.add_food_logs(conn, current_user.id, rows, version - len(rows) + 1)
     
+    return jsonify({
+        'message': f'{len(log_ids)} foods logged successfully',
+        'log_ids': log_ids
+    }), 201
+
+@food_routes.route('/api/food-logs/<int:log_id>', methods=['DELETE'])
+@token_required
+@records_write
+def delete_food_log(current_user, log_id):
+    """Delete a specific food log entry"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Get user ID from token
-        cur.execute("""
-            SELECT user_id FROM user_tokens WHERE token = %s
-        """, (token,))
-        
-        result = cur.fetchone()
-        if not result:
-            return jsonify({'error': 'Invalid token'}), 401
-            
-        user_id = result[0]
-        
         # Delete the food log entry, but only if it belongs to the user
-        cur.execute("""
-            DELETE FROM food_logs 
-            WHERE id = %s AND user_id = %s
-            RETURNING id
-        """, (log_id, user_id))
-        
-        deleted = cur.fetchone()
-        conn.commit()
+        with db_connection() as conn:
+            deleted = repository.delete_food_log(conn, log_id, current_user.id)
         
         if not deleted:
             return jsonify({'error': 'Food log entry not found or unauthorized'}), 404
@@ -471,11 +339,178 @@ def delete_food_log(log_id):
         return jsonify({'message': 'Food log deleted successfully'}), 200
         
     except Exception as e:
-        print(f"Error deleting food log: {str(e)}")
+        logger.exception("Error deleting food log")
         return jsonify({'error': str(e)}), 500
+
+@food_routes.route('/api/food-logs/search', methods=['GET'])
+@token_required
+def search_food_logs(current_user):
+    """Find the user's food logs by name, best matches first, a page at a time"""
+    text = request.args.get('q', '')
+    if not text.strip():
+        return jsonify({'error': 'Missing search query q'}), 400
+    if len(text) > Config.SEARCH_MAX_QUERY_LENGTH:
+        return jsonify({'error': f'Search query must be at most {Config.SEARCH_MAX_QUERY_LENGTH} characters'}), 400
+    
+    limit = request.args.get('limit', Config.SEARCH_PAGE_SIZE, type=int)
+    if not 1 <= limit <= Config.SEARCH_MAX_PAGE_SIZE:
+        return jsonify({'error': f'Limit must be between 1 and {Config.SEARCH_MAX_PAGE_SIZE}'}), 400
+    
+    # Optional inclusive date range, as for the export
+    try:
+        start_date, end_date = _date_range_args()
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+    
+    etag = data_etag(current_user)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    try:
+        results, next_cursor = run_food_search(
+            current_user.id, text, start_date, end_date, request.args.get('cursor'), limit
+        )
+    except SearchError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error searching food logs")
+        return jsonify({'error': str(e)}), 500
+    
+    return with_etag(jsonify({'results': results, 'next_cursor': next_cursor}), etag), 200
+
+EXPORT_COLUMNS = ['id', 'food_name', 'calories', 'protein_g', 'carbs_g', 'fat_g', 'log_date']
+
+@food_routes.route('/api/food-logs/export', methods=['GET'])
+@token_required
+def export_food_logs(current_user):
+    """Stream the user's complete food history as CSV or NDJSON"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Format must be csv or ndjson'}), 400
+    
+    # Optional inclusive date range
+    try:
+        start_date, end_date = _date_range_args()
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+    
+    user_id = current_user.id
+    batch_size = Config.EXPORT_BATCH_SIZE
+    
+    def generate():
+        conn = get_read_connection()
+        try:
+            # Named cursors need a transaction, which replica connections
+            # (autocommit by default) do not open on their own; read_snapshot
+            # opens one and restores autocommit however the stream ends
+            with read_snapshot(conn):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                if export_format == 'csv':
+                    writer.writerow(EXPORT_COLUMNS)
+                
+                pending = 0
+                for log in repository.iter_food_logs(conn, user_id, start_date, end_date, batch_size):
+                    if export_format == 'csv':
+                        writer.writerow(log.to_dict().values())
+                    else:
+                        buffer.write(json.dumps(log.to_dict()))
+                        buffer.write('\n')
+                    
+                    pending += 1
+                    if pending >= batch_size:
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+                        pending = 0
+                
+                if buffer.tell():
+                    yield buffer.getvalue()
+                
+        except Exception:
+            logger.exception("Error exporting food logs")
+            raise
+        finally:
+            release(conn)
+    
+    if export_format == 'csv':
+        mimetype = 'text/csv'
+    else:
+        mimetype = 'application/x-ndjson'
+    filename = f"food_logs_{datetime.now().strftime('%Y%m%d')}.{export_format}"
+    
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Accel-Buffering': 'no'
+    })
+
+@food_routes.route('/api/micronutrients', methods=['GET'])
+@token_required
+def get_micronutrient_totals(current_user):
+    """Sum stored micronutrients over a date range, either overall or per day"""
+    requested = request.args.get('nutrients')
+    names = [name.strip() for name in requested.split(',')] if requested else MICRONUTRIENT_NAMES
+    unknown = [name for name in names if name not in MICRONUTRIENT_INDEX]
+    if unknown:
+        return jsonify({'error': f"Unknown nutrients: {', '.join(unknown)}"}), 400
+    
+    group = request.args.get('group', 'total')
+    if group not in ('total', 'day'):
+        return jsonify({'error': 'Group must be total or day'}), 400
+    
+    try:
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d') if request.args.get('end') else datetime.now()
+        end_date = end_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        if request.args.get('start'):
+            start_date = datetime.strptime(request.args['start'], '%Y-%m-%d')
+        else:
+            start_date = end_date - timedelta(days=6)
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+    
+    if start_date > end_date:
+        return jsonify({'error': 'Start date must not be after end date'}), 400
+    
+    indexes = [MICRONUTRIENT_INDEX[name] for name in names]
+    names_by_index = {MICRONUTRIENT_INDEX[name]: name for name in names}
+    
+    try:
+        with db_connection(read_only=True) as conn:
+            rows = repository.get_micronutrient_totals(
+                conn, current_user.id, start_date, end_date + timedelta(days=1), indexes,
+                by_day=group == 'day'
+            )
+        
+        response = {
+            'start': start_date.strftime('%Y-%m-%d'),
+            'end': end_date.strftime('%Y-%m-%d'),
+            'units': {name: MICRONUTRIENT_UNITS[name] for name in names}
+        }
         
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
\ No newline at end of file
+        if group == 'total':
+            totals = {name: 0 for name in names}
+            for idx, amount in rows:
+                totals[names_by_index[idx]] = round(float(amount or 0), 4)
+            response['totals'] = totals
+        else:
+            # Fill in missing dates with zeros, matching /api/nutrition-history
+            dates = []
+            current_date = start_date
+            while current_date <= end_date:
+                dates.append(current_date.strftime('%Y-%m-%d'))
+                current_date += timedelta(days=1)
+            
+            position = {date_str: i for i, date_str in enumerate(dates)}
+            series = {name: [0] * len(dates) for name in names}
+            for log_date, idx, amount in rows:
+                series[names_by_index[idx]][position[log_date.strftime('%Y-%m-%d')]] = round(float(amount or 0), 4)
+            
+            response['dates'] = dates
+            response['nutrients'] = series
+        
+        return jsonify(response), 200
+        
+    except Exception as e:
+        logger.exception("Error in micronutrient totals")
+        return jsonify({'error': str(e)}), 500
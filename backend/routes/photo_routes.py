@@ -0,0 +1,77 @@
+import logging
+
+from flask import Blueprint, request, jsonify, send_file, url_for
+from backend.services.photo_store import CONTENT_TYPES, PhotoError, photo_store
+from backend.utils.auth import token_required
+
+photo_routes = Blueprint('photo_routes', __name__)
+logger = logging.getLogger(__name__)
+
+# A photo id is the hash of the content, so a given URL always returns the same bytes
+PHOTO_MAX_AGE = 365 * 24 * 3600
+
+
+def photo_urls(photo_id):
+    """URLs of a photo's original and each thumbnail size"""
+    return {
+        'original': url_for('photo_routes.get_photo', photo_id=photo_id),
+        'thumbnails': {
+            str(size): url_for('photo_routes.get_photo', photo_id=photo_id, size=size) for size in photo_store.sizes
+        }
+    }
+
+
+def save_uploaded_photo(file):
+    """Store an uploaded file and return its photo id; raises PhotoError for non-images"""
+    file.seek(0)
+    data = file.read()
+    file.seek(0)
+    return photo_store.save(data)
+
+
+@photo_routes.route('/api/photos', methods=['POST'])
+@token_required
+def upload_photo(current_user):
+    """Store a meal photo to attach to food logs by its photo_id"""
+    if 'image' not in request.files or request.files['image'].filename == '':
+        return jsonify({'error': 'No image provided'}), 400
+
+    try:
+        photo_id = save_uploaded_photo(request.files['image'])
+    except PhotoError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error storing photo")
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({'photo_id': photo_id, **photo_urls(photo_id)}), 201
+
+
+@photo_routes.route('/api/photos/<photo_id>', methods=['GET'])
+def get_photo(photo_id):
+    """
+    A stored photo, or with ?size= one of its thumbnails. The 256-bit id
+    works as the access key, so <img> tags can load photos without a token.
+    """
+    size = request.args.get('size', type=int)
+    try:
+        if size is None:
+            path = photo_store.original_path(photo_id)
+        else:
+            path = photo_store.thumbnail_path(photo_id, size)
+    except PhotoError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error loading photo")
+        return jsonify({'error': str(e)}), 500
+
+    if path is None:
+        return jsonify({'error': 'Photo not found'}), 404
+
+    mimetype = 'image/jpeg' if size is not None else CONTENT_TYPES[path[path.rindex('.'):]]
+    # conditional answers If-None-Match and Range requests; the file itself is
+    # streamed with the server's sendfile support (or X-Sendfile when enabled)
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=f"{photo_id}-{size or 'original'}",
+                         max_age=PHOTO_MAX_AGE)
+    response.headers['Cache-Control'] = f"private, max-age={PHOTO_MAX_AGE}, immutable"
+    return response
@@ -0,0 +1,113 @@
+import logging
+from flask import Blueprint, request, jsonify
+from backend.database.replicas import records_write
+from backend.services.recipe_service import RecipeError, RecipeService
+from backend.utils.auth import token_required
+from backend.utils.rate_limit import within_gemini_quota
+
+recipe_routes = Blueprint('recipe_routes', __name__)
+logger = logging.getLogger(__name__)
+
+def _save(current_user, recipe_id=None):
+    data = request.get_json() or {}
+
+    try:
+        recipe, analysed = RecipeService().save_recipe(
+            current_user.id, data.get('name'), data.get('servings', 1), data.get('ingredients'), recipe_id
+        )
+    except RecipeError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error saving recipe")
+        return jsonify({'error': str(e)}), 500
+
+    if recipe is None:
+        return jsonify({'error': 'Recipe not found'}), 404
+
+    result = recipe.to_dict()
+    result['ingredients_analyzed'] = analysed
+    return jsonify(result), 200 if recipe_id else 201
+
+@recipe_routes.route('/api/recipes', methods=['POST'])
+@token_required
+@records_write
+@within_gemini_quota
+def create_recipe(current_user):
+    """
+    Create a recipe from ingredient lines such as "500 g ground beef" or
+    {"name": "rice", "quantity": 0.5, "unit": "cup"}. Only ingredients not
+    yet in the shared cache are sent to Gemini.
+    """
+    return _save(current_user)
+
+@recipe_routes.route('/api/recipes', methods=['GET'])
+@token_required
+def list_recipes(current_user):
+    try:
+        recipes = RecipeService().get_recipes(current_user.id)
+    except Exception as e:
+        logger.exception("Error loading recipes")
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify([recipe.to_dict() for recipe in recipes]), 200
+
+@recipe_routes.route('/api/recipes/<int:recipe_id>', methods=['GET'])
+@token_required
+def get_recipe(current_user, recipe_id):
+    try:
+        recipe, ingredients = RecipeService().get_recipe(current_user.id, recipe_id)
+    except Exception as e:
+        logger.exception("Error loading recipe")
+        return jsonify({'error': str(e)}), 500
+
+    if recipe is None:
+        return jsonify({'error': 'Recipe not found'}), 404
+
+    result = recipe.to_dict()
+    result['ingredients'] = ingredients
+    return jsonify(result), 200
+
+@recipe_routes.route('/api/recipes/<int:recipe_id>', methods=['PUT'])
+@token_required
+@records_write
+@within_gemini_quota
+def update_recipe(current_user, recipe_id):
+    return _save(current_user, recipe_id)
+
+@recipe_routes.route('/api/recipes/<int:recipe_id>', methods=['DELETE'])
+@token_required
+@records_write
+def delete_recipe(current_user, recipe_id):
+    try:
+        deleted = RecipeService().delete_recipe(current_user.id, recipe_id)
+    except Exception as e:
+        logger.exception("Error deleting recipe")
+        return jsonify({'error': str(e)}), 500
+
+    if not deleted:
+        return jsonify({'error': 'Recipe not found'}), 404
+
+    return jsonify({'message': 'Recipe deleted'}), 200
+
+@recipe_routes.route('/api/recipes/<int:recipe_id>/log', methods=['POST'])
+@token_required
+@records_write
+def log_recipe(current_user, recipe_id):
+    """Log servings of a saved recipe; scaled from stored totals, without calling Gemini"""
+    data = request.get_json() or {}
+
+    try:
+        result = RecipeService().log_recipe(
+            current_user.id, recipe_id, data.get('servings', 1), data.get('log_date')
+        )
+    except RecipeError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error logging recipe")
+        return jsonify({'error': str(e)}), 500
+
+    if result is None:
+        return jsonify({'error': 'Recipe not found'}), 404
+
+    log_id, entry = result
+    return jsonify({'message': 'Recipe logged', 'log_id': log_id, 'log': entry}), 201
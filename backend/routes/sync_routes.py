@@ -0,0 +1,150 @@
+import logging
+from flask import Blueprint, request, jsonify
+from backend.config import Config
+from backend.database import repository
+from backend.database.db_manager import db_connection, read_snapshot
+from backend.database.replicas import records_write
+from backend.utils.auth import token_required
+from backend.utils.nutrient_units import NutrientDataError, build_micronutrient_vector, normalize_allergens
+
+sync_routes = Blueprint('sync_routes', __name__)
+logger = logging.getLogger(__name__)
+
+@sync_routes.route('/api/sync', methods=['GET'])
+@token_required
+def get_changes(current_user):
+    """
+    Food-log inserts and deletes after version `since`. Clients store the
+    returned version and pass it back next time; since=0 returns a snapshot
+    of every current log instead.
+    """
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({'error': 'since must be a non-negative version'}), 400
+
+    # Nothing has changed since the client's version, so no query is needed.
+    # The token lookup may have come from a lagging replica, so the client's
+    # own version is echoed back rather than one that could be older.
+    if since >= current_user.data_version:
+        return jsonify({'version': since, 'changes': [], 'has_more': False}), 200
+
+    try:
+        # The version and the changes must come from one snapshot: a version
+        # read elsewhere (another replica, or later) could be ahead of the
+        # rows returned, and the client would skip those changes for good
+        with db_connection(read_only=True) as conn, read_snapshot(conn):
+            current_version = repository.get_data_version(conn, current_user.id)
+            if since == 0:
+                logs = repository.get_food_logs(conn, current_user.id)
+                return jsonify({
+                    'version': current_version,
+                    'snapshot': True,
+                    'changes': [{'op': 'insert', 'log_id': log.id, 'log': log.to_dict()} for log in logs],
+                    'has_more': False
+                }), 200
+
+            # One extra row tells us whether another page follows
+            rows = repository.get_food_log_changes(conn, current_user.id, since, Config.SYNC_PAGE_SIZE + 1)
+
+        has_more = len(rows) > Config.SYNC_PAGE_SIZE
+        rows = rows[:Config.SYNC_PAGE_SIZE]
+
+        changes = []
+        for version, op, log_id, client_id, log in rows:
+            # Inserts whose log was deleted later are covered by the tombstone
+            if op == 'insert' and log is None:
+                continue
+            change = {'version': version, 'op': op, 'log_id': log_id}
+            if client_id:
+                change['client_id'] = client_id
+            if log is not None:
+                change['log'] = log.to_dict()
+            changes.append(change)
+
+        if has_more:
+            version = rows[-1][0]
+        else:
+            version = max([since, current_version] + [row[0] for row in rows])
+
+        return jsonify({'version': version, 'changes': changes, 'has_more': has_more}), 200
+
+    except Exception as e:
+        logger.exception("Error reading changes")
+        return jsonify({'error': str(e)}), 500
+
+@sync_routes.route('/api/sync', methods=['POST'])
+@token_required
+@records_write
+def push_changes(current_user):
+    """
+    Store a batch of entries created offline. Each entry carries a
+    client-generated `client_id`; entries already stored are reported as
+    duplicates, so a batch can be retried safely.
+    """
+    data = request.get_json() or {}
+    entries = data.get('entries')
+
+    if not entries or not isinstance(entries, list):
+        return jsonify({'error': 'entries must be a non-empty list'}), 400
+    if len(entries) > Config.SYNC_MAX_BATCH:
+        return jsonify({'error': f'At most {Config.SYNC_MAX_BATCH} entries per batch'}), 400
+
+    client_ids = [entry.get('client_id') if isinstance(entry, dict) else None for entry in entries]
+    if any(not isinstance(client_id, str) or not 0 < len(client_id) <= 64 for client_id in client_ids):
+        return jsonify({'error': 'Every entry needs a client_id of at most 64 characters'}), 400
+    if len(set(client_ids)) != len(client_ids):
+        return jsonify({'error': 'client_id values must be unique within a batch'}), 400
+
+    try:
+        micronutrients = {entry['client_id']: build_micronutrient_vector(entry) for entry in entries}
+        allergens = {entry['client_id']: normalize_allergens(entry.get('potential_allergens')) for entry in entries}
+    except NutrientDataError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        results = {}
+        with db_connection() as conn:
+            seen = repository.get_seen_client_ids(conn, current_user.id, client_ids)
+            new_entries = [entry for entry in entries if entry['client_id'] not in seen]
+
+            if new_entries:
+                # Bumping locks the user's row; a concurrent retry of the same
+                # batch may have stored some entries while we waited for it
+                version = repository.bump_data_version(conn, current_user.id, len(new_entries))
+                seen.update(repository.get_seen_client_ids(
+                    conn, current_user.id, [entry['client_id'] for entry in new_entries]
+                ))
+            else:
+                version = current_user.data_version
+
+            for client_id, log_id in seen.items():
+                results[client_id] = {'client_id': client_id, 'log_id': log_id, 'status': 'duplicate'}
+
+            first_version = version - len(new_entries) + 1
+            for entry_version, entry in enumerate(new_entries, start=first_version):
+                client_id = entry['client_id']
+                if client_id in seen:
+                    continue
+
+                log_id = repository.add_food_log(
+                    conn,
+                    current_user.id,
+                    entry.get('food_name', 'Unknown Food'),
+                    entry.get('calories', 0),
+                    entry.get('protein_g', 0),
+                    entry.get('carbs_g', 0),
+                    entry.get('fat_g', 0),
+                    logged_at=entry.get('log_date'),
+                    micronutrients=micronutrients[client_id],
+                    allergens=allergens[client_id],
+                    version=entry_version,
+                    client_id=client_id
+                )
+                results[client_id] = {'client_id': client_id, 'log_id': log_id, 'status': 'created'}
+
+        # Results in the order the entries were sent
+        return jsonify({'version': version, 'results': [results[client_id] for client_id in client_ids]}), 200
+
+    except Exception as e:
+        logger.exception("Error storing offline entries")
+        return jsonify({'error': str(e)}), 500
@@ -1,42 +1,118 @@
+import logging
+from datetime import datetime
+
 from flask import Blueprint, request, jsonify
-from ..services.nutrient_service import NutrientService
+from ..database.db_manager import db_connection
+from ..database.replicas import records_write
+from ..services.nutrient_service import NUTRIENTS, NutrientService
+from ..utils.auth import get_bearer_token, lookup_user, token_required
+from ..utils.caching import data_etag, not_modified, with_etag
 
 tracking_bp = Blueprint('tracking', __name__)
+logger = logging.getLogger(__name__)
 
 @tracking_bp.route('/track', methods=['POST'])
-def track_nutrients():
-    data = request.json
-    user_id = data.get('user_id')
+@token_required
+@records_write
+def track_nutrients(current_user):
+    data = request.get_json() or {}
     food_items = data.get('food_items')
 
-    if not user_id or not food_items:
-        return jsonify({'error': 'User ID and food items are required'}), 400
+    if not food_items or not isinstance(food_items, list):
+        return jsonify({'error': 'Food items are required'}), 400
 
-    nutrient_service = NutrientService()
-    result = nutrient_service.track_nutrients(user_id, food_items)
+    try:
+        nutrient_service = NutrientService()
+        result = nutrient_service.track_nutrients(current_user.id, food_items)
+    except Exception as e:
+        logger.exception("Error tracking nutrients")
+        return jsonify({'error': str(e)}), 500
 
-    return jsonify(result), 200
+    return jsonify(result), 201
 
 @tracking_bp.route('/goals', methods=['GET'])
-def get_nutrient_goals():
-    user_id = request.args.get('user_id')
+@token_required
+def get_nutrient_goals(current_user):
+    try:
+        nutrient_service = NutrientService()
+        goals = nutrient_service.get_user_goals(current_user.id, current_user.data_version)
+    except Exception as e:
+        logger.exception("Error loading goals")
+        return jsonify({'error': str(e)}), 500
 
-    if not user_id:
-        return jsonify({'error': 'User ID is required'}), 400
+    return jsonify(goals), 200
 
-    nutrient_service = NutrientService()
-    goals = nutrient_service.get_nutrient_goals(user_id)
+@tracking_bp.route('/goals', methods=['PUT'])
+@token_required
+@records_write
+def update_nutrient_goals(current_user):
+    data = request.get_json() or {}
+    goals = {nutrient: data[nutrient] for nutrient in NUTRIENTS if nutrient in data}
 
-    return jsonify(goals), 200
+    if not goals:
+        return jsonify({'error': f"Provide at least one of: {', '.join(NUTRIENTS)}"}), 400
+    if any(not isinstance(value, (int, float)) or value < 0 for value in goals.values()):
+        return jsonify({'error': 'Goals must be non-negative numbers'}), 400
+
+    try:
+        nutrient_service = NutrientService()
+        saved = nutrient_service.update_goals(current_user.id, current_user.data_version, goals)
+    except Exception as e:
+        logger.exception("Error saving goals")
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify(saved), 200
 
 @tracking_bp.route('/progress', methods=['GET'])
-def get_progress():
-    user_id = request.args.get('user_id')
+@token_required
+def get_progress(current_user):
+    # Optional YYYY-MM-DD date, defaults to today
+    selected_date = request.args.get('date')
+    if selected_date:
+        try:
+            datetime.strptime(selected_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+
+    try:
+        nutrient_service = NutrientService()
+        progress = nutrient_service.get_progress(current_user.id, current_user.data_version, selected_date)
+    except Exception as e:
+        logger.exception("Error loading progress")
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify(progress), 200
+
+@tracking_bp.route('/dashboard', methods=['GET'])
+def get_dashboard():
+    """Profile, the day's logs, totals and goal progress in a single response"""
+    token = get_bearer_token()
+    if not token:
+        return jsonify({'error': 'Missing or invalid token'}), 401
+
+    # Optional YYYY-MM-DD date, defaults to today
+    selected_date = request.args.get('date')
+    if selected_date:
+        try:
+            datetime.strptime(selected_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+
+    try:
+        # Token lookup and all dashboard reads share one connection
+        with db_connection(read_only=True, token=token) as conn:
+            current_user = lookup_user(conn, token)
+            if not current_user:
+                return jsonify({'error': 'Invalid token'}), 401
 
-    if not user_id:
-        return jsonify({'error': 'User ID is required'}), 400
+            etag = data_etag(current_user)
+            cached = not_modified(etag)
+            if cached:
+                return cached
 
-    nutrient_service = NutrientService()
-    progress = nutrient_service.get_progress(user_id)
+            dashboard = NutrientService().get_dashboard(conn, current_user, selected_date)
+    except Exception as e:
+        logger.exception("Error loading dashboard")
+        return jsonify({'error': str(e)}), 500
 
-    return jsonify(progress), 200
\ No newline at end of file
+    return with_etag(jsonify(dashboard), etag), 200
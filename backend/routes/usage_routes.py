@@ -0,0 +1,36 @@
+import logging
+from datetime import date, timedelta
+
+from flask import Blueprint, request, jsonify
+from backend.services.usage_service import quota_status, usage_report
+from backend.utils.auth import admin_required, token_required
+
+usage_routes = Blueprint('usage_routes', __name__)
+logger = logging.getLogger(__name__)
+
+@usage_routes.route('/api/usage', methods=['GET'])
+@token_required
+def get_usage(current_user):
+    """The user's Gemini usage today against their daily quota"""
+    try:
+        return jsonify(quota_status(current_user.id)), 200
+    except Exception as e:
+        logger.exception("Error loading usage")
+        return jsonify({'error': str(e)}), 500
+
+@usage_routes.route('/api/admin/gemini-usage', methods=['GET'])
+@admin_required
+def get_gemini_usage():
+    """Gemini calls, tokens and bytes by day, endpoint and user over the last `days` days"""
+    days = request.args.get('days', 7, type=int)
+    top = request.args.get('top', 20, type=int)
+    if not 1 <= days <= 366 or not 1 <= top <= 1000:
+        return jsonify({'error': 'days must be 1-366 and top 1-1000'}), 400
+
+    try:
+        report = usage_report(date.today() - timedelta(days=days - 1), top)
+    except Exception as e:
+        logger.exception("Error building usage report")
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify(report), 200
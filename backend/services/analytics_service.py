@@ -0,0 +1,215 @@
+"""
+Trend analytics over a user's whole daily history.
+
+The history is loaded with one query into a dense NumPy array with one row
+per calendar day, and every statistic is computed with array operations, so
+multi-year histories stay cheap. Results are cached per worker, keyed on the
+user's data_version: any change to their logs or goals bumps the version and
+so misses the cache.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import numpy as np
+
+from backend.config import Config
+from backend.database import repository
+from backend.database.db_manager import db_connection
+from backend.services.nutrient_service import NUTRIENTS, NutrientService
+from backend.utils.metrics import cache_lookup
+
+# kcal per gram of protein, carbs and fat
+MACRO_KCAL = np.array([4.0, 4.0, 9.0])
+MACROS = NUTRIENTS[1:]
+
+# A day hits a goal when intake is within this fraction of it
+GOAL_TOLERANCE = 0.10
+
+_summary_cache = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+
+def load_daily_series(conn, user_id, today):
+    """
+    Return (first_day, values, logged): values is a (days, nutrients) array
+    running from the first logged day to `today`, and logged flags the days
+    that have any entries
+    """
+    rows = [row for row in repository.get_daily_series(conn, user_id) if row[0] <= today]
+    if not rows:
+        return today, np.zeros((1, len(NUTRIENTS))), np.zeros(1, dtype=bool)
+
+    days = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    first_day = days[0]
+    positions = (days - first_day).astype(int)
+
+    length = int((np.datetime64(today) - first_day).astype(int)) + 1
+    values = np.zeros((length, len(NUTRIENTS)))
+    values[positions] = np.nan_to_num(np.array([row[1:] for row in rows], dtype=float))
+    logged = np.zeros(length, dtype=bool)
+    logged[positions] = True
+
+    return first_day.astype(date), values, logged
+
+
+def rolling_mean(values, logged, window):
+    """Trailing mean over the logged days in each `window`-day span; NaN where none were logged"""
+    sums = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+    counts = np.concatenate([[0], np.cumsum(logged)])
+
+    upper = np.arange(1, len(values) + 1)
+    lower = np.maximum(upper - window, 0)
+    window_sums = sums[upper] - sums[lower]
+    window_counts = (counts[upper] - counts[lower])[:, None]
+
+    return np.divide(window_sums, window_counts,
+                     out=np.full(window_sums.shape, np.nan), where=window_counts > 0)
+
+
+def longest_run(mask):
+    """Length of the longest run of True values"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max()) if starts.size else 0
+
+
+def current_run(mask):
+    """Run of True values ending today, or yesterday if today has not hit yet"""
+    if mask.size and not mask[-1]:
+        mask = mask[:-1]
+    misses = np.flatnonzero(~mask)
+    return int(mask.size - (misses[-1] + 1)) if misses.size else int(mask.size)
+
+
+def _to_list(values, digits=1):
+    """Round for JSON, with NaN as None"""
+    return [None if np.isnan(value) else round(float(value), digits) for value in values]
+
+
+def _by_nutrient(values, digits=1, names=NUTRIENTS):
+    return dict(zip(names, _to_list(values, digits)))
+
+
+def summarize(first_day, values, logged, goals, days):
+    """All analytics for a daily series; `days` bounds the returned series and distributions"""
+    today = first_day + timedelta(days=len(values) - 1)
+    window = slice(max(len(values) - days, 0), None)
+
+    rolling_7 = rolling_mean(values, logged, 7)
+    rolling_30 = rolling_mean(values, logged, 30)
+
+    # Week over week: the last 7 days against the 7 before them
+    current_week = rolling_7[-1]
+    previous_week = rolling_7[-8] if len(values) > 7 else np.full(len(NUTRIENTS), np.nan)
+    change = current_week - previous_week
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = np.where(previous_week > 0, change / previous_week * 100, np.nan)
+
+    # Goal hits per day and nutrient, plus days on which every goal was hit
+    targets = np.array([goals[nutrient] for nutrient in NUTRIENTS], dtype=float)
+    hits = logged[:, None] & (targets > 0) & (np.abs(values - targets) <= GOAL_TOLERANCE * targets)
+    streaks = {
+        name: {'current': current_run(mask), 'longest': longest_run(mask)}
+        for name, mask in zip(NUTRIENTS + ('all',), np.column_stack([hits, hits.all(axis=1)]).T)
+    }
+
+    # Share of energy from each macro on logged days in the window
+    window_values = values[window][logged[window]]
+    energy = window_values[:, 1:] * MACRO_KCAL
+    energy = energy[energy.sum(axis=1) > 0]
+    if len(energy):
+        shares = energy / energy.sum(axis=1, keepdims=True)
+        p10, p50, p90 = np.percentile(shares, [10, 50, 90], axis=0)
+        # Ten 10%-wide bins per macro, counted in one bincount
+        bins = np.minimum((shares * 10).astype(int), 9) + 10 * np.arange(len(MACROS))
+        histograms = np.bincount(bins.ravel(), minlength=10 * len(MACROS)).reshape(len(MACROS), 10)
+        macro_ratios = {
+            macro: {
+                'mean': round(float(shares[:, i].mean()), 3),
+                'p10': round(float(p10[i]), 3),
+                'p50': round(float(p50[i]), 3),
+                'p90': round(float(p90[i]), 3),
+                'histogram': histograms[i].tolist()
+            }
+            for i, macro in enumerate(MACROS)
+        }
+    else:
+        macro_ratios = {macro: None for macro in MACROS}
+
+    # Day-to-day variability on logged days in the window
+    if len(window_values) > 1:
+        mean = window_values.mean(axis=0)
+        std = window_values.std(axis=0, ddof=1)
+        cv = np.divide(std, mean, out=np.full(std.shape, np.nan), where=mean > 0)
+    else:
+        mean = std = cv = np.full(len(NUTRIENTS), np.nan)
+
+    dates = np.arange(np.datetime64(today) - len(values[window]) + 1, np.datetime64(today) + 1)
+
+    return {
+        'start': dates[0].astype(date).isoformat(),
+        'end': today.isoformat(),
+        'days_logged': int(logged[window].sum()),
+        'goals': goals,
+        'averages': {
+            '7_day': _by_nutrient(rolling_7[-1]),
+            '30_day': _by_nutrient(rolling_30[-1])
+        },
+        'week_over_week': {
+            nutrient: {
+                'current': _to_list([current_week[i]])[0],
+                'previous': _to_list([previous_week[i]])[0],
+                'change': _to_list([change[i]])[0],
+                'change_pct': _to_list([change_pct[i]])[0]
+            }
+            for i, nutrient in enumerate(NUTRIENTS)
+        },
+        'streaks': streaks,
+        'macro_ratios': macro_ratios,
+        'variability': {
+            nutrient: {
+                'mean': _to_list([mean[i]])[0],
+                'std': _to_list([std[i]])[0],
+                'cv': _to_list([cv[i]], 3)[0]
+            }
+            for i, nutrient in enumerate(NUTRIENTS)
+        },
+        'series': {
+            'dates': [str(day) for day in dates],
+            'rolling_7': {nutrient: _to_list(rolling_7[window][:, i]) for i, nutrient in enumerate(NUTRIENTS)},
+            'rolling_30': {nutrient: _to_list(rolling_30[window][:, i]) for i, nutrient in enumerate(NUTRIENTS)}
+        }
+    }
+
+
+class AnalyticsService:
+    def get_summary(self, user, days=90):
+        """Analytics summary for `user`, served from cache while their data is unchanged"""
+        today = date.today()
+        key = (user.id, user.data_version, today, days)
+
+        with _summary_cache_lock:
+            summary = _summary_cache.get(key)
+            if summary is not None:
+                _summary_cache.move_to_end(key)
+        cache_lookup('analytics_summary', summary is not None)
+        if summary is not None:
+            return summary
+
+        with db_connection(read_only=True) as conn:
+            goals = NutrientService().get_user_goals(user.id, user.data_version, conn)
+            first_day, values, logged = load_daily_series(conn, user.id, today)
+
+        summary = summarize(first_day, values, logged, goals, days)
+
+        with _summary_cache_lock:
+            # Older versions of this user's summary can never be hit again
+            for stale in [k for k in _summary_cache if k[0] == user.id]:
+                del _summary_cache[stale]
+            _summary_cache[key] = summary
+            while len(_summary_cache) > Config.ANALYTICS_CACHE_SIZE:
+                _summary_cache.popitem(last=False)
+
+        return summary
@@ -0,0 +1,208 @@
+"""
+Interchangeable backends behind GeminiService.
+
+Config.GEMINI_BACKEND selects one:
+
+- live: calls the Gemini API (the default)
+- record: calls the Gemini API and saves each request and response as a
+  fixture in Config.GEMINI_FIXTURE_DIR
+- replay: answers from the fixtures without the network, in process, or
+  through the replay server (backend/services/gemini_replay_server.py) when
+  Config.GEMINI_REPLAY_URL is set
+
+A fixture is keyed by the model and the request contents, with whitespace
+in text folded and images hashed, so replays are deterministic and a changed
+prompt needs a new recording. Fixtures with "synthetic": true hold hand-written
+answers and estimated token counts and latencies rather than a real exchange;
+they exercise the code paths but say nothing about the model's output.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+import google.generativeai as genai
+import requests
+
+from backend.config import Config
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_KEY_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class GeminiBackendError(Exception):
+    """A backend could not produce a response (missing fixture, injected or remote error)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class UsageMetadata:
+    def __init__(self, prompt_token_count=0, candidates_token_count=0):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class ReplayedResponse:
+    """The parts of a generate_content response GeminiService reads"""
+
+    def __init__(self, text, prompt_token_count=0, candidates_token_count=0):
+        self.text = text
+        self.usage_metadata = UsageMetadata(prompt_token_count, candidates_token_count)
+
+
+def _content_parts(contents):
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    normalized = []
+    for part in parts:
+        if isinstance(part, str):
+            normalized.append(_WHITESPACE_RE.sub(' ', part).strip())
+        elif isinstance(part, bytes):
+            normalized.append({'bytes': hashlib.sha256(part).hexdigest()})
+        elif hasattr(part, 'tobytes'):
+            # PIL image: the decoded pixels identify it regardless of the upload's encoding
+            normalized.append({'image': hashlib.sha256(part.tobytes()).hexdigest(),
+                               'size': list(part.size), 'mode': part.mode})
+        else:
+            normalized.append(repr(part))
+    return normalized
+
+
+def fixture_key(model_name, contents):
+    """Stable name of the fixture for a request"""
+    payload = json.dumps([model_name, _content_parts(contents)], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def _fixture_path(fixture_dir, key):
+    return os.path.join(fixture_dir, f"{key}.json")
+
+
+def load_fixture(fixture_dir, key):
+    """The recorded fixture `key`, or None if there is none"""
+    if not _KEY_RE.match(key):
+        return None
+    try:
+        with open(_fixture_path(fixture_dir, key), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def fixture_models(fixture_dir):
+    """Models that have recorded fixtures; other files in the directory are ignored"""
+    models = set()
+    for name in os.listdir(fixture_dir):
+        fixture = load_fixture(fixture_dir, name[:-5]) if name.endswith('.json') else None
+        if fixture is not None:
+            models.add(fixture['model'])
+    return sorted(models)
+
+
+class LiveBackend:
+    """The Gemini API"""
+
+    def __init__(self, api_key):
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY is required")
+        # Configure the Gemini API with REST transport to avoid gRPC connection issues
+        genai.configure(api_key=api_key, transport='rest')
+
+    def generate(self, model_name, contents):
+        return genai.GenerativeModel(model_name).generate_content(contents)
+
+    def list_models(self):
+        return [model.name for model in genai.list_models()]
+
+
+class RecordingBackend:
+    """Pass requests to another backend and save each exchange as a fixture"""
+
+    def __init__(self, backend, fixture_dir):
+        self.backend = backend
+        self.fixture_dir = fixture_dir
+
+    def generate(self, model_name, contents):
+        started = time.monotonic()
+        response = self.backend.generate(model_name, contents)
+        usage = getattr(response, 'usage_metadata', None)
+
+        fixture = {
+            'model': model_name,
+            'request': _content_parts(contents),
+            'text': response.text,
+            'prompt_token_count': getattr(usage, 'prompt_token_count', 0),
+            'candidates_token_count': getattr(usage, 'candidates_token_count', 0),
+            'latency_ms': round((time.monotonic() - started) * 1000),
+        }
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        with open(_fixture_path(self.fixture_dir, fixture_key(model_name, contents)), 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, indent=2)
+        return response
+
+    def list_models(self):
+        return self.backend.list_models()
+
+
+class ReplayBackend:
+    """Answer from recorded fixtures, in process"""
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+
+    def generate(self, model_name, contents):
+        key = fixture_key(model_name, contents)
+        fixture = load_fixture(self.fixture_dir, key)
+        if fixture is None:
+            raise GeminiBackendError(f"No recorded Gemini response {key} in {self.fixture_dir}", status=404)
+        return ReplayedResponse(fixture['text'], fixture.get('prompt_token_count', 0),
+                                fixture.get('candidates_token_count', 0))
+
+    def list_models(self):
+        return fixture_models(self.fixture_dir)
+
+
+class RemoteReplayBackend:
+    """Answer through the replay server, which adds latency and injected errors"""
+
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def generate(self, model_name, contents):
+        response = self.session.post(
+            f"{self.url}/generate",
+            json={'model': model_name, 'key': fixture_key(model_name, contents)},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            try:
+                message = response.json().get('error')
+            except ValueError:
+                message = None
+            raise GeminiBackendError(message or f"Replay server error {response.status_code}",
+                                     status=response.status_code)
+        body = response.json()
+        return ReplayedResponse(body['text'], body.get('prompt_token_count', 0), body.get('candidates_token_count', 0))
+
+    def list_models(self):
+        response = self.session.get(f"{self.url}/models", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['models']
+
+
+def create_backend(api_key=None):
+    """The backend selected by Config.GEMINI_BACKEND"""
+    mode = Config.GEMINI_BACKEND
+    if mode == 'live':
+        return LiveBackend(api_key)
+    if mode == 'record':
+        return RecordingBackend(LiveBackend(api_key), Config.GEMINI_FIXTURE_DIR)
+    if mode == 'replay':
+        if Config.GEMINI_REPLAY_URL:
+            return RemoteReplayBackend(Config.GEMINI_REPLAY_URL)
+        return ReplayBackend(Config.GEMINI_FIXTURE_DIR)
+    raise ValueError(f"Unknown GEMINI_BACKEND '{mode}' (expected live, record or replay)")
@@ -0,0 +1,123 @@
+"""
+Local HTTP stand-in for Gemini that serves recorded fixtures.
+
+Point the app at it with GEMINI_BACKEND=replay and
+GEMINI_REPLAY_URL=http://127.0.0.1:8089, then benchmark analysis
+throughput, caching, rate limits and concurrency without the network:
+
+    python -m backend.services.gemini_replay_server --fixtures tests/fixtures/gemini \\
+        --latency-ms 800 --jitter-ms 200 --error-rate 0.02
+
+Every answer waits for the given latency (or the latency recorded in the
+fixture with --recorded-latency), and the given share of requests fails with
+a 503 or 429 like the real API does under load. --seed makes the injected
+errors and jitter reproducible.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.services.gemini_backends import fixture_models, load_fixture
+
+
+class ReplaySettings:
+    def __init__(self, fixture_dir, latency_ms=0, jitter_ms=0, error_rate=0.0, recorded_latency=False, seed=None):
+        self.fixture_dir = fixture_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.recorded_latency = recorded_latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """(delay in seconds, injected error status or None) for the next request"""
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+            error = self._random.choice((429, 503)) if self._random.random() < self.error_rate else None
+        return max(0.0, self.latency_ms + jitter) / 1000, error
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def settings(self):
+        return self.server.settings
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path != '/models':
+            return self._send(404, {'error': 'Not found'})
+        self._send(200, {'models': fixture_models(self.settings.fixture_dir)})
+
+    def do_POST(self):
+        if self.path != '/generate':
+            return self._send(404, {'error': 'Not found'})
+
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        fixture = load_fixture(self.settings.fixture_dir, request.get('key', ''))
+
+        delay, error = self.settings.draw()
+        if fixture is not None and self.settings.recorded_latency:
+            delay = fixture.get('latency_ms', 0) / 1000
+        time.sleep(delay)
+
+        if error:
+            return self._send(error, {'error': f"Injected error {error}"})
+        if fixture is None:
+            return self._send(404, {'error': f"No recorded Gemini response {request.get('key')}"})
+        self._send(200, fixture)
+
+    def log_message(self, format, *args):
+        # One line per request would dominate a load test's output
+        pass
+
+
+def create_server(settings, host='127.0.0.1', port=8089):
+    """A threaded replay server (port 0 picks a free port); call serve_forever() to run it"""
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    server.daemon_threads = True
+    server.settings = settings
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', default=os.environ.get('GEMINI_FIXTURE_DIR', 'tests/fixtures/gemini'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--recorded-latency', action='store_true', help='wait as long as the recorded call took')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    settings = ReplaySettings(args.fixtures, args.latency_ms, args.jitter_ms, args.error_rate,
+                              args.recorded_latency, args.seed)
+    server = create_server(settings, args.host, args.port)
+    print(f"Replaying {args.fixtures} on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
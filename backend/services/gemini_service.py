@@ -1,80 +1,97 @@
 import os
 import base64
-import google.generativeai as genai
 from PIL import Image
 from io import BytesIO
 import json
+import logging
 import re
+import time
+
+from backend.services.gemini_backends import create_backend
+from backend.services.model_routing import STRONG, choose_tier, model_for
+from backend.services.prompts import (
+    estimate_tokens, image_analysis_prompt, ingredients_prompt, text_analysis_prompt
+)
+from backend.services.usage_service import usage_tracker
+from backend.utils.logging_setup import log_payload
+from backend.utils.metrics import GEMINI_LATENCY, GEMINI_PAYLOAD
+from backend.utils.nutrient_units import parse_calories, parse_grams
+
+logger = logging.getLogger(__name__)
+
+
+def plate_total(items):
+    """Summed calories and macros (in grams) over the items detected in one image"""
+    total = {
+        "food_name": ", ".join(str(item.get("food_name") or "Unknown Food") for item in items),
+        "calories": round(sum(parse_calories(item.get("calories")) for item in items)),
+    }
+    for key in ("protein", "carbohydrates", "fat", "fiber"):
+        total[key] = f"{round(sum(parse_grams(item.get(key)) for item in items), 1):g} g"
+    return total
+
 
 class GeminiService:
-    def __init__(self, api_key=None):
-        """Initialize the Gemini Service with API key"""
+    def __init__(self, api_key=None, backend=None):
+        """
+        Initialize the Gemini Service with API key. The backend (live, record
+        or replay) follows Config.GEMINI_BACKEND unless one is passed in.
+        """
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY is required")
-        
-        # Configure the Gemini API with REST transport to avoid gRPC connection issues
-        genai.configure(api_key=self.api_key, transport='rest')
+        self.backend = backend or create_backend(self.api_key)
     
+    def _generate(self, model_name, contents, operation, request_bytes=0, tier=STRONG):
+        """Run generate_content and record its latency (per model tier), tokens and payload sizes"""
+        started = time.monotonic()
+        GEMINI_PAYLOAD.labels(operation, 'request').observe(request_bytes)
+        try:
+            response = self.backend.generate(model_name, contents)
+            response_bytes = len(response.text.encode('utf-8'))
+        except Exception:
+            elapsed = time.monotonic() - started
+            GEMINI_LATENCY.labels(operation, tier, model_name, 'error').observe(elapsed)
+            usage_tracker.record(operation, model_name, error=True, request_bytes=request_bytes,
+                                 latency_ms=elapsed * 1000)
+            raise
+
+        elapsed = time.monotonic() - started
+        GEMINI_LATENCY.labels(operation, tier, model_name, 'success').observe(elapsed)
+        GEMINI_PAYLOAD.labels(operation, 'response').observe(response_bytes)
+
+        usage = getattr(response, 'usage_metadata', None)
+        usage_tracker.record(
+            operation, model_name,
+            prompt_tokens=getattr(usage, 'prompt_token_count', 0),
+            response_tokens=getattr(usage, 'candidates_token_count', 0),
+            request_bytes=request_bytes,
+            response_bytes=response_bytes,
+            latency_ms=elapsed * 1000
+        )
+        return response
+
     def test_api_key(self):
         """Test if the API key is valid by making a simple request"""
         try:
             # List available models as a simple test
-            models = genai.list_models()
-            model_names = [model.name for model in models]
-            print(f"Available models: {model_names}")
+            model_names = self.backend.list_models()
+            logger.debug("Available models: %s", model_names)
             return True
         except Exception as e:
-            print(f"API key test failed: {str(e)}")
+            logger.warning("API key test failed: %s", e)
             return False
             
     def analyze_food_text(self, food_description):
         """Analyze a text description of food and return nutritional information"""
         try:
-            # Create a prompt that asks for nutritional analysis with explicitly structured vitamins/minerals
-            prompt = f"""
-            Based on this food description: "{food_description}"
-            
-            Provide detailed nutritional information in JSON format.
-            Include:
-            - Food name (string)
-            - Portion size (string)
-            - Calories (number)
-            - Macronutrients: protein (string with g unit), carbs (string with g unit), fat (string with g unit)
-            - vitamins_and_minerals: Please include key vitamins (A, B1, B2, B3, B5, B6, B9, B12, C, D, E, K) and minerals 
-              (calcium, iron, magnesium, phosphorus, potassium, sodium, zinc) as individual key-value pairs with their amounts and units.
-            - potential_allergens (array of strings)
-            
-            Format as VALID JSON with the following exact structure:
-            {{
-              "food_name": "string",
-              "portion_size": "string",
-              "calories": number,
-              "protein": "string",
-              "carbohydrates": "string",
-              "fat": "string",
-              "fiber": "string",
-              "vitamins_and_minerals": {{
-                "vitamin_a": "string",
-                "vitamin_c": "string",
-                "calcium": "string",
-                "iron": "string",
-                ... (other vitamins/minerals)
-              }},
-              "potential_allergens": ["string", "string", ...]
-            }}
-            
-            Use null for unknown values, never use placeholder values.
-            """
-            
-            # Use text-only model for this request
-            text_model = genai.GenerativeModel('models/gemini-1.5-flash')
-            
-            # Generate response from Gemini
-            response = text_model.generate_content(prompt)
-            
-            # DEBUG: Print the raw Gemini response
-            print("[DEBUG] Raw Gemini response:", response.text)
+            prompt = text_analysis_prompt(food_description)
+            
+            # A single food in a few words is answered well by the fast tier
+            tier = choose_tier(description=food_description, prompt_tokens=estimate_tokens(prompt))
+            response = self._generate(model_for(tier), prompt, 'analyze_food_text',
+                                      request_bytes=len(prompt.encode('utf-8')), tier=tier)
+            
+            # Sampled, and skipped entirely unless debug logging is on for this module
+            log_payload(logger, 'gemini_text_response', "Raw Gemini response", response.text)
             
             # Extract the response text
             response_text = response.text
@@ -123,48 +140,22 @@ class GeminiService:
     def analyze_food_image(self, image_file):
         """Analyze an image of food and return nutritional information"""
         try:
+            # Upload size, for usage accounting
+            image_file.seek(0, os.SEEK_END)
+            image_bytes = image_file.tell()
+            image_file.seek(0)
+            
             # Open the image file
             img = Image.open(image_file)
             
-            # Create prompt with explicit structure for vitamins and minerals
-            prompt = """
-            Analyze this food image and provide detailed nutritional information in JSON format.
-            Include:
-            - Food name (string)
-            - Portion size (string)
-            - Calories (number)
-            - Macronutrients: protein, carbs, fat (all as strings with units)
-            - vitamins_and_minerals: Include key vitamins (A, B complex, C, D, E, K) and minerals 
-              (calcium, iron, magnesium, phosphorus, potassium, sodium, zinc) as individual key-value pairs.
-            - potential_allergens (array of strings)
-            
-            Format as VALID JSON with the following exact structure:
-            {
-              "food_name": "string",
-              "portion_size": "string",
-              "calories": number,
-              "protein": "string",
-              "carbohydrates": "string",
-              "fat": "string",
-              "fiber": "string",
-              "vitamins_and_minerals": {
-                "vitamin_a": "string",
-                "vitamin_c": "string",
-                "calcium": "string",
-                "iron": "string",
-                ... (other vitamins/minerals)
-              },
-              "potential_allergens": ["string", "string", ...]
-            }
-            
-            Use null for unknown values, never use placeholder values.
-            """
+            # Every item on the plate is described in the same call, so a
+            # mixed meal needs one upload instead of one per food
+            prompt = image_analysis_prompt()
             
-            # Use vision-capable model
-            vision_model = genai.GenerativeModel('models/gemini-1.5-flash')
-            
-            # Generate response
-            response = vision_model.generate_content([prompt, img])
+            # Images always go to the strong, vision-capable tier
+            tier = choose_tier(has_image=True)
+            response = self._generate(model_for(tier), [prompt, img], 'analyze_food_image',
+                                      request_bytes=len(prompt.encode('utf-8')) + image_bytes, tier=tier)
             
             # Extract response text
             response_text = response.text
@@ -186,9 +177,20 @@ class GeminiService:
                 # Parse JSON to validate it
                 parsed_data = json.loads(json_text)
                 
+                # A single-item answer without the wrapper is still one item
+                items = parsed_data.get('items') if isinstance(parsed_data, dict) else None
+                if items is None:
+                    items = [parsed_data] if isinstance(parsed_data, dict) else parsed_data
+                items = [item for item in items if isinstance(item, dict)]
+                if not items:
+                    return {
+                        "success": False,
+                        "error": "No food detected in the image"
+                    }
+                
                 return {
                     "success": True,
-                    "data": json_text
+                    "data": json.dumps({"items": items, "total": plate_total(items)})
                 }
             else:
                 return {
@@ -205,4 +207,52 @@ class GeminiService:
             return {
                 "success": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+
+    def analyze_ingredients(self, ingredients):
+        """
+        Analyze several recipe ingredients in one request. `ingredients` is a
+        list of (name, amount, unit) tuples such as ("olive oil", 100, "ml");
+        returns one nutrition object per ingredient, in the same order.
+        """
+        try:
+            prompt = ingredients_prompt(ingredients)
+            
+            tier = choose_tier(items=len(ingredients), prompt_tokens=estimate_tokens(prompt))
+            response = self._generate(model_for(tier), prompt, 'analyze_ingredients',
+                                      request_bytes=len(prompt.encode('utf-8')), tier=tier)
+            response_text = response.text
+            
+            # Remove markdown code blocks if present, then take the outermost array
+            clean_text = re.sub(r'```(?:json)?\s*(.*?)\s*```', r'\1', response_text, flags=re.DOTALL)
+            start_idx = clean_text.find('[')
+            end_idx = clean_text.rfind(']')
+            
+            if start_idx == -1 or end_idx == -1:
+                return {
+                    "success": False,
+                    "error": "Could not extract valid JSON from response"
+                }
+            
+            items = json.loads(clean_text[start_idx:end_idx+1])
+            if not isinstance(items, list) or len(items) != len(ingredients):
+                return {
+                    "success": False,
+                    "error": f"Expected {len(ingredients)} ingredients in response"
+                }
+            
+            return {
+                "success": True,
+                "data": items
+            }
+                
+        except json.JSONDecodeError as e:
+            return {
+                "success": False,
+                "error": f"JSON parsing error: {str(e)}"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
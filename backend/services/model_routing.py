@@ -0,0 +1,41 @@
+"""
+Choice of Gemini model tier per analysis request.
+
+Single foods described in a few words go to the fast, cheaper tier
+(Config.GEMINI_MODEL_FAST); images, several foods or ingredients, and long
+prompts go to the strong tier (Config.GEMINI_MODEL_STRONG). With
+Config.GEMINI_ROUTING_ENABLED off everything uses the strong tier. Latency
+per tier is exported as gemini_request_duration_seconds{tier=...}.
+"""
+import re
+
+from backend.config import Config
+
+FAST = 'fast'
+STRONG = 'strong'
+
+# Separators that usually mean the description lists more than one food
+_MULTI_ITEM_RE = re.compile(r',|;|\n|\+|&|\band\b|\bwith\b|\bplus\b', re.IGNORECASE)
+
+
+def looks_multi_item(description):
+    """Whether a free-text description names more than one food"""
+    parts = [part for part in _MULTI_ITEM_RE.split(description) if part.strip()]
+    return len(parts) > 1
+
+
+def choose_tier(description=None, items=1, has_image=False, prompt_tokens=0):
+    """FAST or STRONG for a request"""
+    if not Config.GEMINI_ROUTING_ENABLED:
+        return STRONG
+    if has_image or items > 1 or prompt_tokens > Config.GEMINI_FAST_MAX_PROMPT_TOKENS:
+        return STRONG
+    if description is not None and (looks_multi_item(description)
+                                    or len(description.split()) > Config.GEMINI_FAST_MAX_WORDS):
+        return STRONG
+    return FAST
+
+
+def model_for(tier):
+    """Model name configured for a tier"""
+    return Config.GEMINI_MODEL_FAST if tier == FAST else Config.GEMINI_MODEL_STRONG
@@ -1,23 +1,148 @@
-# Placeholder nutrient service to avoid import errors
+"""
+Nutrition goals and daily progress, backed by the nutrition_goals and
+food_logs tables.
+
+Goals are read on every dashboard refresh but change rarely, so each worker
+caches them per user for GOALS_CACHE_TTL seconds, keeping the
+GOALS_CACHE_SIZE most recently used users. An entry only serves the data
+version it was loaded under: saving goals bumps the user's version, so a
+change made through any worker is picked up on the next request.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+
+from backend.config import Config
+from backend.database import repository
+from backend.database.db_manager import db_connection
+from backend.utils.helpers import calculate_nutrient_percentage
+from backend.utils.metrics import cache_lookup
+
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat')
+
+# Column defaults of nutrition_goals, used until a user saves their own
+DEFAULT_GOALS = {'calories': 2000, 'protein': 150, 'carbs': 200, 'fat': 70}
+
+_goals_cache = OrderedDict()
+_goals_cache_lock = threading.Lock()
+
 
 class NutrientService:
-    def __init__(self):
-        """Initialize the nutrient service"""
-        print("Warning: using placeholder NutrientService")
-    
-    def get_user_goals(self, user_id):
-        """Get a user's nutrient goals"""
+    def __init__(self, cache_ttl=None):
+        self.cache_ttl = Config.GOALS_CACHE_TTL if cache_ttl is None else cache_ttl
+
+    def _cache_goals(self, user_id, data_version, goals):
+        with _goals_cache_lock:
+            _goals_cache[user_id] = (time.monotonic() + self.cache_ttl, data_version, goals)
+            _goals_cache.move_to_end(user_id)
+            while len(_goals_cache) > Config.GOALS_CACHE_SIZE:
+                _goals_cache.popitem(last=False)
+
+    def get_user_goals(self, user_id, data_version, conn=None):
+        """
+        Get a user's nutrient goals, falling back to the defaults. `data_version`
+        is the user's current version, as loaded with their token.
+        """
+        with _goals_cache_lock:
+            cached = _goals_cache.get(user_id)
+            hit = cached is not None and cached[1] == data_version and cached[0] > time.monotonic()
+            if hit:
+                _goals_cache.move_to_end(user_id)
+        cache_lookup('goals', hit)
+        if hit:
+            return cached[2]
+
+        if conn is not None:
+            row = repository.get_goals(conn, user_id)
+        else:
+            with db_connection(read_only=True) as conn:
+                row = repository.get_goals(conn, user_id)
+
+        goals = row.to_dict() if row else dict(DEFAULT_GOALS)
+        self._cache_goals(user_id, data_version, goals)
+        return goals
+
+    def update_goals(self, user_id, data_version, goals):
+        """Save a user's goals; missing nutrients keep their current value"""
+        current = self.get_user_goals(user_id, data_version)
+        merged = {nutrient: goals.get(nutrient, current[nutrient]) for nutrient in NUTRIENTS}
+
+        with db_connection() as conn:
+            row = repository.save_goals(
+                conn, user_id, merged['calories'], merged['protein'], merged['carbs'], merged['fat']
+            )
+            new_version = repository.bump_data_version(conn, user_id)
+
+        saved = row.to_dict()
+        self._cache_goals(user_id, new_version, saved)
+        return saved
+
+    def get_progress(self, user_id, data_version, day=None):
+        """Totals logged on `day` (default today) measured against the user's goals"""
+        day = day or date.today().isoformat()
+        goals = self.get_user_goals(user_id, data_version)
+
+        with db_connection(read_only=True) as conn:
+            *totals, entries = repository.get_day_totals(conn, user_id, day)
+
+        progress = self._measure(goals, np.array(totals, dtype=float))
+        return {'date': day, 'entries': entries, **progress}
+
+    def get_dashboard(self, conn, user, day=None):
+        """
+        Everything the dashboard renders for `day`, read over the caller's
+        connection: the day's logs, their totals and progress against goals
+        """
+        day = day or date.today().isoformat()
+        logs = repository.get_food_logs(conn, user.id, day)
+        goals = self.get_user_goals(user.id, user.data_version, conn)
+
+        # The day's rows are already here, so totals need no extra query
+        if logs:
+            totals = np.array([log[2:6] for log in logs], dtype=float).sum(axis=0)
+        else:
+            totals = np.zeros(len(NUTRIENTS))
+
         return {
-            "calories": 2000,
-            "protein": 150,
-            "carbs": 200,
-            "fat": 70
+            'user': user.to_dict(),
+            'date': day,
+            'logs': [log.to_dict() for log in logs],
+            **self._measure(goals, totals)
         }
-    
-    def update_progress(self, user_id, nutrients):
-        """Update a user's progress toward their nutrient goals"""
-        return True
-    
-    def analyze_food(self, food_data):
-        """Analyze food data and return nutritional information"""
-        return {"calories": 100, "protein": 10, "carbs": 15, "fat": 5}
\ No newline at end of file
+
+    @staticmethod
+    def _measure(goals, consumed):
+        """Per-nutrient consumed, remaining and percentage of goal"""
+        targets = np.array([goals[nutrient] for nutrient in NUTRIENTS], dtype=float)
+        percentages = calculate_nutrient_percentage(consumed, targets)
+        remaining = np.maximum(targets - consumed, 0)
+
+        return {
+            'goals': goals,
+            'consumed': dict(zip(NUTRIENTS, consumed.round(1).tolist())),
+            'remaining': dict(zip(NUTRIENTS, remaining.round(1).tolist())),
+            'percentages': dict(zip(NUTRIENTS, percentages.round(1).tolist()))
+        }
+
+    def track_nutrients(self, user_id, food_items):
+        """Log several food items in one transaction and return today's progress"""
+        with db_connection() as conn:
+            # Reserve one version per item up front
+            last_version = repository.bump_data_version(conn, user_id, len(food_items))
+            first_version = last_version - len(food_items) + 1
+            for version, item in enumerate(food_items, start=first_version):
+                repository.add_food_log(
+                    conn,
+                    user_id,
+                    item.get('food_name', 'Unknown Food'),
+                    item.get('calories', 0),
+                    item.get('protein_g', 0),
+                    item.get('carbs_g', 0),
+                    item.get('fat_g', 0),
+                    version=version
+                )
+
+        return self.get_progress(user_id, last_version)
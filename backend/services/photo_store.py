@@ -0,0 +1,170 @@
+"""
+Content-addressed storage for meal photos.
+
+An upload is stored once under the hex SHA-256 of its bytes, which is also
+its photo id (Config.PHOTO_DIR/originals/ab/<id>.jpg), so the same photo
+uploaded again, by anyone, costs no extra disk. JPEG thumbnails for each of
+Config.PHOTO_THUMBNAIL_SIZES are made by a per-process background worker
+right after the upload (thumbs/<size>/ab/<id>.jpg); one requested before it
+is ready is made on the spot. Food logs only keep the id, so image bytes
+never go through Postgres.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from backend.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Accepted formats, with the extension and content type originals are stored under
+FORMATS = {
+    'JPEG': ('.jpg', 'image/jpeg'),
+    'PNG': ('.png', 'image/png'),
+    'WEBP': ('.webp', 'image/webp'),
+    'GIF': ('.gif', 'image/gif'),
+}
+CONTENT_TYPES = dict(FORMATS.values())
+
+PHOTO_ID_RE = re.compile(r'^[0-9a-f]{64}$')
+
+THUMBNAIL_QUALITY = 80
+
+
+class PhotoError(ValueError):
+    """The upload is not an image that can be stored"""
+
+
+def is_photo_id(value):
+    return isinstance(value, str) and PHOTO_ID_RE.match(value) is not None
+
+
+def _write_atomic(path, data):
+    # Readers never see a partly written file, and concurrent writers of the
+    # same content simply replace each other's identical copy
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class PhotoStore:
+    """Originals and thumbnails under `root`, keyed by content hash"""
+
+    def __init__(self, root=None, sizes=None, max_bytes=None, workers=None):
+        self.root = root or Config.PHOTO_DIR
+        self.sizes = tuple(sizes or Config.PHOTO_THUMBNAIL_SIZES)
+        self.max_bytes = max_bytes or Config.PHOTO_MAX_BYTES
+        self.workers = workers or Config.PHOTO_THUMBNAIL_WORKERS
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def original_path(self, photo_id):
+        """Path of a stored original, or None if there is none"""
+        if not is_photo_id(photo_id):
+            return None
+        for extension, _ in FORMATS.values():
+            path = os.path.join(self.root, 'originals', photo_id[:2], photo_id + extension)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def exists(self, photo_id):
+        return self.original_path(photo_id) is not None
+
+    def _thumbnail_path(self, photo_id, size):
+        return os.path.join(self.root, 'thumbs', str(size), photo_id[:2], f"{photo_id}.jpg")
+
+    def save(self, data):
+        """Store an upload (bytes) if it is new and return its photo id"""
+        if len(data) > self.max_bytes:
+            raise PhotoError(f"Photos must be at most {self.max_bytes // (1024 * 1024)} MB")
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                image_format = img.format
+                img.verify()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+            raise PhotoError('File is not a readable image') from e
+        if image_format not in FORMATS:
+            raise PhotoError(f"Unsupported image format {image_format}")
+
+        photo_id = hashlib.sha256(data).hexdigest()
+        if not self.exists(photo_id):
+            extension = FORMATS[image_format][0]
+            _write_atomic(os.path.join(self.root, 'originals', photo_id[:2], photo_id + extension), data)
+            self._submit(photo_id)
+        return photo_id
+
+    def thumbnail_path(self, photo_id, size):
+        """Path of a thumbnail, made now if the worker has not got to it; None without an original"""
+        if size not in self.sizes:
+            raise PhotoError(f"Thumbnail size must be one of {', '.join(map(str, self.sizes))}")
+        if not is_photo_id(photo_id):
+            return None
+        path = self._thumbnail_path(photo_id, size)
+        if os.path.isfile(path):
+            return path
+        return self.make_thumbnails(photo_id, [size]).get(size)
+
+    def make_thumbnails(self, photo_id, sizes=None):
+        """Write JPEG thumbnails of an original, decoding it once; returns {size: path}"""
+        source = self.original_path(photo_id)
+        if source is None:
+            return {}
+
+        sizes = sorted(sizes or self.sizes, reverse=True)
+        paths = {}
+        with Image.open(source) as img:
+            # JPEGs are decoded at a reduced scale straight away, which is
+            # much faster than decoding everything and then shrinking it
+            img.draft('RGB', (sizes[0], sizes[0]))
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            # Largest first, so each smaller size is shrunk from the previous one
+            for size in sizes:
+                img.thumbnail((size, size))
+                buffer = io.BytesIO()
+                img.save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+                paths[size] = self._thumbnail_path(photo_id, size)
+                _write_atomic(paths[size], buffer.getvalue())
+        return paths
+
+    def _submit(self, photo_id):
+        # One pool per process, created lazily: threads do not survive a fork
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='photo-thumbnails')
+                    self._pid = os.getpid()
+        self._executor.submit(self._make_thumbnails_in_background, photo_id)
+
+    def _make_thumbnails_in_background(self, photo_id):
+        try:
+            self.make_thumbnails(photo_id)
+        except Exception:
+            # Served requests will retry on demand
+            logger.exception("Could not make thumbnails for photo %s", photo_id)
+
+    def wait(self):
+        """Block until queued thumbnails are written (for tests and scripts)"""
+        with self._lock:
+            executor, self._executor, self._pid = self._executor, None, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+photo_store = PhotoStore()
@@ -0,0 +1,60 @@
+"""
+Canonical prompts for the Gemini analysis calls.
+
+Every prompt is built from the same compact item schema and rules, without
+indentation or a worked example, so requests stay short and the answers keep
+the shape GeminiService parses. estimate_tokens() approximates Gemini's
+tokenizer locally (no API call), for routing and for comparing prompts.
+"""
+import math
+import re
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+# One analysed food; amounts are strings with units so they can be parsed by nutrient_units
+ITEM_SCHEMA = (
+    '{"food_name":str,"portion_size":str,"calories":number,"protein":str,"carbohydrates":str,'
+    '"fat":str,"fiber":str,"vitamins_and_minerals":{name:str},"potential_allergens":[str]}'
+)
+INGREDIENT_SCHEMA = (
+    '{"name":str,"calories":number,"protein":str,"carbohydrates":str,"fat":str,"fiber":str,'
+    '"vitamins_and_minerals":{name:str}}'
+)
+
+RULES = (
+    'Amounts are strings with units ("12 g", "8 mg"). vitamins_and_minerals keys: '
+    'vitamin_<a|b1|b2|b3|b5|b6|b9|b12|c|d|e|k>, calcium, iron, magnesium, phosphorus, potassium, sodium, zinc. '
+    'Unknown values are null. Reply with JSON only.'
+)
+
+
+def text_analysis_prompt(description):
+    """Nutrition for one free-text food description"""
+    return f'Nutrition for: "{description}"\nJSON: {ITEM_SCHEMA}\n{RULES}'
+
+
+def image_analysis_prompt():
+    """Nutrition for every separate food or drink in an image"""
+    return (
+        'List every separate food or drink in this image with nutrition for the portion shown.\n'
+        f'JSON: {{"items":[{ITEM_SCHEMA}]}}\n{RULES}'
+    )
+
+
+def ingredients_prompt(ingredients):
+    """Nutrition for exact quantities of raw recipe ingredients, given as (name, amount, unit)"""
+    listing = "\n".join(
+        f"{i}. {amount:g} {unit} of {name}" for i, (name, amount, unit) in enumerate(ingredients, start=1)
+    )
+    return (
+        f'Nutrition for exactly these quantities of raw ingredients:\n{listing}\n'
+        f'JSON array, one object per ingredient in the same order: [{INGREDIENT_SCHEMA}]\n{RULES}'
+    )
+
+
+def estimate_tokens(text):
+    """
+    Approximate token count: about four characters per token for English
+    text, and at least one token per word or punctuation mark.
+    """
+    return max(math.ceil(len(text) / 4), len(_WORD_RE.findall(text)))
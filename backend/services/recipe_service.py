@@ -0,0 +1,292 @@
+"""
+Recipes built from ingredient lines with quantities.
+
+Nutrition is analysed once per ingredient (per 100 g, per 100 ml or per
+item) and stored in the shared ingredient_nutrition table, so every later
+recipe that uses the ingredient reuses it. Recipe totals and per-serving
+values are plain arithmetic over those rows: logging a serving never calls
+Gemini.
+"""
+import math
+import os
+import re
+from datetime import date
+
+import numpy as np
+
+from backend.database import repository
+from backend.database.db_manager import db_connection
+from backend.utils.metrics import cache_lookup
+from backend.utils.nutrient_units import MICRONUTRIENTS, build_micronutrient_vector, parse_calories, parse_grams
+
+# Unit -> (basis, amount of the basis per unit). Volumes keep their own
+# basis because density differs per ingredient (a cup of flour is not 240 g).
+UNITS = {
+    'g': ('g', 1), 'gram': ('g', 1), 'grams': ('g', 1),
+    'kg': ('g', 1000), 'kilogram': ('g', 1000), 'kilograms': ('g', 1000),
+    'oz': ('g', 28.35), 'ounce': ('g', 28.35), 'ounces': ('g', 28.35),
+    'lb': ('g', 453.6), 'lbs': ('g', 453.6), 'pound': ('g', 453.6), 'pounds': ('g', 453.6),
+    'ml': ('ml', 1), 'l': ('ml', 1000), 'liter': ('ml', 1000), 'litre': ('ml', 1000),
+    'cup': ('ml', 240), 'cups': ('ml', 240),
+    'tbsp': ('ml', 15), 'tablespoon': ('ml', 15), 'tablespoons': ('ml', 15),
+    'tsp': ('ml', 5), 'teaspoon': ('ml', 5), 'teaspoons': ('ml', 5),
+    'piece': ('piece', 1), 'pieces': ('piece', 1), 'whole': ('piece', 1),
+    'clove': ('clove', 1), 'cloves': ('clove', 1),
+    'slice': ('slice', 1), 'slices': ('slice', 1),
+    'can': ('can', 1), 'cans': ('can', 1),
+}
+
+# Cached nutrition is per 100 g / 100 ml, and per single item otherwise
+BASIS_AMOUNTS = {'g': 100, 'ml': 100}
+
+# Columns of the nutrition matrix: macros, then the canonical micronutrients
+MACROS = ('calories', 'protein', 'carbs', 'fats')
+
+_LINE_RE = re.compile(
+    r'^\s*(?P<quantity>\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)\s*(?P<unit>[a-zA-Z]+\.?)?\s+(?:of\s+)?(?P<name>.+?)\s*$'
+)
+
+
+class RecipeError(ValueError):
+    """Invalid recipe input"""
+
+
+def _parse_number(text):
+    """Parse "2", "1.5", "1/2" or "1 1/2"; raises RecipeError for anything else"""
+    total = 0.0
+    try:
+        for part in text.split():
+            if '/' in part:
+                numerator, denominator = part.split('/')
+                total += float(numerator) / float(denominator)
+            else:
+                total += float(part)
+    except (ValueError, TypeError, ZeroDivisionError) as e:
+        raise RecipeError(f"Invalid quantity: {text}") from e
+    if not text.split() or not math.isfinite(total):
+        raise RecipeError(f"Invalid quantity: {text}")
+    return total
+
+
+def _is_number(value):
+    # bool is an int subclass, but True is not a quantity
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def normalize_ingredient_name(name):
+    return re.sub(r'\s+', ' ', str(name).strip().lower()).strip(' ,.;')
+
+
+def parse_ingredient(entry):
+    """
+    Parse "500 g ground beef", "1/2 cup rice", "2 onions" or
+    {"name": ..., "quantity": ..., "unit": ...} into
+    (name, quantity, unit, basis, amount). Lines without a quantity
+    ("salt to taste") get amount 0 and no basis.
+    """
+    if isinstance(entry, dict):
+        name = normalize_ingredient_name(entry.get('name') or '')
+        quantity = entry.get('quantity')
+        unit = entry.get('unit') or ''
+        if not isinstance(unit, str):
+            raise RecipeError(f"Invalid unit for {name or 'ingredient'}")
+        unit = unit.strip().lower().rstrip('.') or None
+        if isinstance(quantity, str):
+            quantity = _parse_number(quantity)
+    elif isinstance(entry, str):
+        match = _LINE_RE.match(entry)
+        if match:
+            quantity = _parse_number(match.group('quantity'))
+            unit = (match.group('unit') or '').lower().rstrip('.') or None
+            name = match.group('name')
+            if unit and unit not in UNITS:
+                # "2 onions": the word after the number is part of the name
+                name = f"{unit} {name}"
+                unit = None
+            name = normalize_ingredient_name(name)
+        else:
+            name, quantity, unit = normalize_ingredient_name(entry), None, None
+    else:
+        raise RecipeError("Ingredients must be strings or objects")
+
+    if not name:
+        raise RecipeError("Every ingredient needs a name")
+    if quantity is None:
+        return name, None, unit, None, 0.0
+    if not _is_number(quantity) or quantity < 0:
+        raise RecipeError(f"Invalid quantity for {name}")
+    if unit is not None and unit not in UNITS:
+        raise RecipeError(f"Unknown unit '{unit}' for {name}")
+
+    basis, per_unit = UNITS[unit or 'piece']
+    return name, float(quantity), unit, basis, float(quantity) * per_unit
+
+
+def _ingredient_values(ingredient):
+    """One row of the nutrition matrix, NaN for unknown micronutrients"""
+    micronutrients = ingredient.micronutrients or [None] * len(MICRONUTRIENTS)
+    return [ingredient.calories or 0, ingredient.protein or 0, ingredient.carbs or 0, ingredient.fats or 0] + [
+        np.nan if value is None else value for value in micronutrients
+    ]
+
+
+def compute_totals(parsed, ingredients):
+    """
+    Whole-recipe (macros, micronutrients) from parsed lines and cached
+    ingredients: a scaled sum over the nutrition matrix. Micronutrients no
+    ingredient reports stay None.
+    """
+    rows, scales = [], []
+    for name, _, _, basis, amount in parsed:
+        ingredient = ingredients.get((name, basis))
+        if ingredient is None or not amount:
+            continue
+        rows.append(_ingredient_values(ingredient))
+        scales.append(amount / BASIS_AMOUNTS.get(basis, 1))
+
+    if not rows:
+        return [0.0] * len(MACROS), None
+
+    matrix = np.array(rows, dtype=float) * np.array(scales)[:, None]
+    totals = np.nansum(matrix, axis=0)
+    known = ~np.isnan(matrix).all(axis=0)
+
+    macros = [round(float(value), 2) for value in totals[:len(MACROS)]]
+    micronutrients = [
+        round(float(value), 4) if is_known else None
+        for value, is_known in zip(totals[len(MACROS):], known[len(MACROS):])
+    ]
+    return macros, micronutrients if any(value is not None for value in micronutrients) else None
+
+
+def scale_micronutrients(micronutrients, factor):
+    if not micronutrients:
+        return None
+    return [None if value is None else round(value * factor, 4) for value in micronutrients]
+
+
+class RecipeService:
+    def __init__(self, gemini_service=None):
+        self._gemini_service = gemini_service
+
+    @property
+    def gemini_service(self):
+        if self._gemini_service is None:
+            from backend.services.gemini_service import GeminiService
+            self._gemini_service = GeminiService(os.environ.get('GEMINI_API_KEY'))
+        return self._gemini_service
+
+    def _analyze_missing(self, keys):
+        """Analyse uncached (name, basis) keys in one Gemini call"""
+        result = self.gemini_service.analyze_ingredients(
+            [(name, BASIS_AMOUNTS.get(basis, 1), basis) for name, basis in keys]
+        )
+        if not result["success"]:
+            raise RuntimeError(f"Ingredient analysis failed: {result['error']}")
+
+        # Gemini's numbers can come back as strings such as "95 kcal"
+        return [
+            (name, basis, parse_calories(item.get('calories')), parse_grams(item.get('protein')),
+             parse_grams(item.get('carbohydrates')), parse_grams(item.get('fat')), build_micronutrient_vector(item))
+            for (name, basis), item in zip(keys, result["data"])
+        ]
+
+    def save_recipe(self, user_id, name, servings, entries, recipe_id=None):
+        """Create or replace a recipe; only ingredients never seen before are sent to Gemini"""
+        name = (name or '').strip()
+        if not name:
+            raise RecipeError("Recipe name is required")
+        if not _is_number(servings) or servings <= 0:
+            raise RecipeError("servings must be a positive number")
+        if not entries or not isinstance(entries, list):
+            raise RecipeError("ingredients must be a non-empty list")
+
+        parsed = [parse_ingredient(entry) for entry in entries]
+        keys = sorted({(line[0], line[3]) for line in parsed if line[3] is not None and line[4]})
+
+        with db_connection(read_only=True) as conn:
+            ingredients = repository.get_ingredients(conn, keys)
+
+        # The Gemini call happens outside any transaction so no connection waits on it
+        missing = [key for key in keys if key not in ingredients]
+        for key in keys:
+            cache_lookup('ingredient_nutrition', key in ingredients)
+        analysed = self._analyze_missing(missing) if missing else []
+
+        with db_connection() as conn:
+            for row in analysed:
+                repository.save_ingredient(conn, *row)
+            if analysed:
+                ingredients = repository.get_ingredients(conn, keys)
+
+            totals, micronutrients = compute_totals(parsed, ingredients)
+            lines = [
+                (line_name, quantity, unit, amount,
+                 ingredients[(line_name, basis)].id if (line_name, basis) in ingredients else None)
+                for line_name, quantity, unit, basis, amount in parsed
+            ]
+            recipe = repository.save_recipe(
+                conn, user_id, recipe_id, name[:100], servings, totals, micronutrients, lines
+            )
+
+        return recipe, len(missing)
+
+    def get_recipes(self, user_id):
+        with db_connection(read_only=True) as conn:
+            return repository.get_recipes(conn, user_id)
+
+    def get_recipe(self, user_id, recipe_id):
+        """The recipe and its ingredient lines, each with its contribution to the totals"""
+        with db_connection(read_only=True) as conn:
+            recipe = repository.get_recipe(conn, user_id, recipe_id)
+            if recipe is None:
+                return None, []
+            lines = repository.get_recipe_ingredients(conn, recipe_id)
+
+        ingredients = []
+        for line in lines:
+            scale = line.amount / BASIS_AMOUNTS.get(line.basis, 1) if line.basis else 0
+            ingredients.append({
+                'name': line.name,
+                'quantity': line.quantity,
+                'unit': line.unit,
+                'calories': round((line.calories or 0) * scale, 1),
+                'protein_g': round((line.protein or 0) * scale, 1),
+                'carbs_g': round((line.carbs or 0) * scale, 1),
+                'fat_g': round((line.fats or 0) * scale, 1)
+            })
+        return recipe, ingredients
+
+    def delete_recipe(self, user_id, recipe_id):
+        with db_connection() as conn:
+            return repository.delete_recipe(conn, user_id, recipe_id)
+
+    def log_recipe(self, user_id, recipe_id, servings=1, logged_at=None):
+        """Log servings of a recipe as a food log; returns (log_id, entry) or None if not found"""
+        if not _is_number(servings) or servings <= 0:
+            raise RecipeError("servings must be a positive number")
+
+        with db_connection() as conn:
+            recipe = repository.get_recipe(conn, user_id, recipe_id)
+            if recipe is None:
+                return None
+
+            factor = servings / recipe.servings
+            entry = {
+                'food_name': f"{recipe.name} ({servings:g} serving{'s' if servings != 1 else ''})"[:100],
+                'calories': round(recipe.calories * factor),
+                'protein_g': round(recipe.protein * factor, 1),
+                'carbs_g': round(recipe.carbs * factor, 1),
+                'fat_g': round(recipe.fats * factor, 1),
+                'log_date': logged_at or date.today().isoformat()
+            }
+
+            version = repository.bump_data_version(conn, user_id)
+            log_id = repository.add_food_log(
+                conn, user_id, entry['food_name'], entry['calories'], entry['protein_g'],
+                entry['carbs_g'], entry['fat_g'], logged_at=logged_at,
+                micronutrients=scale_micronutrients(recipe.micronutrients, factor),
+                version=version
+            )
+
+        return log_id, entry
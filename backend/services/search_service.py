@@ -0,0 +1,86 @@
+"""
+Search over a user's food history by name.
+
+Names are matched through the name_search tsvector column and its GIN
+index, with every word of the query treated as a prefix ("prot bar" finds
+"Protein Bar"). When pg_trgm is installed, names that are merely similar
+("protien") match too. Results come best first and are paged with an
+opaque keyset cursor, so later pages cost the same as the first.
+"""
+import base64
+import json
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from backend.database import repository
+from backend.database.db_manager import db_connection
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+# Words of a query beyond this are ignored
+MAX_QUERY_WORDS = 8
+
+# Whether pg_trgm is installed, checked on first use per process
+_fuzzy = None
+
+
+class SearchError(ValueError):
+    """The query or cursor cannot be used"""
+
+
+def build_tsquery(text):
+    """'Protein bar' -> 'protein:* & bar:*', or None without any words"""
+    words = _WORD_RE.findall(text.lower())[:MAX_QUERY_WORDS]
+    if not words:
+        return None
+    return ' & '.join(f"{word}:*" for word in words)
+
+
+def encode_cursor(rank, date_added, log_id):
+    key = json.dumps([str(rank), date_added.isoformat(), log_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(rank, date_added, id) from encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, date_added, log_id = json.loads(base64.urlsafe_b64decode(padded))
+        return Decimal(rank), datetime.fromisoformat(date_added), int(log_id)
+    except (ValueError, TypeError, InvalidOperation) as e:
+        raise SearchError('Invalid cursor') from e
+
+
+def _uses_fuzzy_matching(conn):
+    global _fuzzy
+    if _fuzzy is None:
+        _fuzzy = repository.has_trigram_search(conn)
+    return _fuzzy
+
+
+def search_food_logs(user_id, text, start=None, end=None, cursor=None, limit=20):
+    """
+    One page of the user's logs matching `text`, logged in [start, end) when
+    given: returns (results, next_cursor), where results are log dicts with
+    their rank and next_cursor is None on the last page
+    """
+    tsquery = build_tsquery(text)
+    if tsquery is None:
+        raise SearchError('Query must contain at least one word')
+    after = decode_cursor(cursor) if cursor else None
+
+    with db_connection(read_only=True) as conn:
+        # One extra row tells whether there is another page
+        hits = repository.search_food_logs(
+            conn, user_id, tsquery, text.strip(), start, end, after, limit + 1,
+            fuzzy=_uses_fuzzy_matching(conn)
+        )
+
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last, rank = hits[-1]
+        next_cursor = encode_cursor(rank, last.date_added, last.id)
+
+    return [dict(log.to_dict(), rank=float(rank)) for log, rank in hits], next_cursor
@@ -0,0 +1,185 @@
+"""
+Gemini usage accounting.
+
+Every generate_content call is recorded against the current user, endpoint,
+operation and model. Counts are aggregated in memory and written to the
+gemini_usage table in bulk by a background thread in each worker, so
+recording a call never waits on the database. Quota checks add this worker's
+unflushed counts to the stored totals.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import date
+
+from flask import g, has_request_context, request
+
+from backend.config import Config
+from backend.database import repository
+from backend.database.db_manager import db_connection
+
+logger = logging.getLogger(__name__)
+
+# calls, errors, prompt_tokens, response_tokens, request_bytes, response_bytes, latency_ms
+COUNTERS = 7
+
+ANONYMOUS_USER_ID = 0
+
+
+def current_user_id():
+    """User id of the current request (0 for anonymous), set by the auth or rate-limit decorators"""
+    if not has_request_context():
+        return ANONYMOUS_USER_ID
+    return g.get('user_id') or ANONYMOUS_USER_ID
+
+
+def current_endpoint():
+    if not has_request_context():
+        return 'background'
+    return request.endpoint or request.path
+
+
+class UsageTracker:
+    """Per-process usage aggregates, flushed to gemini_usage every `interval` seconds"""
+
+    def __init__(self, interval=None):
+        self.interval = interval if interval is not None else Config.GEMINI_USAGE_FLUSH_INTERVAL
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+
+    def record(self, operation, model, user_id=None, endpoint=None, error=False, prompt_tokens=0,
+               response_tokens=0, request_bytes=0, response_bytes=0, latency_ms=0):
+        """Add one call to the in-memory aggregates"""
+        key = (
+            date.today(),
+            current_user_id() if user_id is None else user_id,
+            (endpoint or current_endpoint())[:100],
+            operation[:50],
+            model[:100]
+        )
+        values = (1, int(error), prompt_tokens or 0, response_tokens or 0,
+                  request_bytes or 0, response_bytes or 0, int(latency_ms))
+
+        with self._lock:
+            totals = self._pending.get(key)
+            if totals is None:
+                self._pending[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    totals[i] += value
+
+        self._ensure_flusher()
+
+    def pending_for(self, user_id, day):
+        """Unflushed (calls, tokens) of a user on `day` in this process"""
+        calls = tokens = 0
+        with self._lock:
+            for key, totals in self._pending.items():
+                if key[0] == day and key[1] == user_id:
+                    calls += totals[0]
+                    tokens += totals[2] + totals[3]
+        return calls, tokens
+
+    def flush(self):
+        """Write pending aggregates in one statement; on failure they are kept for the next flush"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            try:
+                with db_connection() as conn:
+                    repository.add_gemini_usage(conn, [(*key, *totals) for key, totals in pending.items()])
+            except Exception as e:
+                logger.exception("Error flushing Gemini usage")
+                with self._lock:
+                    for key, totals in pending.items():
+                        current = self._pending.setdefault(key, [0] * COUNTERS)
+                        for i, value in enumerate(totals):
+                            current[i] += value
+                return 0
+
+            return len(pending)
+
+    def _ensure_flusher(self):
+        # Started lazily, once per process: threads do not survive a fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name='gemini-usage-flusher', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+
+usage_tracker = UsageTracker()
+
+
+def get_usage_today(user_id):
+    """(calls, tokens) a user has used today, including this worker's unflushed calls"""
+    today = date.today()
+    with db_connection(read_only=True) as conn:
+        calls, tokens = repository.get_user_usage(conn, today, user_id)
+    pending_calls, pending_tokens = usage_tracker.pending_for(user_id, today)
+    return int(calls) + pending_calls, int(tokens) + pending_tokens
+
+
+def quota_status(user_id):
+    """Today's usage against the configured quotas"""
+    calls, tokens = get_usage_today(user_id)
+    call_quota = Config.GEMINI_DAILY_CALL_QUOTA
+    token_quota = Config.GEMINI_DAILY_TOKEN_QUOTA
+    return {
+        'day': date.today().isoformat(),
+        'calls': calls,
+        'tokens': tokens,
+        'call_quota': call_quota or None,
+        'token_quota': token_quota or None,
+        'exceeded': bool(call_quota and calls >= call_quota) or bool(token_quota and tokens >= token_quota)
+    }
+
+
+def _totals(row):
+    calls, errors, prompt_tokens, response_tokens, request_bytes, response_bytes, avg_latency_ms = row
+    return {
+        'calls': int(calls or 0),
+        'errors': int(errors or 0),
+        'prompt_tokens': int(prompt_tokens or 0),
+        'response_tokens': int(response_tokens or 0),
+        'request_bytes': int(request_bytes or 0),
+        'response_bytes': int(response_bytes or 0),
+        'avg_latency_ms': int(avg_latency_ms) if avg_latency_ms is not None else None
+    }
+
+
+def usage_report(since, top_users=20):
+    """Usage since `since` by day, by endpoint and model, and for the heaviest users"""
+    # This worker's recent calls are included; other workers' follow within one flush interval
+    usage_tracker.flush()
+
+    with db_connection() as conn:
+        by_day, by_endpoint, users = repository.get_usage_report(conn, since, top_users)
+
+    return {
+        'since': since.isoformat(),
+        'by_day': [{'day': row[0].isoformat(), **_totals(row[1:])} for row in by_day],
+        'by_endpoint': [
+            {'endpoint': row[0], 'operation': row[1], 'model': row[2], **_totals(row[3:])}
+            for row in by_endpoint
+        ],
+        'top_users': [
+            {'user_id': row[0], 'username': row[1], **_totals(row[2:])}
+            for row in users
+        ]
+    }
@@ -0,0 +1,87 @@
+"""
+Fingerprinted static assets built by build_assets.py.
+
+Templates link assets with asset_url('js/dashboard.js'), which resolves to
+the hashed build (/static/dist/js/dashboard.95ee7e2e14.js) when the manifest
+lists it and to the plain file otherwise, so a checkout without a build
+still works. Hashed files never change, so they are served with a one-year
+immutable Cache-Control and, when the client accepts it, as their
+precompressed .br or .gz variant.
+"""
+import json
+import logging
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory, url_for
+
+logger = logging.getLogger(__name__)
+
+DIST_PREFIX = 'dist/'
+MAX_AGE = 365 * 24 * 3600
+IMMUTABLE_CACHE_CONTROL = f'public, max-age={MAX_AGE}, immutable'
+
+# Preferred first; extension of the precompressed file for each encoding
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def load_manifest(static_folder):
+    """Source path -> built path, or {} when the assets have not been built"""
+    try:
+        with open(os.path.join(static_folder, 'dist', 'manifest.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.warning("Ignoring unreadable asset manifest: %s", e)
+        return {}
+
+
+def asset_url(filename):
+    """URL of a static file, preferring its fingerprinted build"""
+    manifest = current_app.extensions.get('asset_manifest', {})
+    return url_for('static', filename=manifest.get(filename, filename))
+
+
+def _accepted_encodings():
+    # q=0 means "not acceptable", e.g. "br;q=0, gzip" rules brotli out
+    return {value.lower() for value, quality in request.accept_encodings if quality > 0}
+
+
+def serve_static(filename):
+    """The static view: built assets get immutable caching and precompressed variants"""
+    if not filename.startswith(DIST_PREFIX):
+        return current_app.send_static_file(filename)
+
+    static_folder = current_app.static_folder
+    accepted = _accepted_encodings()
+    for encoding, extension in ENCODINGS:
+        if encoding in accepted and os.path.isfile(os.path.join(static_folder, filename + extension)):
+            response = send_from_directory(static_folder, filename + extension, max_age=MAX_AGE)
+            # Typed as the original file, not as a .br/.gz download
+            response.headers['Content-Type'] = _content_type(filename)
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Disposition', None)
+            break
+    else:
+        response = send_from_directory(static_folder, filename, max_age=MAX_AGE)
+
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _content_type(filename):
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type == 'application/javascript':
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def init_assets(app):
+    """Load the manifest, expose asset_url() to templates and serve built assets"""
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    app.add_template_global(asset_url)
+    app.view_functions['static'] = serve_static
+    if not app.extensions['asset_manifest']:
+        logger.info("No asset manifest found; serving unbuilt static files (run python build_assets.py)")
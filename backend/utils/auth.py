@@ -0,0 +1,73 @@
+import hmac
+from functools import wraps
+
+from flask import g, request, jsonify
+
+from backend.config import Config
+from backend.database import repository
+from backend.database.db_manager import db_connection
+from backend.database.replicas import is_replica_connection
+
+
+def get_bearer_token():
+    """Return the bearer token from the Authorization header, if any"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    return auth_header.split(' ')[1]
+
+
+def lookup_user(conn, token):
+    """Resolve a token to its User over an open connection, or None if unknown"""
+    user = repository.get_user_by_token(conn, token)
+
+    if user is None and is_replica_connection(conn):
+        # A token issued moments ago may not have replicated yet
+        with db_connection() as primary:
+            user = repository.get_user_by_token(primary, token)
+
+    return user
+
+
+def authenticate(token, read_only=False):
+    """Resolve a token to its User, or None if the token is unknown"""
+    with db_connection(read_only=read_only, token=token) as conn:
+        return lookup_user(conn, token)
+
+
+def token_required(f):
+    """Pass the authenticated User as the first argument of the view"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = get_bearer_token()
+        if not token:
+            return jsonify({'error': 'Missing or invalid token'}), 401
+
+        try:
+            # Token lookups for read-only requests can be served by a replica
+            current_user = authenticate(token, read_only=request.method == 'GET')
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+        if not current_user:
+            return jsonify({'error': 'Invalid token'}), 401
+
+        # Lets request-scoped accounting attribute work to the user
+        g.user_id = current_user.id
+        return f(current_user, *args, **kwargs)
+
+    return decorated
+
+
+def admin_required(f):
+    """Allow the view only for requests bearing Config.ADMIN_TOKEN"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        admin_token = Config.ADMIN_TOKEN
+        token = get_bearer_token()
+        if not admin_token or not token or not hmac.compare_digest(token, admin_token):
+            return jsonify({'error': 'Admin token required'}), 403
+
+        return f(*args, **kwargs)
+
+    return decorated
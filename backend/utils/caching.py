@@ -0,0 +1,39 @@
+"""
+Conditional GET for per-user data. The ETag is built from the user's
+data_version (bumped on every change to their logs or goals), so a matching
+If-None-Match can be answered before any query runs.
+"""
+from datetime import date
+
+from flask import current_app, request
+
+from backend.utils.metrics import cache_lookup
+
+
+def data_etag(user):
+    """
+    ETag for responses derived from a user's data. Today's date is part of it
+    because ranges such as "the last 7 days" move even when the data does not.
+    """
+    return f"{user.data_version}-{date.today().isoformat()}"
+
+
+def _mark_revalidate(response, etag):
+    response.set_etag(etag)
+    # Private: responses are per user. no-cache: always revalidate with the ETag.
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified(etag):
+    """A 304 response if the client already holds this version, otherwise None"""
+    hit = etag in request.if_none_match
+    cache_lookup('http_etag', hit)
+    if hit:
+        return _mark_revalidate(current_app.response_class(status=304), etag)
+    return None
+
+
+def with_etag(response, etag):
+    """Attach the ETag and revalidation headers to a full response"""
+    return _mark_revalidate(response, etag)
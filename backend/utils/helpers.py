@@ -1,7 +1,18 @@
+import numpy as np
+
 def calculate_nutrient_percentage(nutrient_value, goal_value):
-    if goal_value <= 0:
-        return 0
-    return (nutrient_value / goal_value) * 100
+    """
+    Percentage of goal reached. Accepts scalars or equal-length sequences,
+    so all nutrients can be computed in one call; goals <= 0 give 0.
+    """
+    values = np.asarray(nutrient_value, dtype=float)
+    goals = np.asarray(goal_value, dtype=float)
+    percentages = np.divide(values * 100, goals,
+                            out=np.zeros(np.broadcast(values, goals).shape),
+                            where=goals > 0)
+    if percentages.ndim == 0:
+        return float(percentages)
+    return percentages
 
 def format_nutrient_value(value):
     return "{:.2f}".format(value)
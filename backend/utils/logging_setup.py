@@ -0,0 +1,184 @@
+"""
+Structured, non-blocking logging.
+
+configure_logging() routes every record through a QueueHandler, so request
+threads only enqueue; a QueueListener thread formats the records and writes
+them to stdout (as JSON lines unless Config.LOG_FORMAT is 'text'). Records
+logged during a request carry its request id, taken from an incoming
+X-Request-ID header or generated, and echoed in the response. Levels are set
+with Config.LOG_LEVEL and per module with Config.LOG_LEVELS, e.g.
+"backend.services.gemini_service=DEBUG,backend.database=WARNING".
+
+Large debug payloads (raw Gemini responses and the like) go through
+log_payload(), which skips all work unless DEBUG is enabled for the logger
+and logs at most Config.LOG_PAYLOAD_SAMPLES_PER_MINUTE payloads per kind.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+from flask import g, has_request_context, request
+
+from backend.config import Config
+
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else was passed in `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_listener_pid = None
+_configure_lock = threading.Lock()
+
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the request id and route; runs in the calling thread, before queueing"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id', '-')
+            record.route = request.url_rule.rule if request.url_rule else request.path
+        else:
+            record.request_id = '-'
+            record.route = None
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues records with the message rendered but the traceback kept apart for the formatter"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra` fields"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _PayloadSampler:
+    """Per-kind token bucket allowing a few payloads per minute"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, kind, per_minute):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(kind, (per_minute, now))
+            tokens = min(per_minute, tokens + (now - updated) * per_minute / 60.0)
+            allowed = tokens >= 1
+            self._buckets[kind] = (tokens - 1 if allowed else tokens, now)
+            return allowed
+
+
+_payload_sampler = _PayloadSampler()
+
+
+def log_payload(logger, kind, message, payload):
+    """Log a large debug payload, sampled per `kind` and truncated to Config.LOG_PAYLOAD_MAX_CHARS"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if not _payload_sampler.allow(kind, Config.LOG_PAYLOAD_SAMPLES_PER_MINUTE):
+        return
+
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    if len(text) > Config.LOG_PAYLOAD_MAX_CHARS:
+        text = text[:Config.LOG_PAYLOAD_MAX_CHARS] + f'... ({len(text)} chars)'
+    logger.debug(message, extra={'payload_kind': kind, 'payload': text})
+
+
+def parse_levels(spec):
+    """'a.b=DEBUG,c=WARNING' -> {'a.b': 'DEBUG', 'c': 'WARNING'}"""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _assign_request_id():
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+
+
+def _echo_request_id(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+
+def _start_listener():
+    global _listener, _listener_pid
+
+    with _configure_lock:
+        # The listener thread does not survive a fork, so each process starts its own
+        if _listener_pid == os.getpid():
+            return
+
+        stream_handler = logging.StreamHandler()
+        if Config.LOG_FORMAT == 'text':
+            stream_handler.setFormatter(logging.Formatter(
+                '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+            ))
+        else:
+            stream_handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(RequestContextFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                root.removeHandler(handler)
+        root.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        _listener_pid = os.getpid()
+        # Drain what is still queued when the process exits
+        atexit.register(_listener.stop)
+
+
+def configure_logging(app=None):
+    """Install the queue handler and levels; with an app, also assign request ids"""
+    logging.getLogger().setLevel(Config.LOG_LEVEL.upper())
+    for name, level in parse_levels(Config.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _start_listener()
+
+    if app is not None:
+        app.before_request(_assign_request_id)
+        app.after_request(_echo_request_id)
@@ -0,0 +1,81 @@
+"""
+Prometheus metrics, served at /metrics in the text exposition format.
+
+Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+(set up by gunicorn.conf.py) and /metrics merges the files of all workers,
+so whichever worker answers the scrape reports totals for the whole server.
+Without the directory (flask run, tests) the process's own registry is
+served.
+"""
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+# Seconds; from a cache hit up to a slow Gemini call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route',
+    ('method', 'route', 'status'), buckets=LATENCY_BUCKETS
+)
+GEMINI_LATENCY = Histogram(
+    'gemini_request_duration_seconds', 'Gemini generate_content latency by model tier',
+    ('operation', 'tier', 'model', 'outcome'), buckets=LATENCY_BUCKETS
+)
+GEMINI_PAYLOAD = Histogram(
+    'gemini_payload_bytes', 'Gemini request and response sizes',
+    ('operation', 'direction'), buckets=BYTES_BUCKETS
+)
+DB_CHECKOUT_LATENCY = Histogram(
+    'db_checkout_duration_seconds', 'Time to obtain a database connection, including connection setup',
+    ('role', 'source'), buckets=DB_BUCKETS
+)
+DB_QUERY_LATENCY = Histogram(
+    'db_query_duration_seconds', 'Prepared statement execution time',
+    ('statement',), buckets=DB_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups by cache and result (hit or miss)',
+    ('cache', 'result')
+)
+
+
+def cache_lookup(cache, hit):
+    """Count one lookup in `cache`; hit ratios are hits / all lookups"""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def _collect():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+def _observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint != 'metrics':
+        # The URL rule keeps the label set bounded (/api/recipes/<int:recipe_id>, not every id)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+
+def init_metrics(app):
+    """Time every request and serve /metrics"""
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    app.add_url_rule('/metrics', 'metrics', lambda: Response(_collect(), mimetype=CONTENT_TYPE_LATEST))
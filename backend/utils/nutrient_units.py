@@ -0,0 +1,249 @@
+"""
+Normalisation of the nutrient strings returned by Gemini ("12 mg", "400 IU")
+into numbers stored in a canonical unit per nutrient
+"""
+import re
+from collections.abc import Mapping
+
+# Canonical storage order for food_logs.micronutrients. Stored arrays are
+# indexed by position, so new nutrients must only ever be appended.
+MICRONUTRIENTS = [
+    ('fiber', 'g'),
+    ('vitamin_a', 'mcg'),
+    ('vitamin_b1', 'mg'),
+    ('vitamin_b2', 'mg'),
+    ('vitamin_b3', 'mg'),
+    ('vitamin_b5', 'mg'),
+    ('vitamin_b6', 'mg'),
+    ('vitamin_b9', 'mcg'),
+    ('vitamin_b12', 'mcg'),
+    ('vitamin_c', 'mg'),
+    ('vitamin_d', 'mcg'),
+    ('vitamin_e', 'mg'),
+    ('vitamin_k', 'mcg'),
+    ('calcium', 'mg'),
+    ('iron', 'mg'),
+    ('magnesium', 'mg'),
+    ('phosphorus', 'mg'),
+    ('potassium', 'mg'),
+    ('sodium', 'mg'),
+    ('zinc', 'mg'),
+]
+
+MICRONUTRIENT_NAMES = [name for name, unit in MICRONUTRIENTS]
+MICRONUTRIENT_UNITS = dict(MICRONUTRIENTS)
+
+# 1-based, matching PostgreSQL array subscripts
+MICRONUTRIENT_INDEX = {name: i + 1 for i, name in enumerate(MICRONUTRIENT_NAMES)}
+
+# Alternative names Gemini uses for the same nutrient
+NUTRIENT_ALIASES = {
+    'dietary_fiber': 'fiber',
+    'fibre': 'fiber',
+    'thiamin': 'vitamin_b1',
+    'thiamine': 'vitamin_b1',
+    'riboflavin': 'vitamin_b2',
+    'niacin': 'vitamin_b3',
+    'pantothenic_acid': 'vitamin_b5',
+    'pyridoxine': 'vitamin_b6',
+    'folate': 'vitamin_b9',
+    'folic_acid': 'vitamin_b9',
+    'cobalamin': 'vitamin_b12',
+    'vitamin_a_rae': 'vitamin_a',
+    'retinol': 'vitamin_a',
+    'vitamin_d3': 'vitamin_d',
+    'ascorbic_acid': 'vitamin_c',
+    'tocopherol': 'vitamin_e',
+}
+
+# Grams per unit for mass units
+MASS_UNITS = {
+    'kg': 1000.0,
+    'g': 1.0,
+    'gram': 1.0,
+    'grams': 1.0,
+    'mg': 1e-3,
+    'milligram': 1e-3,
+    'milligrams': 1e-3,
+    'mcg': 1e-6,
+    'ug': 1e-6,
+    'µg': 1e-6,
+    'μg': 1e-6,
+    'microgram': 1e-6,
+    'micrograms': 1e-6,
+}
+
+KJ_PER_KCAL = 4.184
+
+# International units expressed in each nutrient's canonical unit
+IU_CONVERSIONS = {
+    'vitamin_a': 0.3,    # mcg retinol per IU
+    'vitamin_d': 0.025,  # mcg per IU
+    'vitamin_e': 0.67,   # mg natural alpha-tocopherol per IU
+}
+
+# FDA daily values in canonical units, used to resolve "15% DV" strings
+DAILY_VALUES = {
+    'fiber': 28,
+    'vitamin_a': 900,
+    'vitamin_b1': 1.2,
+    'vitamin_b2': 1.3,
+    'vitamin_b3': 16,
+    'vitamin_b5': 5,
+    'vitamin_b6': 1.7,
+    'vitamin_b9': 400,
+    'vitamin_b12': 2.4,
+    'vitamin_c': 90,
+    'vitamin_d': 20,
+    'vitamin_e': 15,
+    'vitamin_k': 120,
+    'calcium': 1300,
+    'iron': 18,
+    'magnesium': 420,
+    'phosphorus': 1250,
+    'potassium': 4700,
+    'sodium': 2300,
+    'zinc': 11,
+}
+
+_QUANTITY_RE = re.compile(
+    r'(?P<low>\d+(?:\.\d+)?)\s*(?:(?:-|–|to)\s*(?P<high>\d+(?:\.\d+)?))?\s*(?P<unit>%|[a-zA-Zµμ]+)?'
+)
+
+
+class NutrientDataError(ValueError):
+    """Nutrient data that does not have the expected shape"""
+
+
+def normalize_nutrient_name(name):
+    """Map a nutrient key such as "Vitamin B12" or "folate" to its canonical name"""
+    if not name:
+        return None
+    key = re.sub(r'[^a-z0-9]+', '_', str(name).strip().lower()).strip('_')
+    key = re.sub(r'^vit_', 'vitamin_', key)
+    # "b12" -> "vitamin_b12", "vitamin_b_12" -> "vitamin_b12"
+    key = re.sub(r'^(?:vitamin_)?([a-e]|k)_?(\d*)$', r'vitamin_\1\2', key)
+    key = NUTRIENT_ALIASES.get(key, key)
+    return key if key in MICRONUTRIENT_UNITS else None
+
+
+def parse_quantity(value):
+    """Split a string like "1,200 mg" into (1200.0, 'mg'); returns None if unparseable"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value), None
+
+    text = str(value).strip().lower().replace(',', '')
+    if not text or text in ('null', 'none', 'n/a', 'unknown'):
+        return None
+    if text.startswith('trace'):
+        return 0.0, None
+
+    match = _QUANTITY_RE.search(text)
+    if not match:
+        return None
+
+    amount = float(match.group('low'))
+    if match.group('high'):
+        # Ranges such as "2-3 mg" are stored as their midpoint
+        amount = (amount + float(match.group('high'))) / 2
+
+    unit = match.group('unit')
+    if unit in ('iu', 'ius'):
+        unit = 'iu'
+    return amount, unit
+
+
+def parse_grams(value):
+    """Macro amount in grams from a value such as "12 g", "500 mg" or 12; 0 if unparseable"""
+    parsed = parse_quantity(value)
+    if parsed is None:
+        return 0.0
+    amount, unit = parsed
+    if unit in MASS_UNITS:
+        return amount * MASS_UNITS[unit] / MASS_UNITS['g']
+    return amount
+
+
+def parse_calories(value):
+    """Energy in kcal from a value such as 95, "95 kcal" or "400 kJ"; 0 if unparseable"""
+    parsed = parse_quantity(value)
+    if parsed is None:
+        return 0.0
+    amount, unit = parsed
+    if unit == 'kj':
+        return amount / KJ_PER_KCAL
+    return amount
+
+
+def normalize_nutrient_value(name, value):
+    """Convert a raw value for a canonical nutrient into its canonical unit"""
+    parsed = parse_quantity(value)
+    if parsed is None:
+        return None
+
+    amount, unit = parsed
+    target_unit = MICRONUTRIENT_UNITS[name]
+
+    if unit is None:
+        # Bare numbers are assumed to already be in the canonical unit
+        return amount
+    if unit in MASS_UNITS:
+        return amount * MASS_UNITS[unit] / MASS_UNITS[target_unit]
+    if unit == 'iu':
+        factor = IU_CONVERSIONS.get(name)
+        return amount * factor if factor is not None else None
+    if unit in ('%', 'dv'):
+        return amount / 100 * DAILY_VALUES[name]
+    return None
+
+
+def build_micronutrient_vector(analysis):
+    """
+    Build the canonical micronutrient array for a Gemini analysis result.
+    Returns None when no micronutrient could be parsed; raises
+    NutrientDataError when vitamins_and_minerals is not an object.
+    """
+    vector = [None] * len(MICRONUTRIENTS)
+
+    raw_values = analysis.get('vitamins_and_minerals') or {}
+    if not isinstance(raw_values, Mapping):
+        raise NutrientDataError('vitamins_and_minerals must be an object mapping nutrient names to amounts')
+    raw_values = dict(raw_values)
+    if analysis.get('fiber') is not None:
+        raw_values['fiber'] = analysis['fiber']
+
+    for raw_name, raw_value in raw_values.items():
+        name = normalize_nutrient_name(raw_name)
+        if not name:
+            continue
+        amount = normalize_nutrient_value(name, raw_value)
+        if amount is not None:
+            vector[MICRONUTRIENT_INDEX[name] - 1] = round(amount, 4)
+
+    if all(amount is None for amount in vector):
+        return None
+    return vector
+
+
+def normalize_allergens(allergens):
+    """
+    Lower-case and de-duplicate a list of allergen strings; a single string
+    counts as a one-item list. Raises NutrientDataError for anything else.
+    """
+    if not allergens:
+        return None
+    if isinstance(allergens, str):
+        allergens = [allergens]
+    elif not isinstance(allergens, list):
+        raise NutrientDataError('potential_allergens must be a list of strings')
+
+    normalized = []
+    for allergen in allergens:
+        if not isinstance(allergen, str):
+            continue
+        allergen = allergen.strip().lower()
+        if allergen and allergen not in normalized:
+            normalized.append(allergen)
+    return normalized or None
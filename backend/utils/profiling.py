@@ -0,0 +1,148 @@
+"""
+On-demand cProfile runs of live requests.
+
+With Config.PROFILING_ENABLED the WSGI app is wrapped by ProfilerMiddleware;
+otherwise nothing is installed and requests pay nothing. A request is
+profiled when it carries an X-Profile header holding either the admin token
+or a signature from sign_profile_request(), or when it is picked by
+background sampling at Config.PROFILE_SAMPLE_RATE. Each profile is written
+to Config.PROFILE_DIR as a pstats file named after the route and duration,
+e.g. 20261019-142501-4242.1-GET-api-analytics-summary-412ms.prof, which snakeviz,
+gprof2dot or flameprof can turn into a call graph or flame graph.
+
+To get a header value valid for 10 minutes:
+
+    python -m backend.utils.profiling 600
+"""
+import cProfile
+import hashlib
+import hmac
+import itertools
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+from werkzeug.exceptions import HTTPException
+
+from backend.config import Config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+_UNSAFE_CHARS_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+# Keeps names unique when a worker saves several profiles within a second
+_sequence = itertools.count(1)
+
+
+def _signature(expires):
+    return hmac.new(Config.SECRET_KEY.encode(), f"profile:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def sign_profile_request(valid_for=600):
+    """X-Profile header value that enables profiling for the next `valid_for` seconds"""
+    expires = int(time.time() + valid_for)
+    return f"{expires}.{_signature(expires)}"
+
+
+def is_authorized(value):
+    """Whether an X-Profile header value is the admin token or an unexpired signature"""
+    if not value:
+        return False
+    # Compared as bytes: compare_digest rejects str with non-ASCII characters
+    if Config.ADMIN_TOKEN and hmac.compare_digest(value.encode(), Config.ADMIN_TOKEN.encode()):
+        return True
+
+    expires, _, signature = value.partition('.')
+    if not (expires.isascii() and expires.isdigit()) or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature.encode(), _signature(expires).encode())
+
+
+def profile_filename(method, route, elapsed):
+    """File name for a profile: timestamp, method, route and duration"""
+    route = _UNSAFE_CHARS_RE.sub('-', route).strip('-') or 'root'
+    return (f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.{next(_sequence)}-"
+            f"{method}-{route[:80]}-{elapsed * 1000:.0f}ms.prof")
+
+
+class ProfilerMiddleware:
+    """WSGI middleware that runs selected requests, including streamed bodies, under cProfile"""
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+
+    def __call__(self, environ, start_response):
+        requested = is_authorized(environ.get(PROFILE_HEADER))
+        sampled = not requested and Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+        if not (requested or sampled):
+            return self.wsgi_app(environ, start_response)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return self.wsgi_app(environ, start_response)
+
+        try:
+            body = self.wsgi_app(environ, start_response)
+        except BaseException:
+            profiler.disable()
+            self._save(profiler, environ, time.perf_counter() - started)
+            raise
+        profiler.disable()
+        return self._iterate(body, profiler, environ, started)
+
+    def _iterate(self, body, profiler, environ, started):
+        # Streamed responses (e.g. the CSV export) do their work while being iterated
+        try:
+            iterator = iter(body)
+            while True:
+                profiler.enable()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    profiler.disable()
+                yield chunk
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+            self._save(profiler, environ, time.perf_counter() - started)
+
+    def _route(self, environ):
+        try:
+            rule, _ = self.app.url_map.bind_to_environ(environ).match(return_rule=True)
+            return rule.rule
+        except HTTPException:
+            return environ.get('PATH_INFO', '')
+
+    def _save(self, profiler, environ, elapsed):
+        try:
+            os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+            path = os.path.join(
+                Config.PROFILE_DIR,
+                profile_filename(environ.get('REQUEST_METHOD', 'GET'), self._route(environ), elapsed)
+            )
+            profiler.dump_stats(path)
+            logger.info("Saved profile of %s (%.0f ms) to %s", environ.get('PATH_INFO'), elapsed * 1000, path)
+        except Exception:
+            logger.exception("Error saving profile")
+
+
+def init_profiling(app):
+    """Wrap the app in ProfilerMiddleware when profiling is enabled"""
+    if Config.PROFILING_ENABLED:
+        app.wsgi_app = ProfilerMiddleware(app)
+
+
+if __name__ == '__main__':
+    print(sign_profile_request(int(sys.argv[1]) if len(sys.argv) > 1 else 600))
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Nightly cohort reports: average intake per day, goal adherence and the most
+logged foods across all users.
+
+food_logs is streamed through server-side cursors by a pool of worker
+processes, each handling the users in one shard (user_id % shards). Workers
+write partial aggregates with COPY and checkpoint after every chunk of users
+over a second connection, so the stream's transaction is never committed
+mid-read and an interrupted run picks up where it stopped. When every shard has
+finished, the partials are merged into cohort_daily_stats and
+cohort_top_foods.
+
+    python batch_reports.py                          # last 30 days, one worker per CPU
+    python batch_reports.py --days 7 --workers 4
+    python batch_reports.py --report-date 2026-03-01 --restart
+"""
+import argparse
+import csv
+import io
+import os
+import time
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+
+from init_db import get_db_connection
+
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fats')
+
+# Matches nutrition_goals column defaults, for users without saved goals
+DEFAULT_GOALS = (2000, 150, 200, 70)
+
+# A day hits a goal when intake is within this fraction of it
+GOAL_TOLERANCE = 0.10
+
+SHARD_QUERY = """
+    SELECT f.user_id, DATE(f.date_added), lower(trim(f.name)),
+           f.calories, f.protein, f.carbs, f.fats,
+           COALESCE(g.calories, %(calories_goal)s), COALESCE(g.protein, %(protein_goal)s),
+           COALESCE(g.carbs, %(carbs_goal)s), COALESCE(g.fats, %(fats_goal)s)
+    FROM food_logs f
+    LEFT JOIN nutrition_goals g ON g.user_id = f.user_id
+    WHERE f.user_id %% %(shards)s = %(shard)s
+    AND f.user_id > %(after_user_id)s
+    AND f.date_added >= %(start)s AND f.date_added < %(end)s
+    ORDER BY f.user_id
+"""
+
+DAY_COLUMNS = ('report_date', 'shard', 'day', 'users', 'entries', 'calories', 'protein', 'carbs', 'fats',
+               'calories_hits', 'protein_hits', 'carbs_hits', 'fats_hits', 'all_hits')
+FOOD_COLUMNS = ('report_date', 'shard', 'name', 'entries', 'users')
+
+
+def copy_rows(cur, table, columns, rows):
+    """Bulk-load rows with COPY ... FROM STDIN"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+class ShardAggregator:
+    """Running aggregates for the users of one shard, flushed in chunks"""
+
+    def __init__(self):
+        self.reset()
+        self.user_id = None
+        self.user_days = {}
+        self.user_foods = set()
+        self.goals = DEFAULT_GOALS
+
+    def reset(self):
+        # day -> [users, entries, calories, protein, carbs, fats, hits per nutrient..., all hits]
+        self.days = {}
+        # name -> [entries, users]
+        self.foods = {}
+
+    def add(self, row):
+        user_id, day, name, *values = row
+        if user_id != self.user_id:
+            self.finish_user()
+            self.user_id = user_id
+            self.goals = values[4:]
+
+        totals = self.user_days.setdefault(day, [0, 0.0, 0.0, 0.0, 0.0])
+        totals[0] += 1
+        for i, value in enumerate(values[:4], start=1):
+            totals[i] += value or 0
+
+        food = self.foods.setdefault(name, [0, 0])
+        food[0] += 1
+        self.user_foods.add(name)
+
+    def finish_user(self):
+        """Fold the current user's per-day totals into the shard aggregates"""
+        for day, (entries, *totals) in self.user_days.items():
+            hits = [
+                goal > 0 and abs(total - goal) <= GOAL_TOLERANCE * goal
+                for total, goal in zip(totals, self.goals)
+            ]
+            stats = self.days.setdefault(day, [0] * 11)
+            stats[0] += 1
+            stats[1] += entries
+            for i, total in enumerate(totals):
+                stats[2 + i] += total
+            for i, hit in enumerate(hits):
+                stats[6 + i] += hit
+            stats[10] += all(hits)
+
+        for name in self.user_foods:
+            self.foods[name][1] += 1
+
+        self.user_days = {}
+        self.user_foods = set()
+
+    def rows(self, report_date, shard):
+        day_rows = [(report_date, shard, day, *stats) for day, stats in self.days.items()]
+        food_rows = [(report_date, shard, name, *counts) for name, counts in self.foods.items()]
+        return day_rows, food_rows
+
+
+def run_shard(task):
+    """Worker: aggregate one shard, resuming after its last checkpointed user"""
+    report_date, shard, shards, start, end, after_user_id, rows_read, chunk_size = task
+    started = time.monotonic()
+    rows_this_run = 0
+    users = 0
+
+    # The stream reads in its own transaction, left open until the shard is
+    # done; checkpoints commit on a second connection. Committing under the
+    # cursor would need WITH HOLD, which makes Postgres materialize the rest
+    # of the shard at the first commit.
+    stream_conn = get_db_connection()
+    conn = get_db_connection()
+    try:
+        stream = stream_conn.cursor(name=f'batch_reports_shard_{shard}')
+        stream.itersize = chunk_size
+        stream.execute(SHARD_QUERY, {
+            'shards': shards, 'shard': shard, 'after_user_id': after_user_id,
+            'start': start, 'end': end,
+            **dict(zip((f'{n}_goal' for n in NUTRIENTS), DEFAULT_GOALS))
+        })
+
+        cur = conn.cursor()
+        aggregator = ShardAggregator()
+        pending = 0
+
+        def checkpoint(last_user_id, finished):
+            day_rows, food_rows = aggregator.rows(report_date, shard)
+            copy_rows(cur, 'batch_day_partials', DAY_COLUMNS, day_rows)
+            copy_rows(cur, 'batch_food_partials', FOOD_COLUMNS, food_rows)
+            cur.execute("""
+                UPDATE batch_checkpoints
+                SET last_user_id = %s, rows_read = %s, finished = %s, updated_at = NOW()
+                WHERE report_date = %s AND shard = %s
+            """, (last_user_id, rows_read + rows_this_run, finished, report_date, shard))
+            conn.commit()
+            aggregator.reset()
+
+        for row in stream:
+            # Checkpoint only between users, so no user is split across chunks
+            if row[0] != aggregator.user_id:
+                if aggregator.user_id is not None:
+                    users += 1
+                    if pending >= chunk_size:
+                        aggregator.finish_user()
+                        checkpoint(aggregator.user_id, False)
+                        pending = 0
+            aggregator.add(row)
+            pending += 1
+            rows_this_run += 1
+
+        if aggregator.user_id is not None:
+            users += 1
+        aggregator.finish_user()
+        checkpoint(aggregator.user_id or after_user_id, True)
+        stream.close()
+    finally:
+        stream_conn.close()
+        conn.close()
+
+    return shard, rows_this_run, users, time.monotonic() - started
+
+
+def plan_shards(cur, report_date, shards, start, end, chunk_size, restart):
+    """Create or load the run's checkpoints and return tasks for unfinished shards"""
+    if restart:
+        for table in ('batch_day_partials', 'batch_food_partials', 'batch_checkpoints'):
+            cur.execute(f"DELETE FROM {table} WHERE report_date = %s", (report_date,))
+
+    cur.execute("""
+        SELECT shard, shards, window_start, window_end, last_user_id, rows_read, finished
+        FROM batch_checkpoints WHERE report_date = %s ORDER BY shard
+    """, (report_date,))
+    checkpoints = cur.fetchall()
+
+    if checkpoints:
+        _, saved_shards, saved_start, saved_end, *_ = checkpoints[0]
+        if (saved_shards, saved_start, saved_end) != (shards, start, end):
+            raise SystemExit(
+                f"A run for {report_date} exists with {saved_shards} shards over {saved_start}..{saved_end}; "
+                "rerun with the same settings or pass --restart"
+            )
+    else:
+        for shard in range(shards):
+            cur.execute("""
+                INSERT INTO batch_checkpoints (report_date, shard, shards, window_start, window_end)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (report_date, shard, shards, start, end))
+        checkpoints = [(shard, shards, start, end, 0, 0, False) for shard in range(shards)]
+
+    return [
+        (report_date, shard, shards, start, end, last_user_id, rows_read, chunk_size)
+        for shard, _, _, _, last_user_id, rows_read, finished in checkpoints
+        if not finished
+    ]
+
+
+def merge_reports(cur, report_date, top_foods):
+    """Combine every shard's partials into the report tables and clear the run's staging rows"""
+    cur.execute("""
+        SELECT day, SUM(users), SUM(entries),
+               SUM(calories), SUM(protein), SUM(carbs), SUM(fats),
+               SUM(calories_hits), SUM(protein_hits), SUM(carbs_hits), SUM(fats_hits), SUM(all_hits)
+        FROM batch_day_partials
+        WHERE report_date = %s
+        GROUP BY day
+        ORDER BY day
+    """, (report_date,))
+    daily = []
+    for day, users, entries, *sums in cur.fetchall():
+        averages = [round(total / users, 2) for total in sums[:4]]
+        rates = [round(hits / users, 4) for hits in sums[4:]]
+        daily.append((report_date, day, users, entries, *averages, *rates))
+
+    cur.execute("""
+        SELECT name, SUM(entries) AS entries, SUM(users)
+        FROM batch_food_partials
+        WHERE report_date = %s
+        GROUP BY name
+        ORDER BY entries DESC, name
+        LIMIT %s
+    """, (report_date, top_foods))
+    foods = [(report_date, rank, *row) for rank, row in enumerate(cur.fetchall(), start=1)]
+
+    cur.execute("DELETE FROM cohort_daily_stats WHERE report_date = %s", (report_date,))
+    cur.execute("DELETE FROM cohort_top_foods WHERE report_date = %s", (report_date,))
+    copy_rows(cur, 'cohort_daily_stats', (
+        'report_date', 'day', 'active_users', 'entries',
+        'avg_calories', 'avg_protein', 'avg_carbs', 'avg_fats',
+        'calories_goal_rate', 'protein_goal_rate', 'carbs_goal_rate', 'fats_goal_rate', 'all_goals_rate'
+    ), daily)
+    copy_rows(cur, 'cohort_top_foods', ('report_date', 'rank', 'name', 'entries', 'users'), foods)
+
+    for table in ('batch_day_partials', 'batch_food_partials', 'batch_checkpoints'):
+        cur.execute(f"DELETE FROM {table} WHERE report_date = %s", (report_date,))
+
+    return len(daily), len(foods)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build nightly cohort reports from food_logs")
+    parser.add_argument('--report-date', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                        default=date.today(), help="Report date (YYYY-MM-DD); covers the days before it")
+    parser.add_argument('--days', type=int, default=30, help="Number of days covered")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shards', type=int, default=None, help="Defaults to the number of workers")
+    parser.add_argument('--chunk-size', type=int, default=int(os.getenv('BATCH_CHUNK_SIZE', 20000)),
+                        help="Rows fetched per round trip and between checkpoints")
+    parser.add_argument('--top-foods', type=int, default=50)
+    parser.add_argument('--restart', action='store_true', help="Discard checkpoints from an earlier run")
+    args = parser.parse_args()
+
+    shards = args.shards or args.workers
+    end = args.report_date
+    start = end - timedelta(days=args.days)
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    try:
+        tasks = plan_shards(cur, args.report_date, shards, start, end, args.chunk_size, args.restart)
+        conn.commit()
+
+        if len(tasks) < shards:
+            print(f"Resuming: {shards - len(tasks)} of {shards} shards already finished")
+
+        started = time.monotonic()
+        total_rows = 0
+        with Pool(min(args.workers, len(tasks)) or 1) as pool:
+            for shard, rows, users, seconds in pool.imap_unordered(run_shard, tasks):
+                total_rows += rows
+                rate = rows / seconds if seconds else 0
+                print(f"shard {shard}: {rows} rows, {users} users in {seconds:.1f}s ({rate:,.0f} rows/s)")
+        elapsed = time.monotonic() - started
+
+        days, foods = merge_reports(cur, args.report_date, args.top_foods)
+        conn.commit()
+
+        rate = total_rows / elapsed if elapsed else 0
+        print(f"Read {total_rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/s) with {args.workers} workers")
+        print(f"Report {args.report_date}: {days} days ({start} .. {end - timedelta(days=1)}), {foods} top foods")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error building reports: {e}")
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
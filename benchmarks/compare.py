@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare two load-test results from benchmarks/loadgen.py.
+
+Prints the change in throughput and p50/p95/p99 per endpoint and exits with
+status 1 when any endpoint got slower (or lost throughput) by more than
+--threshold percent, so it can gate a CI job:
+
+    python -m benchmarks.compare benchmarks/results/abc123-*.json benchmarks/results/def456-*.json
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+def change(before, after):
+    """Relative change in percent, or None when either side is missing"""
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(baseline, candidate, threshold):
+    """Rows of (endpoint, metric, before, after, change %, regressed)"""
+    rows = []
+    for endpoint in sorted(set(baseline['endpoints']) | set(candidate['endpoints'])):
+        before = baseline['endpoints'].get(endpoint, {})
+        after = candidate['endpoints'].get(endpoint, {})
+        for metric in METRICS:
+            delta = change(before.get(metric), after.get(metric))
+            # Lower latency is better, higher throughput is better
+            worse = delta if metric != 'throughput_rps' or delta is None else -delta
+            rows.append((endpoint, metric, before.get(metric), after.get(metric), delta,
+                         worse is not None and worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Diff two load-test result files')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10, help='percent change counted as a regression')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    if baseline.get('settings') != candidate.get('settings'):
+        print("Warning: the runs used different settings; compare with care")
+
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+    print(f"{'endpoint':<15}{'metric':<16}{'before':>10}{'after':>10}{'change':>10}")
+    rows = compare(baseline, candidate, args.threshold)
+    for endpoint, metric, before, after, delta, regressed in rows:
+        shown = f"{delta:+.1f}%" if delta is not None else '-'
+        print(f"{endpoint:<15}{metric:<16}{before if before is not None else '-':>10}"
+              f"{after if after is not None else '-':>10}{shown:>10}{'  REGRESSION' if regressed else ''}")
+
+    regressions = [row for row in rows if row[5]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:g}%")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Mixed-workload load test for the API.
+
+Client threads pick requests from a weighted mix (login, dashboard day,
+history week and month, logging and deleting food, text analysis) as the
+users created by benchmarks/seed.py, for `--duration` seconds. Throughput
+and p50/p95/p99 latency are reported per endpoint and saved as JSON with the
+commit being tested, for benchmarks/compare.py.
+
+With --spawn, the app is started under gunicorn (run:app with
+gunicorn.conf.py) next to the Gemini replay server, with rate limits and
+quotas off so analysis measures the app rather than the limiter:
+
+    python -m benchmarks.seed
+    python -m benchmarks.loadgen --spawn --workers 4 --clients 32 --duration 60
+    python -m benchmarks.loadgen --url http://staging:8000 --mix dashboard=5,history_week=2
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import requests
+
+from benchmarks.seed import PASSWORD
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Relative frequency of each scenario in the default mix
+DEFAULT_MIX = {
+    'login': 1,
+    'dashboard': 8,
+    'history_week': 4,
+    'history_month': 2,
+    'log_food': 3,
+    'delete_food': 2,
+    'analyze_text': 1,
+}
+
+# Must match a recorded fixture in tests/fixtures/gemini
+ANALYSIS_TEXT = '1 medium apple'
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class Client:
+    """One simulated user session, run by one thread"""
+
+    def __init__(self, base_url, users, rng):
+        self.base_url = base_url
+        self.users = users
+        self.rng = rng
+        self.session = requests.Session()
+        self.logged = []
+
+    def _user(self):
+        n = self.rng.randrange(self.users)
+        return n, {'Authorization': f"Bearer bench-token-{n}"}
+
+    def login(self):
+        n, _ = self._user()
+        return self.session.post(f"{self.base_url}/api/login",
+                                 json={'email': f"bench{n}@example.com", 'password': PASSWORD})
+
+    def dashboard(self):
+        _, headers = self._user()
+        day = date.today() - timedelta(days=self.rng.randrange(30))
+        return self.session.get(f"{self.base_url}/api/dashboard", params={'date': day.isoformat()}, headers=headers)
+
+    def history_week(self):
+        _, headers = self._user()
+        return self.session.get(f"{self.base_url}/api/nutrition-history", params={'range': 'week'}, headers=headers)
+
+    def history_month(self):
+        _, headers = self._user()
+        return self.session.get(f"{self.base_url}/api/nutrition-history", params={'range': 'month'}, headers=headers)
+
+    def log_food(self):
+        n, headers = self._user()
+        response = self.session.post(f"{self.base_url}/api/food-logs", headers=headers, json={
+            'food_name': 'Benchmark snack', 'calories': 150, 'protein_g': 5, 'carbs_g': 20, 'fat_g': 6,
+            'vitamins_and_minerals': {'vitamin_c': '10 mg'}
+        })
+        if response.status_code == 201:
+            self.logged.append((n, response.json()['log_id']))
+        return response
+
+    def delete_food(self):
+        if not self.logged:
+            return self.log_food()
+        n, log_id = self.logged.pop()
+        return self.session.delete(f"{self.base_url}/api/food-logs/{log_id}",
+                                   headers={'Authorization': f"Bearer bench-token-{n}"})
+
+    def analyze_text(self):
+        _, headers = self._user()
+        return self.session.post(f"{self.base_url}/api/food/analyze-text", json={'text': ANALYSIS_TEXT},
+                                 headers=headers)
+
+
+def run_load(base_url, mix, clients, duration, users, seed):
+    """Drive the mix from `clients` threads; returns {scenario: [(seconds, status), ...]}"""
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    scenarios, weights = zip(*mix.items())
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = Client(base_url, users, rng)
+        local = defaultdict(list)
+        while time.monotonic() < deadline:
+            scenario = rng.choices(scenarios, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = getattr(client, scenario)().status_code
+            except requests.RequestException:
+                status = 0
+            local[scenario].append((time.perf_counter() - started, status))
+
+        # Leave the database as it was
+        while client.logged:
+            client.delete_food()
+        with lock:
+            for scenario, values in local.items():
+                samples[scenario].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples, duration):
+    """Throughput, latency percentiles (ms) and status counts per scenario"""
+    results = {}
+    for scenario, values in sorted(samples.items()):
+        latencies = sorted(seconds * 1000 for seconds, status in values if 200 <= status < 400)
+        statuses = defaultdict(int)
+        for _, status in values:
+            statuses[str(status)] += 1
+        results[scenario] = {
+            'requests': len(values),
+            'errors': sum(count for status, count in statuses.items() if not status.startswith(('2', '3'))),
+            'throughput_rps': round(len(values) / duration, 2),
+            'p50_ms': _round(percentile(latencies, 0.50)),
+            'p95_ms': _round(percentile(latencies, 0.95)),
+            'p99_ms': _round(percentile(latencies, 0.99)),
+            'statuses': dict(statuses),
+        }
+    return results
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def spawn(port, workers, threads, gemini_latency_ms):
+    """Start the replay server and gunicorn; returns the processes to stop afterwards"""
+    replay_port = port + 1
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        GEMINI_BACKEND='replay',
+        GEMINI_REPLAY_URL=f"http://127.0.0.1:{replay_port}",
+        GEMINI_API_KEY=os.environ.get('GEMINI_API_KEY', 'replay'),
+        RATE_LIMIT_ENABLED='false',
+        GEMINI_DAILY_CALL_QUOTA='0',
+        GEMINI_DAILY_TOKEN_QUOTA='0',
+        FLASK_ENV='production',
+        LOG_LEVEL=os.environ.get('LOG_LEVEL', 'WARNING'),
+    )
+    replay = subprocess.Popen(
+        [sys.executable, '-m', 'backend.services.gemini_replay_server', '--port', str(replay_port),
+         '--latency-ms', str(gemini_latency_ms)],
+        cwd=ROOT, env=env
+    )
+    app = subprocess.Popen(
+        ['gunicorn', 'run:app', '-c', 'gunicorn.conf.py', '--workers', str(workers), '--threads', str(threads)],
+        cwd=ROOT, env=env
+    )
+    return [app, replay]
+
+
+def parse_mix(spec):
+    """'dashboard=5,login=1' -> {'dashboard': 5.0, 'login': 1.0}"""
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario '{name.strip()}' (expected one of {', '.join(DEFAULT_MIX)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a mixed-workload load test and save the results as JSON')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='app to test (ignored with --spawn)')
+    parser.add_argument('--spawn', action='store_true', help='start gunicorn and the Gemini replay server')
+    parser.add_argument('--port', type=int, default=8010, help='port for the spawned app (replay server: port + 1)')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers when spawning')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker when spawning')
+    parser.add_argument('--gemini-latency-ms', type=float, default=800, help='replayed Gemini latency when spawning')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client threads')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds to run before measuring')
+    parser.add_argument('--users', type=int, default=2000, help='seeded users to act as (bench0..benchN-1)')
+    parser.add_argument('--mix', help="scenario weights, e.g. 'dashboard=5,log_food=1'")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/<commit>-<time>.json)')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    processes = []
+    base_url = args.url.rstrip('/')
+    if args.spawn:
+        base_url = f"http://127.0.0.1:{args.port}"
+        processes = spawn(args.port, args.workers, args.threads, args.gemini_latency_ms)
+
+    try:
+        _wait_until_up(f"{base_url}/metrics")
+        if args.warmup > 0:
+            # Fills connection pools, prepared statements and caches
+            run_load(base_url, mix, args.clients, args.warmup, args.users, args.seed + 1)
+        samples = run_load(base_url, mix, args.clients, args.duration, args.users, args.seed)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    total = sum(len(values) for values in samples.values())
+    report = {
+        'commit': _git_commit(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {
+            'url': base_url, 'spawned': args.spawn, 'workers': args.workers if args.spawn else None,
+            'threads': args.threads if args.spawn else None, 'clients': args.clients, 'duration': args.duration,
+            'users': args.users, 'mix': mix, 'seed': args.seed,
+            'gemini_latency_ms': args.gemini_latency_ms if args.spawn else None,
+        },
+        'host': {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()},
+        'total': {'requests': total, 'throughput_rps': round(total / args.duration, 2)},
+        'endpoints': summarize(samples, args.duration),
+    }
+
+    print(f"{'scenario':<15}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for scenario, result in report['endpoints'].items():
+        print(f"{scenario:<15}{result['throughput_rps']:>9}{result['p50_ms'] or '-':>9}"
+              f"{result['p95_ms'] or '-':>9}{result['p99_ms'] or '-':>9}{result['errors']:>8}")
+    print(f"{'total':<15}{report['total']['throughput_rps']:>9}")
+
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"{report['commit'] or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+
+
+if __name__ == '__main__':
+    main()
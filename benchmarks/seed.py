@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Seed the database with synthetic users and food logs for benchmarks.
+
+Creates the schema through init_db.py, then adds `--users` accounts
+(bench<N>@example.com, password "benchmark", bearer token bench-token-<N>)
+with goals and `--days` days of meals each, loaded with COPY. The defaults
+produce about 1.3 million food_logs rows.
+
+    python -m benchmarks.seed
+    python -m benchmarks.seed --users 500 --days 30
+    python -m benchmarks.seed --reset          # remove previously seeded users first
+"""
+import argparse
+import io
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from psycopg2.extras import execute_values
+from werkzeug.security import generate_password_hash
+
+from backend.utils.nutrient_units import build_micronutrient_vector
+from init_db import get_db_connection, init_database
+from manage_partitions import create_partitions, is_partitioned
+
+PASSWORD = 'benchmark'
+EMAIL_PATTERN = 'bench%@example.com'
+
+# name, calories, protein, carbs, fats, micronutrients, allergens
+FOODS = [
+    ('Oatmeal with banana', 310, 9, 58, 5, {'fiber': '7 g', 'iron': '3.4 mg', 'potassium': '520 mg'}, []),
+    ('Greek yogurt', 146, 20, 8, 4, {'calcium': '230 mg', 'vitamin_b12': '1.3 mcg'}, ['milk']),
+    ('Scrambled eggs', 200, 14, 2, 15, {'vitamin_d': '2.2 mcg', 'vitamin_a': '160 mcg'}, ['eggs']),
+    ('Whole wheat toast', 140, 6, 24, 2, {'fiber': '4 g', 'iron': '1.5 mg'}, ['wheat']),
+    ('Apple', 95, 0.5, 25, 0.3, {'fiber': '4.4 g', 'vitamin_c': '8.4 mg'}, []),
+    ('Banana', 105, 1.3, 27, 0.4, {'potassium': '422 mg', 'vitamin_b6': '0.4 mg'}, []),
+    ('Chicken salad', 420, 35, 14, 24, {'vitamin_a': '450 mcg', 'vitamin_k': '90 mcg'}, []),
+    ('Turkey sandwich', 480, 28, 48, 18, {'sodium': '1100 mg', 'iron': '3 mg'}, ['wheat']),
+    ('Lentil soup', 320, 18, 48, 6, {'fiber': '15 g', 'iron': '6.6 mg', 'folate': '358 mcg'}, []),
+    ('Salmon with rice', 620, 40, 60, 22, {'vitamin_d': '14 mcg', 'vitamin_b12': '4.9 mcg'}, ['fish']),
+    ('Spaghetti bolognese', 680, 32, 78, 24, {'iron': '4.2 mg', 'zinc': '5.1 mg'}, ['wheat']),
+    ('Beef stir fry', 540, 36, 42, 24, {'zinc': '7 mg', 'vitamin_c': '45 mg'}, ['soy']),
+    ('Vegetable curry', 450, 12, 56, 20, {'vitamin_a': '820 mcg', 'fiber': '9 g'}, []),
+    ('Margherita pizza slice', 285, 12, 36, 10, {'calcium': '190 mg', 'sodium': '640 mg'}, ['wheat', 'milk']),
+    ('Caesar salad', 360, 10, 12, 30, {'vitamin_k': '102 mcg', 'calcium': '150 mg'}, ['eggs', 'fish', 'milk']),
+    ('Protein shake', 220, 30, 10, 5, {'calcium': '400 mg'}, ['milk']),
+    ('Almonds', 164, 6, 6, 14, {'vitamin_e': '7.3 mg', 'magnesium': '76 mg'}, ['tree nuts']),
+    ('Dark chocolate', 170, 2, 13, 12, {'iron': '3.4 mg', 'magnesium': '65 mg'}, []),
+    ('Orange juice', 112, 1.7, 26, 0.5, {'vitamin_c': '124 mg', 'potassium': '496 mg'}, []),
+    ('Latte', 190, 10, 15, 7, {'calcium': '350 mg'}, ['milk']),
+    ('Burrito bowl', 720, 38, 82, 24, {'fiber': '16 g', 'sodium': '1500 mg'}, []),
+    ('Sushi roll', 350, 14, 52, 8, {'iodine': '60 mcg', 'sodium': '700 mg'}, ['fish', 'soy']),
+    ('Tofu and broccoli', 300, 22, 18, 16, {'calcium': '350 mg', 'vitamin_c': '80 mg'}, ['soy']),
+    ('Cheeseburger', 540, 30, 40, 29, {'zinc': '5.5 mg', 'sodium': '1000 mg'}, ['wheat', 'milk']),
+]
+
+# Meals per day and the hour they are eaten
+MEAL_HOURS = (8, 11, 13, 16, 19, 21)
+
+
+def _pg_array(values):
+    if values is None:
+        return '\\N'
+    return '{' + ','.join('NULL' if v is None else str(v) for v in values) + '}'
+
+
+def _food_rows():
+    rows = []
+    for name, calories, protein, carbs, fats, micros, allergens in FOODS:
+        vector = build_micronutrient_vector({'vitamins_and_minerals': micros})
+        allergens = '{' + ','.join(f'"{a}"' for a in allergens) + '}' if allergens else '\\N'
+        rows.append(f"{name}\t{calories}\t{protein}\t{carbs}\t{fats}\t{_pg_array(vector)}\t{allergens}")
+    return rows
+
+
+def reset(cur):
+    """Remove previously seeded users; their logs, tokens and goals cascade"""
+    cur.execute("DELETE FROM users WHERE email LIKE %s", (EMAIL_PATTERN,))
+    return cur.rowcount
+
+
+def seed(conn, users, days, meals, seed_value=42):
+    rng = random.Random(seed_value)
+    cur = conn.cursor()
+    start = date.today() - timedelta(days=days - 1)
+
+    if is_partitioned(cur):
+        create_partitions(cur, 3, start=start)
+
+    # One hash for everyone: each generate_password_hash call is deliberately slow
+    password_hash = generate_password_hash(PASSWORD)
+    cur.execute("SELECT COALESCE(MAX(substring(email FROM 'bench([0-9]+)@')::int), -1) FROM users WHERE email LIKE %s",
+                (EMAIL_PATTERN,))
+    first = cur.fetchone()[0] + 1
+
+    user_ids = execute_values(
+        cur,
+        "INSERT INTO users (email, username, password_hash, data_version) VALUES %s RETURNING id",
+        [(f"bench{n}@example.com", f"bench{n}", password_hash, 1) for n in range(first, first + users)],
+        fetch=True, page_size=1000
+    )
+    user_ids = [row[0] for row in user_ids]
+    execute_values(cur, "INSERT INTO user_tokens (user_id, token) VALUES %s",
+                   [(user_id, f"bench-token-{n}") for n, user_id in enumerate(user_ids, start=first)], page_size=1000)
+    execute_values(cur, "INSERT INTO nutrition_goals (user_id, calories, protein, carbs, fats) VALUES %s",
+                   [(user_id, rng.choice((1800, 2000, 2200, 2500)), rng.choice((100, 130, 150)), 200, 70)
+                    for user_id in user_ids], page_size=1000)
+    conn.commit()
+
+    foods = _food_rows()
+    total = 0
+    buffer = io.StringIO()
+    for i, user_id in enumerate(user_ids, start=1):
+        for day_offset in range(days):
+            # Some days nothing is logged
+            if rng.random() < 0.1:
+                continue
+            day = start + timedelta(days=day_offset)
+            for hour in sorted(rng.sample(MEAL_HOURS, rng.randint(max(1, meals - 2), min(len(MEAL_HOURS), meals + 2)))):
+                logged_at = datetime(day.year, day.month, day.day, hour, rng.randint(0, 59), rng.randint(0, 59))
+                buffer.write(f"{user_id}\t{rng.choice(foods)}\t{logged_at.isoformat(sep=' ')}\n")
+                total += 1
+
+        if i % 100 == 0 or i == len(user_ids):
+            buffer.seek(0)
+            cur.copy_expert(
+                "COPY food_logs (user_id, name, calories, protein, carbs, fats, micronutrients, allergens, date_added) "
+                "FROM STDIN", buffer
+            )
+            conn.commit()
+            buffer = io.StringIO()
+            print(f"  {i}/{len(user_ids)} users, {total} food logs")
+
+    cur.execute("ANALYZE users")
+    cur.execute("ANALYZE food_logs")
+    conn.commit()
+    return first, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed synthetic users and food logs for benchmarks')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--meals', type=int, default=4, help='average food logs per user and day')
+    parser.add_argument('--seed', type=int, default=42, help='random seed, for reproducible data')
+    parser.add_argument('--reset', action='store_true', help='delete previously seeded users first')
+    args = parser.parse_args()
+
+    init_database()
+
+    conn = get_db_connection()
+    try:
+        if args.reset:
+            with conn.cursor() as cur:
+                print(f"Removed {reset(cur)} seeded users")
+            conn.commit()
+
+        started = time.time()
+        first, total = seed(conn, args.users, args.days, args.meals, args.seed)
+        print(f"Seeded users bench{first}..bench{first + args.users - 1} with {total} food logs "
+              f"in {time.time() - started:.0f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted static assets.
+
+Every file under frontend/static (except the build output) is minified (JS
+and CSS), copied to frontend/static/dist under a name containing a hash of
+its content, and stored next to gzip and brotli versions when that saves
+bytes. frontend/static/dist/manifest.json maps each source path to its
+built file; the app's asset_url() template helper reads it, and the built
+files are served with far-future immutable cache headers and their
+precompressed variants.
+
+    python build_assets.py            # rebuild dist/ from scratch
+    python build_assets.py --check    # fail if dist/ is missing or out of date
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import brotli
+import rcssmin
+import rjsmin
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'frontend', 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+MINIFIERS = {
+    '.js': rjsmin.jsmin,
+    '.css': rcssmin.cssmin,
+}
+
+# Already compressed formats gain nothing from gzip or brotli
+COMPRESSIBLE = {'.js', '.css', '.svg', '.ico', '.json', '.txt', '.html'}
+
+HASH_LENGTH = 10
+
+
+def source_files():
+    """Paths of the source assets, relative to STATIC_DIR, in a stable order"""
+    paths = []
+    for directory, subdirectories, files in os.walk(STATIC_DIR):
+        subdirectories[:] = sorted(d for d in subdirectories if os.path.join(directory, d) != DIST_DIR)
+        for name in sorted(files):
+            if not name.startswith('.'):
+                paths.append(os.path.relpath(os.path.join(directory, name), STATIC_DIR).replace(os.sep, '/'))
+    return paths
+
+
+def build_one(path):
+    """(hashed path, content) for one source asset"""
+    with open(os.path.join(STATIC_DIR, path), 'rb') as f:
+        content = f.read()
+
+    root, extension = os.path.splitext(path)
+    minify = MINIFIERS.get(extension.lower())
+    if minify:
+        content = minify(content.decode('utf-8')).encode('utf-8')
+
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return f"{root}.{digest}{extension}", content
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def build():
+    """Rebuild DIST_DIR and return the manifest"""
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    manifest = {}
+    totals = {'source': 0, 'built': 0, 'gzip': 0, 'brotli': 0}
+
+    for path in source_files():
+        hashed, content = build_one(path)
+        target = os.path.join(DIST_DIR, hashed)
+        _write(target, content)
+        manifest[path] = f"dist/{hashed}"
+
+        totals['source'] += os.path.getsize(os.path.join(STATIC_DIR, path))
+        totals['built'] += len(content)
+
+        if os.path.splitext(path)[1].lower() in COMPRESSIBLE:
+            # mtime=0 keeps the .gz bytes identical between builds
+            gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(gzipped) < len(content):
+                _write(target + '.gz', gzipped)
+                totals['gzip'] += len(gzipped)
+            brotlied = brotli.compress(content, quality=11)
+            if len(brotlied) < len(content):
+                _write(target + '.br', brotlied)
+                totals['brotli'] += len(brotlied)
+
+    _write(os.path.join(DIST_DIR, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest, totals
+
+
+def is_up_to_date():
+    """Whether the manifest matches what a build would produce now"""
+    try:
+        with open(os.path.join(DIST_DIR, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    expected = {path: f"dist/{build_one(path)[0]}" for path in source_files()}
+    return manifest == expected and all(os.path.exists(os.path.join(STATIC_DIR, built)) for built in expected.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Minify, fingerprint and precompress frontend/static')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 if the build is out of date')
+    args = parser.parse_args()
+
+    if args.check:
+        if not is_up_to_date():
+            print("Static assets are out of date; run python build_assets.py")
+            sys.exit(1)
+        print("Static assets are up to date")
+        return
+
+    manifest, totals = build()
+    print(f"Built {len(manifest)} assets into {os.path.relpath(DIST_DIR, ROOT)}: "
+          f"{totals['source']} bytes -> {totals['built']} minified; compressible files as "
+          f"{totals['gzip']} bytes gzip, {totals['brotli']} bytes brotli")
+
+
+if __name__ == '__main__':
+    main()
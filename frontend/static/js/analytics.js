@@ -156,18 +156,52 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
 
-        fetch(`/api/nutrition-history?range=${range}`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        })
-        .then(response => response.json())
+        fetchJsonWithETag(`/api/nutrition-history?range=${range}`, token)
         .then(data => {
             updateCharts(data);
         })
         .catch(error => {
             console.error('Error fetching nutrition data:', error);
         });
+
+        const days = range === 'week' ? 7 : 30;
+        fetchJsonWithETag(`/api/analytics/summary?days=${days}`, token)
+        .then(summary => {
+            updateSummary(summary);
+        })
+        .catch(error => {
+            console.error('Error fetching analytics summary:', error);
+        });
+    }
+
+    function formatValue(value, suffix = '') {
+        return value === null || value === undefined ? '–' : `${value}${suffix}`;
+    }
+
+    function updateSummary(summary) {
+        const container = document.getElementById('analytics-summary');
+        if (!container) return;
+
+        const nutrients = ['calories', 'protein', 'carbs', 'fat'];
+        let html = '<table class="food-logs-table">';
+        html += '<thead><tr><th></th><th>7-day avg</th><th>30-day avg</th><th>Week over week</th><th>Goal streak</th><th>Best streak</th></tr></thead><tbody>';
+
+        nutrients.forEach(nutrient => {
+            const change = summary.week_over_week[nutrient];
+            const streak = summary.streaks[nutrient];
+            html += '<tr>';
+            html += `<td>${nutrient.charAt(0).toUpperCase() + nutrient.slice(1)}</td>`;
+            html += `<td>${formatValue(summary.averages['7_day'][nutrient])}</td>`;
+            html += `<td>${formatValue(summary.averages['30_day'][nutrient])}</td>`;
+            html += `<td>${formatValue(change.change_pct, '%')}</td>`;
+            html += `<td>${streak.current} days</td>`;
+            html += `<td>${streak.longest} days</td>`;
+            html += '</tr>';
+        });
+
+        html += '</tbody></table>';
+        html += `<p>Days on which every goal was hit in a row: ${summary.streaks.all.current} (best ${summary.streaks.all.longest})</p>`;
+        container.innerHTML = html;
     }
 
     function updateCharts(data) {
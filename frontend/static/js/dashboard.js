@@ -192,6 +192,9 @@ function saveFoodToLog(data) {
         protein_g: extractNumber(data.protein),
         carbs_g: extractNumber(data.carbohydrates || data.carbs),
         fat_g: extractNumber(data.fat || data.fats),
+        fiber: data.fiber,
+        vitamins_and_minerals: data.vitamins_and_minerals,
+        potential_allergens: data.potential_allergens,
         log_date: dateInput ? dateInput.value : new Date().toISOString().split('T')[0]
     };
     
@@ -262,39 +265,23 @@ function initFoodLogsDisplay() {
     // Update progress bars with reset values
     updateProgressBars();
     
-    // Fetch food logs
-    fetch(`/api/food-logs?date=${selectedDate}`, {
-        method: 'GET',
-        headers: {
-            'Authorization': 'Bearer ' + userToken
-        }
-    })
-    .then(response => {
-        if (!response.ok) {
-            throw new Error('Failed to fetch food logs');
-        }
-        return response.json();
-    })
+    // Profile, logs, totals and goals arrive in a single request
+    // Unchanged data is revalidated with the ETag instead of re-downloaded
+    fetchJsonWithETag(`/api/dashboard?date=${selectedDate}`, userToken)
     .then(data => {
-        // Filter logs for the selected date
-        const filteredLogs = data.logs.filter(log => {
-            const logDate = new Date(log.log_date);
-            const compareDate = new Date(selectedDate);
-            return logDate.toISOString().split('T')[0] === compareDate.toISOString().split('T')[0];
-        });
-        
-        displayFoodLogs(filteredLogs, logContainer);
+        applyGoals(data.goals);
+        displayFoodLogs(data.logs, logContainer, data.consumed);
     })
     .catch(error => {
         logContainer.innerHTML = `<p class="error">Error: ${error.message}</p>`;
-        console.error('Error fetching food logs:', error);
+        console.error('Error fetching dashboard:', error);
     });
 }
 
 /**
  * Display food logs in the specified container
  */
-function displayFoodLogs(logs, container) {
+function displayFoodLogs(logs, container, totals) {
     if (!logs || logs.length === 0) {
         container.innerHTML = '<p>No food logs for this date. Analyze some food and save it to your log!</p>';
         return;
@@ -310,7 +297,11 @@ function displayFoodLogs(logs, container) {
         const date = log.log_date ? formatDateForDisplay(log.log_date) : 'N/A';
         
         html += '<tr>';
-        html += `<td>${log.food_name}</td>`;
+        // Small pregenerated thumbnail rather than the original upload
+        const photo = log.photo_id
+            ? `<img class="food-log-photo" src="/api/photos/${log.photo_id}?size=128" alt="" loading="lazy" width="40" height="40">`
+            : '';
+        html += `<td>${photo}${log.food_name}</td>`;
         html += `<td>${log.calories}</td>`;
         html += `<td>${log.protein_g}</td>`;
         html += `<td>${log.carbs_g}</td>`;
@@ -335,7 +326,7 @@ function displayFoodLogs(logs, container) {
     });
     
     // Add totals row and update nutrition tracking
-    addTotalsRow(logs, container);
+    addTotalsRow(logs, container, totals);
 }
 
 /**
@@ -351,11 +342,11 @@ function formatDateForDisplay(dateString) {
 /**
  * Add a totals row to the food logs table
  */
-function addTotalsRow(logs, container) {
+function addTotalsRow(logs, container, serverTotals) {
     if (!logs || logs.length === 0) return;
     
-    // Calculate totals
-    const totals = logs.reduce((acc, log) => {
+    // Use the totals computed by /api/dashboard when available
+    const totals = serverTotals || logs.reduce((acc, log) => {
         acc.calories += Number(log.calories) || 0;
         acc.protein += Number(log.protein_g) || 0;
         acc.carbs += Number(log.carbs_g) || 0;
@@ -489,7 +480,26 @@ function loadSavedGoals() {
 }
 
 /**
- * Save nutrition goals to localStorage
+ * Fill the goal inputs with the goals stored on the server
+ */
+function applyGoals(goals) {
+    if (!goals) return;
+    
+    const caloriesGoal = document.getElementById('calories-goal');
+    const proteinGoal = document.getElementById('protein-goal');
+    const carbsGoal = document.getElementById('carbs-goal');
+    const fatGoal = document.getElementById('fat-goal');
+    
+    if (caloriesGoal) caloriesGoal.value = goals.calories;
+    if (proteinGoal) proteinGoal.value = goals.protein;
+    if (carbsGoal) carbsGoal.value = goals.carbs;
+    if (fatGoal) fatGoal.value = goals.fat;
+    
+    localStorage.setItem('nutritionGoals', JSON.stringify(goals));
+}
+
+/**
+ * Save nutrition goals to localStorage, and to the server when logged in
  */
 function saveNutritionGoals() {
     const goals = {
@@ -502,6 +512,26 @@ function saveNutritionGoals() {
     // Save to localStorage
     localStorage.setItem('nutritionGoals', JSON.stringify(goals));
     
+    const userToken = localStorage.getItem('userToken');
+    if (userToken) {
+        fetch('/api/goals', {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': 'Bearer ' + userToken
+            },
+            body: JSON.stringify(goals)
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Failed to save goals');
+            }
+        })
+        .catch(error => {
+            console.error('Error saving goals:', error);
+        });
+    }
+    
     // Show success message
     const message = document.createElement('div');
     message.className = 'success-message';
@@ -215,6 +215,7 @@ function initCamera() {
                 // Send to backend for analysis
                 return fetch('/api/food/analyze-image', {
                     method: 'POST',
+                    headers: authHeaders(),
                     body: formData
                 });
             })
@@ -228,7 +229,7 @@ function initCamera() {
                 hideLoading();
                 
                 if (data.success) {
-                    displayResults(data.data);
+                    displayResults(data.data, data.photo_id);
                 } else {
                     showError(data.error || 'Failed to analyze image');
                 }
@@ -301,6 +302,7 @@ function initImageUpload() {
         // Send the image to the backend for analysis
         fetch('/api/food/analyze-image', {
             method: 'POST',
+            headers: authHeaders(),
             body: formData
         })
         .then(response => {
@@ -313,7 +315,7 @@ function initImageUpload() {
             hideLoading();
             
             if (data.success) {
-                displayResults(data.data);
+                displayResults(data.data, data.photo_id);
             } else {
                 showError(data.error || 'Failed to analyze image');
             }
@@ -329,7 +331,7 @@ function initImageUpload() {
 /**
  * Display analysis results
  */
-function displayResults(data) {
+function displayResults(data, photoId) {
     const resultsContainer = document.getElementById('results-container');
     const results = document.getElementById('results');
     const saveBtn = document.getElementById('save-result-btn');
@@ -357,6 +359,11 @@ function displayResults(data) {
         
         console.log('Parsed nutrition data:', parsedData);
         
+        // A kept photo is attached to the logs saved from this analysis
+        if (photoId) {
+            parsedData.photo_id = photoId;
+        }
+        
         // Save the data for later use
         localStorage.setItem('currentFoodAnalysis', JSON.stringify(parsedData));
         
@@ -393,6 +400,11 @@ function formatNutritionData(data) {
             data = JSON.parse(data);
         }
         
+        // Image analysis returns every item on the plate plus their total
+        if (Array.isArray(data.items)) {
+            return formatPlate(data);
+        }
+        
         // Extract the main values
         const foodName = data.food_name || 'Food Analysis';
         const calories = extractNumber(data.calories) || 0;
@@ -517,6 +529,27 @@ function formatNutritionData(data) {
     }
 }
 
+/**
+ * Format a multi-item image analysis: the plate total, then each item
+ */
+function formatPlate(data) {
+    const count = data.items.length;
+    const total = Object.assign({}, data.total, {
+        food_name: count > 1 ? 'Whole plate' : (data.total.food_name || 'Food Analysis'),
+        portion_size: count > 1 ? `${count} items: ${data.total.food_name}` : data.items[0].portion_size
+    });
+    
+    if (count === 1) {
+        return formatNutritionData(data.items[0]);
+    }
+    
+    let html = formatNutritionData(total);
+    for (const item of data.items) {
+        html += formatNutritionData(item);
+    }
+    return html;
+}
+
 /**
  * Format nutrient name for display
  */
@@ -570,15 +603,10 @@ function saveToFoodLog() {
     try {
         const data = JSON.parse(storedData);
         
-        // Prepare data for API
-        const foodLogData = {
-            food_name: data.food_name || 'Unknown Food',
-            calories: extractNumber(data.calories),
-            protein_g: extractNumber(data.protein),
-            carbs_g: extractNumber(data.carbohydrates || data.carbs),
-            fat_g: extractNumber(data.fat || data.fats),
-            log_date: new Date().toISOString()
-        };
+        // Prepare data for API; a plate is logged as one batch of entries
+        const foodLogData = Array.isArray(data.items)
+            ? { entries: data.items.map(item => toFoodLogEntry(item, data.photo_id)) }
+            : toFoodLogEntry(data, data.photo_id);
         
         console.log('Saving food data:', foodLogData);
         
@@ -623,6 +651,32 @@ function saveToFoodLog() {
     }
 }
 
+/**
+ * Convert one analysed food into the /api/food-logs payload
+ */
+function toFoodLogEntry(data, photoId) {
+    return {
+        photo_id: photoId,
+        food_name: data.food_name || 'Unknown Food',
+        calories: extractNumber(data.calories),
+        protein_g: extractNumber(data.protein),
+        carbs_g: extractNumber(data.carbohydrates || data.carbs),
+        fat_g: extractNumber(data.fat || data.fats),
+        fiber: data.fiber,
+        vitamins_and_minerals: data.vitamins_and_minerals,
+        potential_allergens: data.potential_allergens,
+        log_date: new Date().toISOString()
+    };
+}
+
+/**
+ * Authorization header for signed-in users, so the analysed photo is kept
+ */
+function authHeaders() {
+    const token = localStorage.getItem('userToken');
+    return token ? { 'Authorization': 'Bearer ' + token } : {};
+}
+
 /**
  * Show loading indicator
  */
@@ -141,6 +141,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 return fetch('/api/food/analyze-image', {
                     method: 'POST',
+                    headers: authHeaders(),
                     body: formData
                 });
             })
@@ -164,6 +165,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         fetch('/api/food/analyze-image', {
             method: 'POST',
+            headers: authHeaders(),
             body: formData
         })
         .then(handleAnalysisResponse)
@@ -176,14 +178,53 @@ document.addEventListener('DOMContentLoaded', function() {
     saveResultBtn.addEventListener('click', function() {
         const foodData = JSON.parse(localStorage.getItem('currentFoodAnalysis'));
         if (foodData) {
+            // Every item detected on the plate is logged
+            const items = Array.isArray(foodData.items) ? foodData.items : [foodData];
+            const timestamp = new Date().toISOString();
+            const token = localStorage.getItem('userToken');
+            
+            if (token) {
+                // Logged in: store the whole plate with one batched request
+                const entries = items.map(item => ({
+                    food_name: item.food_name || 'Unknown Food',
+                    calories: extractNumber(item.calories),
+                    protein_g: extractNumber(item.protein),
+                    carbs_g: extractNumber(item.carbohydrates || item.carbs),
+                    fat_g: extractNumber(item.fat || item.fats),
+                    fiber: item.fiber,
+                    vitamins_and_minerals: item.vitamins_and_minerals,
+                    potential_allergens: item.potential_allergens,
+                    log_date: timestamp,
+                    photo_id: foodData.photo_id
+                }));
+                
+                fetch('/api/food-logs', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Authorization': 'Bearer ' + token
+                    },
+                    body: JSON.stringify({ entries: entries })
+                })
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error('Failed to save food to log');
+                    }
+                    alert(items.length > 1 ? `${items.length} foods saved to your log!` : 'Food saved to your log!');
+                })
+                .catch(error => {
+                    alert('Error: ' + error.message);
+                });
+                return;
+            }
+            
             // Get existing food log or initialize empty array
             let foodLog = JSON.parse(localStorage.getItem('foodLog') || '[]');
             
-            // Add timestamp
-            foodData.timestamp = new Date().toISOString();
-            
-            // Add to log
-            foodLog.push(foodData);
+            // Add each item with a timestamp
+            for (const item of items) {
+                foodLog.push(Object.assign({}, item, { timestamp: timestamp }));
+            }
             
             // Save back to localStorage
             localStorage.setItem('foodLog', JSON.stringify(foodLog));
@@ -193,6 +234,20 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     // Shared functions
+    function authHeaders() {
+        // Signed-in users keep the analysed photo
+        const token = localStorage.getItem('userToken');
+        return token ? { 'Authorization': 'Bearer ' + token } : {};
+    }
+    
+    function extractNumber(value) {
+        if (!value) return 0;
+        if (typeof value === 'number') return value;
+        
+        const matches = String(value).match(/[\d.]+/);
+        return matches ? parseFloat(matches[0]) : 0;
+    }
+    
     function showLoading() {
         loading.style.display = 'block';
         resultsContainer.style.display = 'block';
@@ -219,6 +274,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 // Format JSON response for better readability
                 try {
                     const parsedData = JSON.parse(data.data);
+                    if (data.photo_id) {
+                        // Attached to the logs saved from this analysis
+                        parsedData.photo_id = data.photo_id;
+                    }
                     const formattedData = JSON.stringify(parsedData, null, 2);
                     results.innerHTML = '<pre>' + formattedData + '</pre>';
                     
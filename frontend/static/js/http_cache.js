@@ -0,0 +1,50 @@
+/**
+ * Conditional GET helper
+ * Remembers the ETag and body of JSON API responses and revalidates them
+ * with If-None-Match, so unchanged data comes back as an empty 304
+ */
+
+const HTTP_CACHE_PREFIX = 'httpCache:';
+
+function fetchJsonWithETag(url, token) {
+    const cacheKey = HTTP_CACHE_PREFIX + url;
+    let cached = null;
+
+    try {
+        cached = JSON.parse(sessionStorage.getItem(cacheKey));
+    } catch (error) {
+        cached = null;
+    }
+
+    // Entries belong to the user that fetched them
+    if (cached && cached.token !== token) {
+        cached = null;
+    }
+
+    const headers = { 'Authorization': 'Bearer ' + token };
+    if (cached && cached.etag) {
+        headers['If-None-Match'] = cached.etag;
+    }
+
+    return fetch(url, { method: 'GET', headers: headers, cache: 'no-store' })
+        .then(response => {
+            if (response.status === 304 && cached) {
+                return cached.body;
+            }
+            if (!response.ok) {
+                throw new Error(`Request to ${url} failed`);
+            }
+
+            return response.json().then(body => {
+                const etag = response.headers.get('ETag');
+                if (etag) {
+                    try {
+                        sessionStorage.setItem(cacheKey, JSON.stringify({ token: token, etag: etag, body: body }));
+                    } catch (error) {
+                        // Storage full or unavailable: caching is best effort
+                    }
+                }
+                return body;
+            });
+        });
+}
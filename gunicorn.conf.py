@@ -0,0 +1,24 @@
+"""
+Gunicorn settings. Workers share Prometheus metrics through files in
+PROMETHEUS_MULTIPROC_DIR, which must be set before any worker imports
+prometheus_client, so it is set here and emptied when the server starts.
+"""
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'nutrify-metrics'))
+
+
+def on_starting(server):
+    # Samples left by a previous run would be added to this one's
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
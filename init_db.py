@@ -36,9 +36,12 @@ def init_database():
                 email VARCHAR(255) UNIQUE NOT NULL,
                 username VARCHAR(100) NOT NULL,
                 password_hash VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                data_version BIGINT NOT NULL DEFAULT 0
             )
         """)
+        # Bumped on every change to a user's logs or goals; served as the ETag
+        cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0")
         
         # Create user_tokens table
         cur.execute("""
@@ -51,17 +54,43 @@ def init_database():
             )
         """)
         
-        # Create food_logs table
+        # Create food_logs as a table partitioned by month on date_added.
+        # Existing unpartitioned tables are converted with manage_partitions.py
+        from manage_partitions import create_partitioned_table, create_partitions, is_partitioned
+        
+        cur.execute("SELECT to_regclass('food_logs')")
+        if cur.fetchone()[0] is None:
+            create_partitioned_table(cur)
+        
+        # Micronutrients are stored as a REAL[] in the canonical order defined in
+        # backend/utils/nutrient_units.py, already converted to numeric amounts
+        cur.execute("ALTER TABLE food_logs ADD COLUMN IF NOT EXISTS micronutrients REAL[]")
+        cur.execute("ALTER TABLE food_logs ADD COLUMN IF NOT EXISTS allergens TEXT[]")
+        # Content hash of an attached meal photo; the image itself is on disk (photo_store.py)
+        cur.execute("ALTER TABLE food_logs ADD COLUMN IF NOT EXISTS photo_id VARCHAR(64)")
+        # Searchable food name behind /api/food-logs/search, kept up to date by Postgres
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS food_logs (
-                id SERIAL PRIMARY KEY,
+            ALTER TABLE food_logs ADD COLUMN IF NOT EXISTS name_search TSVECTOR
+            GENERATED ALWAYS AS (to_tsvector('english', name)) STORED
+        """)
+        
+        if is_partitioned(cur):
+            create_partitions(cur, int(os.getenv('FOOD_LOG_PARTITIONS_AHEAD', 3)))
+        else:
+            print("food_logs is not partitioned; run `python manage_partitions.py migrate` to convert it")
+        
+        # Daily rollups of food_logs partitions removed by the retention policy
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS food_log_daily_summaries (
                 user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                name VARCHAR(100) NOT NULL,
-                calories INTEGER DEFAULT 0,
+                day DATE NOT NULL,
+                entries INTEGER NOT NULL DEFAULT 0,
+                calories FLOAT DEFAULT 0,
                 protein FLOAT DEFAULT 0,
                 carbs FLOAT DEFAULT 0,
                 fats FLOAT DEFAULT 0,
-                date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                micronutrients REAL[],
+                PRIMARY KEY (user_id, day)
             )
         """)
         
@@ -78,10 +107,210 @@ def init_database():
             )
         """)
         
+        # Append-only log of food-log inserts and deletes behind /api/sync.
+        # Each row carries the user's data_version after the change.
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS food_log_changes (
+                id BIGSERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                version BIGINT NOT NULL,
+                op VARCHAR(6) NOT NULL CHECK (op IN ('insert', 'delete')),
+                log_id INTEGER NOT NULL,
+                logged_at TIMESTAMP,
+                client_id VARCHAR(64),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_food_log_changes_user_version ON food_log_changes(user_id, version)")
+        # Makes offline inserts idempotent per client-generated id
+        cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_food_log_changes_client
+            ON food_log_changes(user_id, client_id) WHERE client_id IS NOT NULL
+        """)
+        
+        # Nutrition per ingredient, shared by every user's recipes. Values are
+        # per 100 g or 100 ml, or per single item for count units (basis).
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS ingredient_nutrition (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(200) NOT NULL,
+                basis VARCHAR(20) NOT NULL,
+                calories FLOAT DEFAULT 0,
+                protein FLOAT DEFAULT 0,
+                carbs FLOAT DEFAULT 0,
+                fats FLOAT DEFAULT 0,
+                micronutrients REAL[],
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (name, basis)
+            )
+        """)
+        
+        # Recipes keep whole-recipe totals so logging a serving is arithmetic
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS recipes (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                name VARCHAR(100) NOT NULL,
+                servings FLOAT NOT NULL DEFAULT 1,
+                calories FLOAT DEFAULT 0,
+                protein FLOAT DEFAULT 0,
+                carbs FLOAT DEFAULT 0,
+                fats FLOAT DEFAULT 0,
+                micronutrients REAL[],
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS recipe_ingredients (
+                recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                name VARCHAR(200) NOT NULL,
+                quantity FLOAT,
+                unit VARCHAR(20),
+                amount FLOAT NOT NULL DEFAULT 0,
+                ingredient_id INTEGER REFERENCES ingredient_nutrition(id),
+                PRIMARY KEY (recipe_id, position)
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_recipes_user ON recipes(user_id)")
+        
+        # Token buckets for rate-limited endpoints, shared by every worker.
+        # UNLOGGED skips the WAL: losing the buckets in a crash only resets
+        # the limits. The low fillfactor keeps the constant updates HOT.
+        cur.execute("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+                scope VARCHAR(50) NOT NULL,
+                key VARCHAR(100) NOT NULL,
+                tokens FLOAT NOT NULL,
+                allowed BOOLEAN NOT NULL,
+                updated_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (scope, key)
+            ) WITH (fillfactor = 70)
+        """)
+        
+        # Gemini calls per day, user, endpoint and model, flushed in bulk by
+        # each worker's usage tracker. user_id 0 is anonymous callers.
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS gemini_usage (
+                day DATE NOT NULL,
+                user_id INTEGER NOT NULL,
+                endpoint VARCHAR(100) NOT NULL,
+                operation VARCHAR(50) NOT NULL,
+                model VARCHAR(100) NOT NULL,
+                calls INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                prompt_tokens BIGINT NOT NULL DEFAULT 0,
+                response_tokens BIGINT NOT NULL DEFAULT 0,
+                request_bytes BIGINT NOT NULL DEFAULT 0,
+                response_bytes BIGINT NOT NULL DEFAULT 0,
+                latency_ms BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, user_id, endpoint, operation, model)
+            )
+        """)
+        
+        # Cohort reports written by batch_reports.py, one set per report date
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS cohort_daily_stats (
+                report_date DATE NOT NULL,
+                day DATE NOT NULL,
+                active_users INTEGER NOT NULL,
+                entries INTEGER NOT NULL,
+                avg_calories FLOAT,
+                avg_protein FLOAT,
+                avg_carbs FLOAT,
+                avg_fats FLOAT,
+                calories_goal_rate FLOAT,
+                protein_goal_rate FLOAT,
+                carbs_goal_rate FLOAT,
+                fats_goal_rate FLOAT,
+                all_goals_rate FLOAT,
+                PRIMARY KEY (report_date, day)
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS cohort_top_foods (
+                report_date DATE NOT NULL,
+                rank INTEGER NOT NULL,
+                name VARCHAR(100) NOT NULL,
+                entries INTEGER NOT NULL,
+                users INTEGER NOT NULL,
+                PRIMARY KEY (report_date, rank)
+            )
+        """)
+        # Per-shard partial aggregates and checkpoints, so an interrupted run resumes
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS batch_day_partials (
+                report_date DATE NOT NULL,
+                shard INTEGER NOT NULL,
+                day DATE NOT NULL,
+                users INTEGER NOT NULL,
+                entries INTEGER NOT NULL,
+                calories FLOAT NOT NULL,
+                protein FLOAT NOT NULL,
+                carbs FLOAT NOT NULL,
+                fats FLOAT NOT NULL,
+                calories_hits INTEGER NOT NULL,
+                protein_hits INTEGER NOT NULL,
+                carbs_hits INTEGER NOT NULL,
+                fats_hits INTEGER NOT NULL,
+                all_hits INTEGER NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS batch_food_partials (
+                report_date DATE NOT NULL,
+                shard INTEGER NOT NULL,
+                name VARCHAR(100) NOT NULL,
+                entries INTEGER NOT NULL,
+                users INTEGER NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS batch_checkpoints (
+                report_date DATE NOT NULL,
+                shard INTEGER NOT NULL,
+                shards INTEGER NOT NULL,
+                window_start DATE NOT NULL,
+                window_end DATE NOT NULL,
+                last_user_id INTEGER NOT NULL DEFAULT 0,
+                rows_read BIGINT NOT NULL DEFAULT 0,
+                finished BOOLEAN NOT NULL DEFAULT FALSE,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (report_date, shard)
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_batch_day_partials_report ON batch_day_partials(report_date)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_batch_food_partials_report ON batch_food_partials(report_date)")
+        
         # Create indexes for better performance
         cur.execute("CREATE INDEX IF NOT EXISTS idx_food_logs_user_date ON food_logs(user_id, date_added)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_user_tokens_token ON user_tokens(token)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+        # One goals row per user, so goals can be saved with a single upsert.
+        # Older databases may hold several rows per user; the newest one wins.
+        cur.execute("""
+            DELETE FROM nutrition_goals older
+            USING nutrition_goals newer
+            WHERE newer.user_id = older.user_id
+            AND (COALESCE(newer.updated_at, '-infinity'), newer.id)
+                > (COALESCE(older.updated_at, '-infinity'), older.id)
+        """)
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_nutrition_goals_user ON nutrition_goals(user_id)")
+        
+        # Food search. btree_gin lets the index lead with user_id and pg_trgm
+        # adds typo-tolerant matching; both are optional contrib extensions
+        available = set()
+        for extension in ('btree_gin', 'pg_trgm'):
+            try:
+                cur.execute(f"CREATE EXTENSION IF NOT EXISTS {extension}")
+                available.add(extension)
+            except psycopg2.Error as e:
+                print(f"{extension} is not available, food search runs without it: {str(e).strip().splitlines()[0]}")
+        user_first = 'user_id, ' if 'btree_gin' in available else ''
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_food_logs_name_search ON food_logs USING GIN ({user_first}name_search)")
+        if 'pg_trgm' in available:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_food_logs_name_trgm ON food_logs USING GIN ({user_first}name gin_trgm_ops)")
         
         print("Database initialized successfully!")
         
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Partition management for the food_logs table.
+
+food_logs is range-partitioned by month on date_added. Run this regularly
+(e.g. from a daily scheduler) so partitions exist ahead of time:
+
+    python manage_partitions.py migrate            # convert an existing unpartitioned table
+    python manage_partitions.py create --ahead 3   # create partitions for upcoming months
+    python manage_partitions.py retain --keep 12   # compact and detach old partitions
+    python manage_partitions.py list
+
+Retention also covers back-dated rows that fell into food_logs_default: rows
+older than the cutoff are added onto their daily summaries and removed (kept
+in food_logs_archive_default unless --drop is given).
+"""
+import argparse
+import os
+import re
+from datetime import date
+
+from init_db import get_db_connection
+
+PARTITION_NAME_RE = re.compile(r'^food_logs_(\d{4})_(\d{2})$')
+
+FOOD_LOGS_COLUMNS = """
+    id INTEGER NOT NULL DEFAULT nextval('food_logs_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    calories INTEGER DEFAULT 0,
+    protein FLOAT DEFAULT 0,
+    carbs FLOAT DEFAULT 0,
+    fats FLOAT DEFAULT 0,
+    date_added TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    micronutrients REAL[],
+    allergens TEXT[],
+    photo_id VARCHAR(64),
+    name_search TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', name)) STORED,
+    PRIMARY KEY (id, date_added)
+"""
+
+# Every column except the generated name_search, for copying rows
+FOOD_LOGS_STORED_COLUMNS = (
+    "id, user_id, name, calories, protein, carbs, fats, date_added, micronutrients, allergens, photo_id"
+)
+
+
+def add_months(day, months):
+    """Return the first day of the month `months` after the month of `day`"""
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month_start):
+    return f"food_logs_{month_start.year:04d}_{month_start.month:02d}"
+
+
+def is_partitioned(cur):
+    """Check whether food_logs is already a partitioned table"""
+    cur.execute("SELECT relkind FROM pg_class WHERE relname = 'food_logs' AND relkind IN ('r', 'p')")
+    row = cur.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def list_partitions(cur):
+    """Return (month_start, table_name) for every monthly partition, oldest first"""
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'food_logs'::regclass
+    """)
+
+    partitions = []
+    for (name,) in cur.fetchall():
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+def create_partitioned_table(cur):
+    """Create food_logs as a monthly partitioned table with a default partition"""
+    cur.execute("CREATE SEQUENCE IF NOT EXISTS food_logs_id_seq")
+    cur.execute(f"CREATE TABLE IF NOT EXISTS food_logs ({FOOD_LOGS_COLUMNS}) PARTITION BY RANGE (date_added)")
+    cur.execute("ALTER SEQUENCE food_logs_id_seq OWNED BY food_logs.id")
+    # Catches rows outside every monthly partition (e.g. back-dated entries)
+    cur.execute("CREATE TABLE IF NOT EXISTS food_logs_default PARTITION OF food_logs DEFAULT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_food_logs_user_date ON food_logs(user_id, date_added)")
+
+
+def create_partition(cur, month_start):
+    """Create the partition for one month, moving any matching rows out of the default partition"""
+    name = partition_name(month_start)
+    month_end = add_months(month_start, 1)
+
+    cur.execute("SELECT to_regclass(%s)", (name,))
+    if cur.fetchone()[0] is not None:
+        return False
+
+    # Creating the partition fails while the default partition holds rows for
+    # its range, so those rows are parked in a temporary table and put back
+    # through the parent afterwards. Generated columns are left out of both
+    # copies and recomputed on the way back in.
+    parked = f"{name}_parked"
+    cur.execute(f"CREATE TEMPORARY TABLE {parked} AS "
+                f"SELECT {FOOD_LOGS_STORED_COLUMNS} FROM food_logs_default WITH NO DATA")
+    cur.execute(f"""
+        WITH moved AS (
+            DELETE FROM food_logs_default
+            WHERE date_added >= %s AND date_added < %s
+            RETURNING {FOOD_LOGS_STORED_COLUMNS}
+        )
+        INSERT INTO {parked} SELECT * FROM moved
+    """, (month_start, month_end))
+    cur.execute(f"CREATE TABLE {name} PARTITION OF food_logs FOR VALUES FROM (%s) TO (%s)",
+                (month_start, month_end))
+    cur.execute(f"INSERT INTO food_logs ({FOOD_LOGS_STORED_COLUMNS}) "
+                f"SELECT {FOOD_LOGS_STORED_COLUMNS} FROM {parked}")
+    cur.execute(f"DROP TABLE {parked}")
+    return True
+
+
+def create_partitions(cur, months_ahead=3, start=None):
+    """Ensure partitions exist from `start` (default: this month) through `months_ahead` months"""
+    month = add_months(start or date.today(), 0)
+    last = add_months(date.today(), months_ahead)
+
+    created = []
+    while month <= last:
+        if create_partition(cur, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def migrate_to_partitioned(cur, months_ahead=3):
+    """Convert an existing unpartitioned food_logs table in place"""
+    if is_partitioned(cur):
+        return False
+
+    cur.execute("ALTER TABLE food_logs RENAME TO food_logs_unpartitioned")
+    cur.execute("ALTER INDEX IF EXISTS idx_food_logs_user_date RENAME TO idx_food_logs_unpartitioned_user_date")
+    cur.execute("ALTER TABLE food_logs_unpartitioned ADD COLUMN IF NOT EXISTS micronutrients REAL[]")
+    cur.execute("ALTER TABLE food_logs_unpartitioned ADD COLUMN IF NOT EXISTS allergens TEXT[]")
+    cur.execute("ALTER TABLE food_logs_unpartitioned ADD COLUMN IF NOT EXISTS photo_id VARCHAR(64)")
+    # The id sequence must outlive the old table it currently belongs to
+    cur.execute("ALTER SEQUENCE IF EXISTS food_logs_id_seq OWNED BY NONE")
+
+    create_partitioned_table(cur)
+
+    cur.execute("SELECT MIN(date_added) FROM food_logs_unpartitioned")
+    oldest = cur.fetchone()[0]
+    create_partitions(cur, months_ahead, start=oldest.date() if oldest else None)
+
+    cur.execute("""
+        INSERT INTO food_logs (id, user_id, name, calories, protein, carbs, fats,
+                               date_added, micronutrients, allergens, photo_id)
+        SELECT id, user_id, name, calories, protein, carbs, fats,
+               COALESCE(date_added, CURRENT_TIMESTAMP), micronutrients, allergens, photo_id
+        FROM food_logs_unpartitioned
+    """)
+    cur.execute("SELECT setval('food_logs_id_seq', GREATEST((SELECT MAX(id) FROM food_logs), 1))")
+    cur.execute("DROP TABLE food_logs_unpartitioned")
+    return True
+
+
+# Per user and day totals of a table's rows matching `where`, shaped like food_log_daily_summaries
+DAILY_SUMMARY_SELECT = """
+    SELECT t.user_id, t.day, t.entries, t.calories, t.protein, t.carbs, t.fats, m.micronutrients
+    FROM (
+        SELECT user_id, DATE(date_added) AS day, COUNT(*) AS entries,
+               SUM(calories) AS calories, SUM(protein) AS protein,
+               SUM(carbs) AS carbs, SUM(fats) AS fats
+        FROM {table_name}
+        WHERE {where}
+        GROUP BY user_id, DATE(date_added)
+    ) t
+    LEFT JOIN (
+        SELECT user_id, day, array_agg(amount ORDER BY idx) AS micronutrients
+        FROM (
+            SELECT f.user_id, DATE(f.date_added) AS day, n.idx, SUM(n.amount) AS amount
+            FROM {table_name} f
+            CROSS JOIN LATERAL unnest(f.micronutrients) WITH ORDINALITY AS n(amount, idx)
+            WHERE {where}
+            GROUP BY f.user_id, DATE(f.date_added), n.idx
+        ) per_nutrient
+        GROUP BY user_id, day
+    ) m ON m.user_id = t.user_id AND m.day = t.day
+"""
+
+
+def compact_partition(cur, table_name):
+    """Roll a partition's rows up into food_log_daily_summaries"""
+    cur.execute(f"""
+        INSERT INTO food_log_daily_summaries
+            (user_id, day, entries, calories, protein, carbs, fats, micronutrients)
+        {DAILY_SUMMARY_SELECT.format(table_name=table_name, where='TRUE')}
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            entries = EXCLUDED.entries,
+            calories = EXCLUDED.calories,
+            protein = EXCLUDED.protein,
+            carbs = EXCLUDED.carbs,
+            fats = EXCLUDED.fats,
+            micronutrients = EXCLUDED.micronutrients
+    """)
+    return cur.rowcount
+
+
+def expire_default_rows(cur, cutoff, drop=False):
+    """
+    Apply retention to back-dated rows in food_logs_default dated before
+    `cutoff`: they are added onto their days' summaries (a day whose month
+    was already archived has one), moved to food_logs_archive_default unless
+    `drop` is set, and deleted. Returns the number of rows removed.
+    """
+    cur.execute(f"""
+        INSERT INTO food_log_daily_summaries AS s
+            (user_id, day, entries, calories, protein, carbs, fats, micronutrients)
+        {DAILY_SUMMARY_SELECT.format(table_name='food_logs_default', where='date_added < %(cutoff)s')}
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            entries = s.entries + EXCLUDED.entries,
+            calories = COALESCE(s.calories, 0) + COALESCE(EXCLUDED.calories, 0),
+            protein = COALESCE(s.protein, 0) + COALESCE(EXCLUDED.protein, 0),
+            carbs = COALESCE(s.carbs, 0) + COALESCE(EXCLUDED.carbs, 0),
+            fats = COALESCE(s.fats, 0) + COALESCE(EXCLUDED.fats, 0),
+            micronutrients = (
+                SELECT array_agg(CASE WHEN kept IS NULL AND added IS NULL THEN NULL
+                                      ELSE COALESCE(kept, 0) + COALESCE(added, 0) END ORDER BY idx)
+                FROM unnest(s.micronutrients, EXCLUDED.micronutrients) WITH ORDINALITY AS n(kept, added, idx)
+            )
+    """, {'cutoff': cutoff})
+
+    if not drop:
+        cur.execute(f"CREATE TABLE IF NOT EXISTS food_logs_archive_default AS "
+                    f"SELECT {FOOD_LOGS_STORED_COLUMNS} FROM food_logs_default WITH NO DATA")
+        cur.execute(f"""
+            WITH expired AS (
+                DELETE FROM food_logs_default WHERE date_added < %s
+                RETURNING {FOOD_LOGS_STORED_COLUMNS}
+            )
+            INSERT INTO food_logs_archive_default ({FOOD_LOGS_STORED_COLUMNS}) SELECT * FROM expired
+        """, (cutoff,))
+    else:
+        cur.execute("DELETE FROM food_logs_default WHERE date_added < %s", (cutoff,))
+    return cur.rowcount
+
+
+def apply_retention(cur, keep_months, drop=False):
+    """
+    Compact and detach monthly partitions older than `keep_months` full months.
+    Detached partitions are kept as food_logs_archive_YYYY_MM unless `drop` is set.
+    Back-dated rows of the same age in the default partition are compacted and
+    removed too (see expire_default_rows). Returns ([(partition, summaries)],
+    default rows removed).
+    """
+    if keep_months < 1:
+        raise ValueError("keep_months must be at least 1")
+
+    cutoff = add_months(date.today(), -keep_months)
+    archived = []
+
+    for month_start, name in list_partitions(cur):
+        if add_months(month_start, 1) > cutoff:
+            continue
+
+        summarized = compact_partition(cur, name)
+        cur.execute(f"ALTER TABLE food_logs DETACH PARTITION {name}")
+        if drop:
+            cur.execute(f"DROP TABLE {name}")
+        else:
+            cur.execute(f"ALTER TABLE {name} RENAME TO {name.replace('food_logs_', 'food_logs_archive_')}")
+        archived.append((name, summarized))
+
+    return archived, expire_default_rows(cur, cutoff, drop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage monthly food_logs partitions")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help="Convert food_logs to a partitioned table")
+    migrate_parser.add_argument('--ahead', type=int, default=int(os.getenv('FOOD_LOG_PARTITIONS_AHEAD', 3)))
+
+    create_parser = subparsers.add_parser('create', help="Create partitions for upcoming months")
+    create_parser.add_argument('--ahead', type=int, default=int(os.getenv('FOOD_LOG_PARTITIONS_AHEAD', 3)))
+
+    retain_parser = subparsers.add_parser('retain', help="Compact and detach old partitions")
+    retain_parser.add_argument('--keep', type=int, default=os.getenv('FOOD_LOG_RETENTION_MONTHS'),
+                               help="Number of full months of detail rows to keep")
+    retain_parser.add_argument('--drop', action='store_true', help="Drop detached partitions instead of archiving")
+
+    subparsers.add_parser('list', help="List monthly partitions")
+
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    try:
+        if args.command == 'migrate':
+            if migrate_to_partitioned(cur, args.ahead):
+                print("food_logs converted to a partitioned table")
+            else:
+                print("food_logs is already partitioned")
+
+        elif args.command == 'create':
+            created = create_partitions(cur, args.ahead)
+            print(f"Created partitions: {', '.join(created)}" if created else "All partitions already exist")
+
+        elif args.command == 'retain':
+            if args.keep is None:
+                print("No retention policy configured (set --keep or FOOD_LOG_RETENTION_MONTHS)")
+            else:
+                archived, expired = apply_retention(cur, int(args.keep), args.drop)
+                for name, summarized in archived:
+                    print(f"Archived {name} ({summarized} daily summaries)")
+                if expired:
+                    print(f"Compacted and removed {expired} back-dated rows from food_logs_default")
+
+        elif args.command == 'list':
+            for month_start, name in list_partitions(cur):
+                print(f"{name}\t{month_start} .. {add_months(month_start, 1)}")
+
+        conn.commit()
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Error managing partitions: {e}")
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
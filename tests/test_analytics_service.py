@@ -0,0 +1,41 @@
+from datetime import date
+
+import numpy as np
+
+from backend.services.analytics_service import current_run, longest_run, rolling_mean, summarize
+
+GOALS = {'calories': 2000, 'protein': 150, 'carbs': 200, 'fat': 70}
+
+
+def test_rolling_mean_skips_unlogged_days():
+    values = np.array([[10.0], [0.0], [30.0], [50.0]])
+    logged = np.array([True, False, True, True])
+    assert rolling_mean(values, logged, 2)[:, 0].tolist() == [10, 10, 30, 40]
+
+
+def test_runs():
+    mask = np.array([True, True, False, True, True, True, False])
+    assert longest_run(mask) == 3
+    # Today (the last day) has not hit yet, so the streak ending yesterday counts
+    assert current_run(mask) == 3
+    assert current_run(np.array([True, False])) == 1
+    assert longest_run(np.zeros(3, dtype=bool)) == 0
+
+
+def test_summarize_multi_year_history():
+    days = 3 * 365
+    rng = np.random.default_rng(1)
+    values = np.column_stack([
+        rng.normal(2000, 150, days), rng.normal(150, 10, days),
+        rng.normal(200, 20, days), rng.normal(70, 5, days)
+    ])
+    logged = rng.random(days) > 0.1
+    values[~logged] = 0
+
+    summary = summarize(date(2024, 1, 1), values, logged, GOALS, 90)
+
+    assert len(summary['series']['dates']) == 90
+    assert summary['days_logged'] == int(logged[-90:].sum())
+    assert abs(summary['averages']['30_day']['calories'] - 2000) < 150
+    assert summary['streaks']['calories']['longest'] >= summary['streaks']['calories']['current']
+    assert sum(summary['macro_ratios']['protein']['histogram']) == summary['days_logged']
@@ -0,0 +1,75 @@
+import gzip
+import json
+
+import brotli
+from flask import Flask, render_template_string
+
+from backend.utils import assets
+
+
+def _app(tmp_path, built=True):
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'js' / 'app.js').write_text('var a = 1;')
+    if built:
+        dist = tmp_path / 'dist' / 'js'
+        dist.mkdir(parents=True)
+        (dist / 'app.0123456789.js').write_text('var a=1;')
+        (dist / 'app.0123456789.js.gz').write_bytes(gzip.compress(b'var a=1;'))
+        (dist / 'app.0123456789.js.br').write_bytes(brotli.compress(b'var a=1;'))
+        (tmp_path / 'dist' / 'manifest.json').write_text(json.dumps({'js/app.js': 'dist/js/app.0123456789.js'}))
+
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+    assets.init_assets(app)
+
+    @app.route('/')
+    def index():
+        return render_template_string("{{ asset_url('js/app.js') }}")
+
+    return app
+
+
+def test_asset_url_prefers_the_built_file(tmp_path):
+    client = _app(tmp_path).test_client()
+    assert client.get('/').get_data(as_text=True) == '/static/dist/js/app.0123456789.js'
+
+
+def test_asset_url_falls_back_without_a_build(tmp_path):
+    client = _app(tmp_path, built=False).test_client()
+    assert client.get('/').get_data(as_text=True) == '/static/js/app.js'
+    response = client.get('/static/js/app.js')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+    response.close()
+
+
+def test_built_assets_are_immutable_and_precompressed(tmp_path):
+    client = _app(tmp_path).test_client()
+    url = '/static/dist/js/app.0123456789.js'
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.headers['Content-Type'].startswith(('application/javascript', 'text/javascript'))
+    assert response.headers['Cache-Control'] == assets.IMMUTABLE_CACHE_CONTROL
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert brotli.decompress(response.get_data()) == b'var a=1;'
+    response.close()
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == b'var a=1;'
+    response.close()
+
+    response = client.get(url, headers={'Accept-Encoding': 'br;q=0, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    response.close()
+
+    response = client.get(url)
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == b'var a=1;'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    response.close()
+
+
+def test_missing_built_asset_is_404(tmp_path):
+    client = _app(tmp_path).test_client()
+    assert client.get('/static/dist/js/app.ffffffffff.js', headers={'Accept-Encoding': 'br'}).status_code == 404
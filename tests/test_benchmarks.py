@@ -0,0 +1,34 @@
+import pytest
+
+from benchmarks.compare import compare
+from benchmarks.loadgen import parse_mix, percentile, summarize
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.95) == 7
+    assert percentile([], 0.5) is None
+
+
+def test_parse_mix_rejects_unknown_scenarios():
+    assert parse_mix('dashboard=5,login') == {'dashboard': 5.0, 'login': 1.0}
+    with pytest.raises(ValueError):
+        parse_mix('checkout=1')
+
+
+def test_errors_are_counted_but_not_timed():
+    result = summarize({'dashboard': [(0.010, 200), (0.020, 304), (5.0, 500), (0.1, 0)]}, duration=2)['dashboard']
+    assert result['requests'] == 4
+    assert result['errors'] == 2
+    assert result['p99_ms'] == 20.0
+    assert result['throughput_rps'] == 2.0
+
+
+def test_compare_flags_slower_latency_and_lower_throughput():
+    baseline = {'endpoints': {'dashboard': {'throughput_rps': 100, 'p50_ms': 10, 'p95_ms': 20, 'p99_ms': 40}}}
+    candidate = {'endpoints': {'dashboard': {'throughput_rps': 80, 'p50_ms': 9, 'p95_ms': 21, 'p99_ms': 60}}}
+
+    regressed = {metric for _, metric, _, _, _, flagged in compare(baseline, candidate, 10) if flagged}
+    assert regressed == {'throughput_rps', 'p99_ms'}
@@ -0,0 +1,63 @@
+from flask import Flask
+
+from backend.database.models import User
+from backend.services import nutrient_service
+from backend.utils.caching import data_etag, not_modified
+
+app = Flask(__name__)
+
+
+def test_etag_follows_data_version():
+    assert data_etag(User(1, 'a', 'a@x.io', None, 3)) != data_etag(User(1, 'a', 'a@x.io', None, 4))
+
+
+def test_not_modified():
+    etag = data_etag(User(1, 'a', 'a@x.io', None, 3))
+
+    with app.test_request_context(headers={'If-None-Match': f'"{etag}"'}):
+        response = not_modified(etag)
+        assert response.status_code == 304
+        assert response.headers['ETag'] == f'"{etag}"'
+
+    with app.test_request_context(headers={'If-None-Match': '"stale"'}):
+        assert not_modified(etag) is None
+
+
+def test_cached_goals_are_only_served_for_their_data_version(monkeypatch):
+    stored = {'calories': 1800, 'protein': 120, 'carbs': 180, 'fat': 60}
+    reads = []
+
+    class Row:
+        def __init__(self, goals):
+            self.goals = dict(goals)
+
+        def to_dict(self):
+            return self.goals
+
+    def get_goals(conn, user_id):
+        reads.append(user_id)
+        return Row(stored)
+
+    monkeypatch.setattr(nutrient_service.repository, 'get_goals', get_goals)
+    service = nutrient_service.NutrientService(cache_ttl=300)
+
+    assert service.get_user_goals(-1, 5, conn=object())['calories'] == 1800
+    assert service.get_user_goals(-1, 5, conn=object())['calories'] == 1800
+    assert len(reads) == 1
+
+    # Another worker saved new goals, which bumped the user's data version
+    stored['calories'] = 2400
+    assert service.get_user_goals(-1, 6, conn=object())['calories'] == 2400
+    assert len(reads) == 2
+
+
+def test_goals_cache_keeps_the_most_recently_used_users(monkeypatch):
+    monkeypatch.setattr(nutrient_service.Config, 'GOALS_CACHE_SIZE', 2)
+    monkeypatch.setattr(nutrient_service, '_goals_cache', nutrient_service.OrderedDict())
+    monkeypatch.setattr(nutrient_service.repository, 'get_goals', lambda conn, user_id: None)
+    service = nutrient_service.NutrientService(cache_ttl=300)
+
+    for user_id in (-1, -2, -1, -3):
+        service.get_user_goals(user_id, 1, conn=object())
+
+    assert list(nutrient_service._goals_cache) == [-1, -3]
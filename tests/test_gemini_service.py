@@ -0,0 +1,27 @@
+from backend.services.gemini_service import plate_total
+
+
+def test_plate_total_sums_detected_items():
+    items = [
+        {'food_name': 'Rice', 'calories': 200, 'protein': '4 g', 'carbohydrates': '45g', 'fat': '0.5 g', 'fiber': None},
+        {'food_name': 'Chicken', 'calories': '250 kcal', 'protein': '30 g', 'carbohydrates': '0 g', 'fat': '12 g'},
+        {'food_name': None, 'calories': None},
+    ]
+
+    assert plate_total(items) == {
+        'food_name': 'Rice, Chicken, Unknown Food',
+        'calories': 450,
+        'protein': '34 g',
+        'carbohydrates': '45 g',
+        'fat': '12.5 g',
+        'fiber': '0 g'
+    }
+
+
+def test_plate_total_converts_kilojoules():
+    items = [
+        {'food_name': 'Bread', 'calories': '418.4 kJ'},
+        {'food_name': 'Butter', 'calories': '95 kcal'},
+    ]
+
+    assert plate_total(items)['calories'] == 195
@@ -0,0 +1,13 @@
+import numpy as np
+
+from backend.utils.helpers import calculate_nutrient_percentage
+
+
+def test_percentage_scalar():
+    assert calculate_nutrient_percentage(50, 200) == 25.0
+    assert calculate_nutrient_percentage(50, 0) == 0
+
+
+def test_percentage_vectorized():
+    result = calculate_nutrient_percentage([1000, 75, 0, 35], [2000, 150, 0, 70])
+    assert np.allclose(result, [50, 50, 0, 50])
@@ -0,0 +1,23 @@
+from backend.database.instrumentation import describe, is_read_only, normalize_sql, prepared_sql
+
+
+def test_normalize_sql_folds_literals_and_placeholders():
+    sql = """
+        SELECT id FROM food_logs
+        WHERE user_id = %s AND name = 'O''Brien' AND calories > 250 AND id IN (1, 2, 3)
+    """
+    assert normalize_sql(sql) == "SELECT id FROM food_logs WHERE user_id = ? AND name = ? AND calories > ? AND id IN (...)"
+
+
+def test_describe_resolves_prepared_statements():
+    prepared_sql['test_goals'] = "SELECT calories FROM nutrition_goals WHERE user_id = $1"
+    assert describe("EXECUTE test_goals (%s)") == "[test_goals] SELECT calories FROM nutrition_goals WHERE user_id = ?"
+
+
+def test_only_side_effect_free_statements_are_explained():
+    prepared_sql['test_bump'] = "UPDATE users SET data_version = data_version + $2 WHERE id = $1"
+    assert is_read_only("SELECT 1")
+    assert is_read_only(b"WITH x AS (SELECT 1) SELECT * FROM x")
+    assert not is_read_only("WITH moved AS (DELETE FROM t RETURNING *) SELECT * FROM moved")
+    assert not is_read_only("EXECUTE test_bump (%s, %s)")
+    assert not is_read_only("EXECUTE unknown_statement")
@@ -0,0 +1,71 @@
+import json
+import logging
+
+from flask import Flask
+
+from backend.config import Config
+from backend.utils import logging_setup
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_parse_levels():
+    assert logging_setup.parse_levels("backend.database=warning, backend.services.gemini_service=DEBUG,bad") == {
+        'backend.database': 'WARNING',
+        'backend.services.gemini_service': 'DEBUG',
+    }
+
+
+def test_json_lines_carry_request_context_and_extra_fields():
+    app = Flask(__name__)
+    record = logging.LogRecord('backend.test', logging.ERROR, __file__, 1, "Failed for %s", ('alice',), None)
+    with app.test_request_context('/api/items'):
+        logging_setup._assign_request_id()
+        logging_setup.RequestContextFilter().filter(record)
+    record.payload_kind = 'test'
+
+    line = json.loads(logging_setup.JsonFormatter().format(record))
+    assert line['message'] == "Failed for alice"
+    assert line['level'] == 'ERROR'
+    assert len(line['request_id']) == 32
+    assert line['route'] == '/api/items'
+    assert line['payload_kind'] == 'test'
+
+
+def test_request_id_is_taken_from_header_and_echoed():
+    app = Flask(__name__)
+    app.before_request(logging_setup._assign_request_id)
+    app.after_request(logging_setup._echo_request_id)
+    app.add_url_rule('/', 'index', lambda: 'ok')
+
+    client = app.test_client()
+    assert client.get('/', headers={'X-Request-ID': 'abc-123'}).headers['X-Request-ID'] == 'abc-123'
+    generated = client.get('/', headers={'X-Request-ID': 'bad id'}).headers['X-Request-ID']
+    assert generated != 'bad id' and len(generated) == 32
+
+
+def test_payloads_are_sampled_truncated_and_skipped_below_debug(monkeypatch):
+    monkeypatch.setattr(Config, 'LOG_PAYLOAD_SAMPLES_PER_MINUTE', 2)
+    monkeypatch.setattr(Config, 'LOG_PAYLOAD_MAX_CHARS', 10)
+    logger = logging.getLogger('tests.payloads')
+    logger.propagate = False
+    handler = _ListHandler()
+    logger.addHandler(handler)
+
+    logger.setLevel(logging.INFO)
+    logging_setup.log_payload(logger, 'sampled', "Raw response", 'x' * 50)
+    assert handler.records == []
+
+    logger.setLevel(logging.DEBUG)
+    for _ in range(5):
+        logging_setup.log_payload(logger, 'sampled', "Raw response", 'x' * 50)
+    assert len(handler.records) == 2
+    assert handler.records[0].payload == 'x' * 10 + '... (50 chars)'
+    logger.removeHandler(handler)
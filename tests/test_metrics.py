@@ -0,0 +1,25 @@
+from flask import Flask
+
+from backend.utils.metrics import cache_lookup, init_metrics
+
+
+def test_metrics_endpoint_reports_route_latency_and_cache_lookups():
+    app = Flask(__name__)
+    init_metrics(app)
+
+    @app.route('/api/things/<int:thing_id>')
+    def thing(thing_id):
+        cache_lookup('things', thing_id == 1)
+        return 'ok'
+
+    client = app.test_client()
+    client.get('/api/things/1')
+    client.get('/api/things/2')
+
+    body = client.get('/metrics').get_data(as_text=True)
+
+    # Labelled by URL rule, not by concrete path
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/things/<int:thing_id>",status="200"} 2.0' in body
+    assert 'cache_requests_total{cache="things",result="hit"} 1.0' in body
+    assert 'cache_requests_total{cache="things",result="miss"} 1.0' in body
+    assert 'route="/metrics"' not in body
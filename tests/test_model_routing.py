@@ -0,0 +1,45 @@
+from backend.config import Config
+from backend.services.model_routing import FAST, STRONG, choose_tier, looks_multi_item, model_for
+from backend.services.prompts import estimate_tokens, ingredients_prompt, text_analysis_prompt
+
+
+def test_multi_item_descriptions():
+    assert not looks_multi_item("1 medium apple")
+    assert not looks_multi_item("grilled salmon fillet")
+    assert looks_multi_item("chicken with rice")
+    assert looks_multi_item("2 eggs, toast and coffee")
+    assert looks_multi_item("burger + fries")
+
+
+def test_simple_text_goes_to_the_fast_tier(monkeypatch):
+    monkeypatch.setattr(Config, 'GEMINI_ROUTING_ENABLED', True)
+
+    assert choose_tier(description="1 medium apple") == FAST
+    assert choose_tier(description="spaghetti bolognese with parmesan") == STRONG
+    assert choose_tier(description="a very large bowl of my grandmother's homemade vegetable soup") == STRONG
+    assert choose_tier(has_image=True) == STRONG
+    assert choose_tier(items=3) == STRONG
+    assert choose_tier(items=1, prompt_tokens=Config.GEMINI_FAST_MAX_PROMPT_TOKENS + 1) == STRONG
+    assert model_for(FAST) == Config.GEMINI_MODEL_FAST
+
+
+def test_routing_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(Config, 'GEMINI_ROUTING_ENABLED', False)
+    assert choose_tier(description="1 medium apple") == STRONG
+
+
+def test_prompts_are_compact_and_complete():
+    prompt = text_analysis_prompt("1 medium apple")
+    assert '"1 medium apple"' in prompt
+    assert '"potential_allergens"' in prompt
+    assert '  ' not in prompt
+    assert estimate_tokens(prompt) < 200
+
+    listing = ingredients_prompt([('rolled oats', 100, 'g'), ('whole milk', 250, 'ml')])
+    assert "1. 100 g of rolled oats\n2. 250 ml of whole milk" in listing
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("apple") == 2
+    assert estimate_tokens("a, b, c") == 5
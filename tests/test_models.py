@@ -1,27 +1,38 @@
-from backend.database.models import YourModel  # Replace with your actual model
-import pytest
-
-@pytest.fixture
-def sample_model():
-    # Create a sample instance of YourModel for testing
-    model_instance = YourModel(field1='value1', field2='value2')  # Adjust fields as necessary
-    return model_instance
-
-def test_model_creation(sample_model):
-    assert sample_model is not None
-    assert sample_model.field1 == 'value1'
-    assert sample_model.field2 == 'value2'
-
-def test_model_str(sample_model):
-    assert str(sample_model) == 'Expected String Representation'  # Adjust as necessary
-
-def test_model_save(sample_model):
-    # Assuming you have a session to add the model instance
-    from backend.database.db_manager import session  # Adjust import as necessary
-    session.add(sample_model)
-    session.commit()
-    
-    # Fetch the model instance from the database
-    fetched_model = session.query(YourModel).filter_by(field1='value1').first()
-    assert fetched_model is not None
-    assert fetched_model.field1 == 'value1'
\ No newline at end of file
+from datetime import datetime
+
+from backend.database.models import FoodLog, NutritionGoals, User
+from backend.database.repository import Statement
+
+
+def test_food_log_from_row():
+    log = FoodLog._make((1, 'Apple', 95, 0.5, 25, 0.3, datetime(2026, 3, 1, 12, 30)))
+    assert log.name == 'Apple'
+    assert log.to_dict() == {
+        'id': 1,
+        'food_name': 'Apple',
+        'calories': 95,
+        'protein_g': 0.5,
+        'carbs_g': 25,
+        'fat_g': 0.3,
+        'log_date': '2026-03-01T12:30:00'
+    }
+
+
+def test_user_to_dict_without_created_at():
+    user = User(1, 'alice', 'alice@example.com', None)
+    assert user.to_dict()['created_at'] is None
+
+
+def test_goals_to_dict():
+    goals = NutritionGoals(2000, 150, 200, 70, None)
+    assert goals.to_dict() == {'calories': 2000, 'protein': 150, 'carbs': 200, 'fat': 70}
+
+
+def test_statement_execute_sql():
+    assert Statement('one', 'SELECT 1').execute_sql == 'EXECUTE one'
+    assert Statement('two', 'SELECT $1 + $2').execute_sql == 'EXECUTE two (%s, %s)'
+
+
+def test_food_log_with_photo():
+    log = FoodLog._make((1, 'Apple', 95, 0.5, 25, 0.3, None, 'ab' * 32))
+    assert log.to_dict()['photo_id'] == 'ab' * 32
@@ -0,0 +1,93 @@
+import pytest
+
+from backend.utils.nutrient_units import (
+    MICRONUTRIENT_INDEX, NutrientDataError, build_micronutrient_vector, normalize_allergens,
+    normalize_nutrient_name, normalize_nutrient_value, parse_calories, parse_grams, parse_quantity
+)
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('vitamin_c', 'vitamin_c'),
+    ('Vitamin B12', 'vitamin_b12'),
+    ('vitamin_b_6', 'vitamin_b6'),
+    ('B9', 'vitamin_b9'),
+    ('Folate', 'vitamin_b9'),
+    ('Dietary Fiber', 'fiber'),
+    ('Iron', 'iron'),
+    ('caffeine', None),
+])
+def test_normalize_nutrient_name(raw, expected):
+    assert normalize_nutrient_name(raw) == expected
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('12 mg', (12.0, 'mg')),
+    ('1,200mg', (1200.0, 'mg')),
+    ('approximately 2-3 g', (2.5, 'g')),
+    ('400 IU', (400.0, 'iu')),
+    ('15% DV', (15.0, '%')),
+    ('trace', (0.0, None)),
+    (7, (7.0, None)),
+    ('unknown', None),
+    (None, None),
+])
+def test_parse_quantity(raw, expected):
+    assert parse_quantity(raw) == expected
+
+
+def test_normalize_nutrient_value_converts_units():
+    assert normalize_nutrient_value('iron', '0.002 g') == pytest.approx(2)
+    assert normalize_nutrient_value('vitamin_b12', '0.0024 mg') == pytest.approx(2.4)
+    assert normalize_nutrient_value('vitamin_d', '400 IU') == pytest.approx(10)
+    assert normalize_nutrient_value('calcium', '10%') == pytest.approx(130)
+    assert normalize_nutrient_value('iron', '5 IU') is None
+
+
+def test_build_micronutrient_vector():
+    vector = build_micronutrient_vector({
+        'fiber': '4 g',
+        'vitamins_and_minerals': {'Vitamin C': '30 mg', 'iron': None, 'caffeine': '80 mg'},
+    })
+
+    assert vector[MICRONUTRIENT_INDEX['fiber'] - 1] == 4
+    assert vector[MICRONUTRIENT_INDEX['vitamin_c'] - 1] == 30
+    assert vector[MICRONUTRIENT_INDEX['iron'] - 1] is None
+    assert build_micronutrient_vector({'vitamins_and_minerals': {}}) is None
+
+
+@pytest.mark.parametrize('raw', [['iron', '2 mg'], 'iron: 2 mg', 12])
+def test_build_micronutrient_vector_rejects_non_objects(raw):
+    with pytest.raises(NutrientDataError):
+        build_micronutrient_vector({'vitamins_and_minerals': raw})
+
+
+def test_normalize_allergens():
+    assert normalize_allergens([' Milk', 'milk', 'Soy', None]) == ['milk', 'soy']
+    assert normalize_allergens([]) is None
+    assert normalize_allergens(' Peanuts') == ['peanuts']
+    with pytest.raises(NutrientDataError):
+        normalize_allergens({'peanuts': True})
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ('12 g', 12.0),
+    ('500 mg', 0.5),
+    (7, 7.0),
+    ('250 kcal', 250.0),
+    (None, 0.0),
+    ('unknown', 0.0),
+])
+def test_parse_grams(raw, expected):
+    assert parse_grams(raw) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('raw, expected', [
+    (95, 95.0),
+    ('95 kcal', 95.0),
+    ('418.4 kJ', 100.0),
+    ('about 120', 120.0),
+    ('n/a', 0.0),
+    (None, 0.0),
+])
+def test_parse_calories(raw, expected):
+    assert parse_calories(raw) == pytest.approx(expected)
@@ -0,0 +1,95 @@
+import io
+import os
+
+import pytest
+from flask import Flask
+from PIL import Image
+
+from backend.routes import photo_routes
+from backend.services.photo_store import PhotoError, PhotoStore
+
+
+def _jpeg(size=(800, 600), color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PhotoStore(root=str(tmp_path), sizes=(64, 256), max_bytes=1024 * 1024, workers=1)
+    yield store
+    store.wait()
+
+
+def test_identical_uploads_are_stored_once(store, tmp_path):
+    data = _jpeg()
+    photo_id = store.save(data)
+
+    assert store.save(data) == photo_id
+    assert len(photo_id) == 64
+    originals = [name for _, _, files in os.walk(tmp_path / 'originals') for name in files]
+    assert originals == [f"{photo_id}.jpg"]
+
+
+def test_thumbnails_are_made_in_the_background(store):
+    photo_id = store.save(_jpeg())
+    store.wait()
+
+    for size in (64, 256):
+        path = store._thumbnail_path(photo_id, size)
+        assert os.path.isfile(path)
+        with Image.open(path) as thumbnail:
+            assert max(thumbnail.size) == size
+            assert thumbnail.format == 'JPEG'
+
+
+def test_missing_thumbnail_is_made_on_demand(store):
+    photo_id = store.save(_jpeg(color=(0, 90, 0)))
+    store.wait()
+    os.remove(store._thumbnail_path(photo_id, 64))
+
+    assert store.thumbnail_path(photo_id, 64) == store._thumbnail_path(photo_id, 64)
+    assert os.path.isfile(store._thumbnail_path(photo_id, 64))
+
+
+def test_rejects_non_images_and_oversized_uploads(store):
+    with pytest.raises(PhotoError):
+        store.save(b'not an image')
+    with pytest.raises(PhotoError):
+        store.save(b'\xff' * (1024 * 1024 + 1))
+    with pytest.raises(PhotoError):
+        store.thumbnail_path('a' * 64, 100)
+
+
+def test_unknown_or_malformed_ids_have_no_file(store):
+    assert store.original_path('f' * 64) is None
+    assert store.original_path('../../etc/passwd') is None
+    assert store.thumbnail_path('../' * 20, 64) is None
+
+
+def test_photo_endpoint_is_cacheable_and_conditional(store, monkeypatch):
+    monkeypatch.setattr(photo_routes, 'photo_store', store)
+    app = Flask(__name__)
+    app.register_blueprint(photo_routes.photo_routes)
+    client = app.test_client()
+    photo_id = store.save(_jpeg())
+
+    response = client.get(f"/api/photos/{photo_id}?size=64")
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert 'immutable' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    response.close()
+
+    response = client.get(f"/api/photos/{photo_id}?size=64", headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    response.close()
+
+    response = client.get(f"/api/photos/{photo_id}")
+    assert response.status_code == 200
+    assert response.get_data() == _jpeg()
+    response.close()
+
+    assert client.get(f"/api/photos/{photo_id}?size=65").status_code == 400
+    assert client.get(f"/api/photos/{'0' * 64}").status_code == 404
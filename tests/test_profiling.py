@@ -0,0 +1,73 @@
+import os
+import time
+
+from flask import Flask, Response
+
+from backend.config import Config
+from backend.utils import profiling
+
+
+def _app(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(Config, 'PROFILE_SAMPLE_RATE', 0)
+    monkeypatch.setattr(Config, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'ADMIN_TOKEN', 'admin-secret')
+
+    app = Flask(__name__)
+
+    @app.route('/api/items/<int:item_id>')
+    def item(item_id):
+        return {'id': item_id}
+
+    @app.route('/api/stream')
+    def stream():
+        return Response(str(i) for i in range(3))
+
+    profiling.init_profiling(app)
+    return app
+
+
+def test_signed_header_expires():
+    assert profiling.is_authorized(profiling.sign_profile_request(60))
+    assert not profiling.is_authorized(profiling.sign_profile_request(-1))
+    assert not profiling.is_authorized(f"{int(time.time()) + 60}.forged")
+    assert not profiling.is_authorized(None)
+
+
+def test_non_ascii_header_is_refused(monkeypatch):
+    monkeypatch.setattr(Config, 'ADMIN_TOKEN', 'admin-secret')
+    # Latin-1 header bytes arrive as non-ASCII str
+    assert not profiling.is_authorized('caf\xe9')
+    assert not profiling.is_authorized(f"{int(time.time()) + 60}.sig\xe9")
+    assert not profiling.is_authorized('\xb2.sig')
+    assert profiling.is_authorized('admin-secret')
+
+
+def test_only_authorized_requests_are_profiled(monkeypatch, tmp_path):
+    client = _app(monkeypatch, tmp_path).test_client()
+
+    assert client.get('/api/items/1').status_code == 200
+    assert client.get('/api/items/1', headers={'X-Profile': 'wrong'}).status_code == 200
+    assert os.listdir(tmp_path) == []
+
+    client.get('/api/items/7', headers={'X-Profile': 'admin-secret'})
+    client.get('/api/items/8', headers={'X-Profile': profiling.sign_profile_request()})
+    names = os.listdir(tmp_path)
+    assert len(names) == 2
+    assert all('-GET-api-items-int-item_id-' in name and name.endswith('ms.prof') for name in names)
+
+
+def test_streamed_body_is_profiled_when_closed(monkeypatch, tmp_path):
+    client = _app(monkeypatch, tmp_path).test_client()
+
+    response = client.get('/api/stream', headers={'X-Profile': 'admin-secret'})
+    assert response.get_data(as_text=True) == '012'
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_middleware_is_not_installed_when_disabled(monkeypatch):
+    monkeypatch.setattr(Config, 'PROFILING_ENABLED', False)
+    app = Flask(__name__)
+    wsgi_app = app.wsgi_app
+    profiling.init_profiling(app)
+    assert app.wsgi_app == wsgi_app
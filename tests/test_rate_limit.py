@@ -0,0 +1,24 @@
+import time
+
+from flask import Flask
+
+from backend.utils import rate_limit
+
+
+def test_retry_after_rounds_up_to_the_next_token():
+    assert rate_limit._retry_after_seconds(0.0, 0.5) == 2
+    assert rate_limit._retry_after_seconds(0.9, 1 / 60) == 6
+    assert rate_limit._retry_after_seconds(0.99, 10) == 1
+    assert rate_limit._retry_after_seconds(0.0, 0) == 60
+
+
+def test_remembered_block_is_refused_without_the_database():
+    app = Flask(__name__)
+    rate_limit._blocked_until[('analyze_text', 'blocked-token')] = time.monotonic() + 30
+
+    with app.test_request_context('/', headers={'Authorization': 'Bearer blocked-token'}):
+        response = rate_limit.check_rate_limit('analyze_text', 10, 5)
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+    rate_limit._blocked_until.clear()
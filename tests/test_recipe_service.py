@@ -0,0 +1,65 @@
+import pytest
+
+from backend.database.models import Ingredient
+from backend.services.recipe_service import RecipeError, RecipeService, compute_totals, parse_ingredient
+from backend.utils.nutrient_units import MICRONUTRIENT_INDEX, MICRONUTRIENTS
+
+
+@pytest.mark.parametrize('entry, expected', [
+    ('500 g ground beef', ('ground beef', 500.0, 'g', 'g', 500.0)),
+    ('1/2 cup Rice', ('rice', 0.5, 'cup', 'ml', 120.0)),
+    ('1 1/2 lb  chicken thighs', ('chicken thighs', 1.5, 'lb', 'g', 680.4)),
+    ('2 cloves garlic', ('garlic', 2.0, 'cloves', 'clove', 2.0)),
+    ('2 onions', ('onions', 2.0, None, 'piece', 2.0)),
+    ('Salt to taste', ('salt to taste', None, None, None, 0.0)),
+    ({'name': 'Olive Oil', 'quantity': 2, 'unit': 'tbsp'}, ('olive oil', 2.0, 'tbsp', 'ml', 30.0)),
+])
+def test_parse_ingredient(entry, expected):
+    name, quantity, unit, basis, amount = parse_ingredient(entry)
+    assert (name, quantity, unit, basis) == expected[:4]
+    assert amount == pytest.approx(expected[4])
+
+
+@pytest.mark.parametrize('entry', [
+    '', {'name': 'rice', 'quantity': -1}, {'name': 'rice', 'quantity': 1, 'unit': 'furlong'}, 42,
+    {'name': 'rice', 'quantity': 'abc'}, {'name': 'rice', 'quantity': '1/2/3'}, {'name': 'rice', 'quantity': '1/x'},
+    {'name': 'rice', 'quantity': '1/0'}, {'name': 'rice', 'quantity': 'nan'}, {'name': 'rice', 'quantity': True},
+    {'name': 'rice', 'quantity': 1, 'unit': 5},
+])
+def test_parse_ingredient_rejects_invalid_input(entry):
+    with pytest.raises(RecipeError):
+        parse_ingredient(entry)
+
+
+def test_compute_totals_scales_per_basis():
+    iron = [None] * len(MICRONUTRIENTS)
+    iron[MICRONUTRIENT_INDEX['iron'] - 1] = 2.5
+    ingredients = {
+        ('beef', 'g'): Ingredient(1, 'beef', 'g', 250, 26, 0, 17, iron),
+        ('garlic', 'clove'): Ingredient(2, 'garlic', 'clove', 4, 0.2, 1, 0, None),
+    }
+    parsed = [
+        parse_ingredient('500 g beef'),
+        parse_ingredient('3 cloves garlic'),
+        parse_ingredient('salt to taste'),
+    ]
+
+    macros, micronutrients = compute_totals(parsed, ingredients)
+
+    assert macros == pytest.approx([1262, 130.6, 3, 85])
+    assert micronutrients[MICRONUTRIENT_INDEX['iron'] - 1] == pytest.approx(12.5)
+    # Nutrients no ingredient reports stay unknown rather than zero
+    assert micronutrients[MICRONUTRIENT_INDEX['calcium'] - 1] is None
+
+
+def test_compute_totals_without_known_ingredients():
+    assert compute_totals([parse_ingredient('salt to taste')], {}) == ([0.0, 0.0, 0.0, 0.0], None)
+
+
+@pytest.mark.parametrize('servings', [True, 0, -2, '2', float('nan')])
+def test_invalid_servings_are_rejected_before_any_lookup(servings):
+    service = RecipeService(gemini_service=object())
+    with pytest.raises(RecipeError):
+        service.save_recipe(1, 'Porridge', servings, ['100 g oats'])
+    with pytest.raises(RecipeError):
+        service.log_recipe(1, 1, servings)
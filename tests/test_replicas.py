@@ -0,0 +1,107 @@
+"""
+Replica routing tests. These need a primary and a streaming replica, e.g.
+
+    NUTRIFY_TEST_PRIMARY_URL=postgresql://postgres@localhost:5432/nutrify
+    NUTRIFY_TEST_REPLICA_URL=postgresql://postgres@localhost:5433/nutrify
+"""
+import os
+
+import pytest
+from flask import Flask
+
+from backend.database import replicas
+from backend.database.db_manager import read_snapshot, release
+from backend.database.replicas import ReplicaRouter
+
+PRIMARY_URL = os.environ.get('NUTRIFY_TEST_PRIMARY_URL')
+REPLICA_URL = os.environ.get('NUTRIFY_TEST_REPLICA_URL')
+
+pytestmark = pytest.mark.skipif(
+    not (PRIMARY_URL and REPLICA_URL),
+    reason="NUTRIFY_TEST_PRIMARY_URL and NUTRIFY_TEST_REPLICA_URL are not set"
+)
+
+UNREACHABLE_URL = 'postgresql://postgres@127.0.0.1:1/nutrify'
+
+
+def with_app_name(dsn, name):
+    separator = '&' if '?' in dsn else '?'
+    return f"{dsn}{separator}application_name={name}"
+
+
+def describe(conn):
+    """Return (in_recovery, application_name) for a connection and release it"""
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_is_in_recovery(), current_setting('application_name')")
+        return cur.fetchone()
+    finally:
+        release(conn)
+
+
+def make_router(replicas, **kwargs):
+    return ReplicaRouter({'dsn': PRIMARY_URL}, replicas, **kwargs)
+
+
+def test_reads_use_replica():
+    router = make_router([REPLICA_URL])
+    in_recovery, _ = describe(router.get_read_connection())
+    assert in_recovery is True
+
+
+def test_round_robin_across_replicas():
+    router = make_router([with_app_name(REPLICA_URL, 'r1'), with_app_name(REPLICA_URL, 'r2')])
+    names = [describe(router.get_read_connection())[1] for _ in range(4)]
+    assert names == ['r1', 'r2', 'r1', 'r2']
+
+
+def test_unreachable_replica_is_skipped():
+    router = make_router([UNREACHABLE_URL, REPLICA_URL], retry_after=60)
+    assert describe(router.get_read_connection())[0] is True
+    assert router.replicas[0].down_until > 0
+
+    # Both replicas down: the primary serves the read
+    router = make_router([UNREACHABLE_URL])
+    assert describe(router.get_read_connection())[0] is False
+
+
+def test_lagging_replica_falls_back_to_primary():
+    router = make_router([REPLICA_URL], max_lag=-1)
+    assert describe(router.get_read_connection())[0] is False
+
+
+def test_recent_writer_reads_from_primary():
+    router = make_router([REPLICA_URL], sticky_seconds=30)
+    router.record_write('client-a')
+
+    assert describe(router.get_read_connection('client-a'))[0] is False
+    assert describe(router.get_read_connection('client-b'))[0] is True
+    assert describe(router.get_read_connection('client-b', pinned=True))[0] is False
+
+
+def test_read_snapshot_holds_one_snapshot_on_a_replica():
+    router = make_router([REPLICA_URL])
+    conn = router.get_read_connection()
+    try:
+        with read_snapshot(conn):
+            cur = conn.cursor()
+            cur.execute("SELECT txid_current_snapshot()::text, current_setting('transaction_isolation')")
+            first, isolation = cur.fetchone()
+            cur.execute("SELECT txid_current_snapshot()::text")
+            assert cur.fetchone()[0] == first
+            assert isolation == 'repeatable read'
+        assert conn.autocommit is True
+    finally:
+        release(conn)
+
+
+def test_only_recorded_writes_pin_the_client(monkeypatch):
+    monkeypatch.setattr(replicas, '_router', make_router([REPLICA_URL], sticky_seconds=30))
+    app = Flask(__name__)
+    app.after_request(replicas.mark_recent_write)
+    app.add_url_rule('/login', 'login', lambda: 'ok', methods=['POST'])
+    app.add_url_rule('/logs', 'logs', replicas.records_write(lambda: 'ok'), methods=['POST'])
+    client = app.test_client()
+
+    assert replicas.PRIMARY_COOKIE not in client.post('/login').headers.get('Set-Cookie', '')
+    assert replicas.PRIMARY_COOKIE in client.post('/logs').headers.get('Set-Cookie', '')
@@ -0,0 +1,34 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from backend.services.search_service import SearchError, build_tsquery, decode_cursor, encode_cursor
+
+
+def test_every_word_is_a_prefix():
+    assert build_tsquery('Quest protein-bar') == 'quest:* & protein:* & bar:*'
+    assert build_tsquery("Trader Joe's") == 'trader:* & joe:* & s:*'
+
+
+def test_queries_without_words_build_nothing():
+    assert build_tsquery('') is None
+    assert build_tsquery("!!! & | ' :*") is None
+
+
+def test_operators_in_the_query_are_not_passed_through():
+    assert build_tsquery("bar | !cookie & (x:*)") == 'bar:* & cookie:* & x:*'
+
+
+def test_cursor_round_trip():
+    after = (Decimal('0.100000'), datetime(2026, 3, 14, 8, 30, 5, 123456), 42)
+    cursor = encode_cursor(*after)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == after
+
+
+@pytest.mark.parametrize('cursor', ['zzz', 'bm90IGpzb24', encode_cursor('x', datetime(2026, 1, 1), 1)])
+def test_invalid_cursor(cursor):
+    with pytest.raises(SearchError):
+        decode_cursor(cursor)
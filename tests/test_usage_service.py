@@ -0,0 +1,29 @@
+from datetime import date
+
+from backend.services.usage_service import ANONYMOUS_USER_ID, UsageTracker
+
+
+def test_tracker_aggregates_calls_in_memory():
+    tracker = UsageTracker(interval=3600)
+    tracker.record('analyze_food_text', 'models/gemini-1.5-flash', user_id=7, endpoint='food_routes.analyze_text',
+                   prompt_tokens=100, response_tokens=20, request_bytes=400, response_bytes=80, latency_ms=900)
+    tracker.record('analyze_food_text', 'models/gemini-1.5-flash', user_id=7, endpoint='food_routes.analyze_text',
+                   error=True, request_bytes=400, latency_ms=100)
+    tracker.record('analyze_food_image', 'models/gemini-1.5-flash', user_id=8, endpoint='food_routes.analyze_image',
+                   prompt_tokens=300, response_tokens=50)
+
+    key = (date.today(), 7, 'food_routes.analyze_text', 'analyze_food_text', 'models/gemini-1.5-flash')
+    assert tracker._pending[key] == [2, 1, 100, 20, 800, 80, 1000]
+    assert tracker.pending_for(7, date.today()) == (2, 120)
+    assert tracker.pending_for(8, date.today()) == (1, 350)
+    # Nothing left for the exit-time flush to write
+    tracker._pending.clear()
+
+
+def test_calls_outside_a_request_are_anonymous():
+    tracker = UsageTracker(interval=3600)
+    tracker.record('analyze_ingredients', 'models/gemini-1.5-flash')
+
+    (key,) = tracker._pending
+    assert key[1:3] == (ANONYMOUS_USER_ID, 'background')
+    tracker._pending.clear()